@@ -0,0 +1,80 @@
+"""
+Benchmark: räumliche Duplikat-Entfernung (dedup_by_distance) von 1k bis 500k Punkten.
+
+Vergleicht den Grid-Index mit dem bisherigen paarweisen Vergleich (nur für kleine
+Mengen, da O(n²)) und prüft, dass beide Varianten identische Ergebnisse liefern.
+
+Aufruf: python benchmarks/bench_dedup.py [--sizes 1000 10000 ...] [--threshold 100]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from transfer_stops.spatial import dedup_by_distance, haversine_distance
+
+
+def naive_dedup(points, distance_threshold_meters):
+    """Bisheriger O(n²)-Algorithmus aus clean_delta_bfkoord_wgs als Referenz."""
+    kept = []
+    removed = []
+    for i, (lat, lon) in enumerate(points):
+        closest = None
+        min_distance = float('inf')
+        for j in kept:
+            distance = haversine_distance(lat, lon, points[j][0], points[j][1])
+            if distance < distance_threshold_meters and distance < min_distance:
+                min_distance = distance
+                closest = j
+        if closest is None:
+            kept.append(i)
+        else:
+            removed.append((i, closest, min_distance))
+    return kept, removed
+
+
+def synthetic_points(n, seed=42):
+    """Europaweit verteilte Punkte mit ~20% Duplikaten in < 150m Abstand."""
+    rng = random.Random(seed)
+    points = []
+    for _ in range(n):
+        if points and rng.random() < 0.2:
+            lat, lon = rng.choice(points)
+            points.append((lat + rng.uniform(-0.001, 0.001), lon + rng.uniform(-0.0015, 0.0015)))
+        else:
+            points.append((rng.uniform(35.0, 70.0), rng.uniform(-10.0, 30.0)))
+    return points
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000, 100000, 500000])
+    parser.add_argument('--threshold', type=float, default=100)
+    parser.add_argument('--naive-limit', type=int, default=5000,
+                        help='Maximale Grösse für den O(n²)-Vergleich')
+    args = parser.parse_args()
+
+    print(f"{'Punkte':>10} {'Grid [s]':>10} {'Naiv [s]':>10} {'behalten':>10} {'entfernt':>10}")
+    for size in args.sizes:
+        points = synthetic_points(size)
+
+        start = time.perf_counter()
+        kept, removed = dedup_by_distance(points, args.threshold)
+        grid_time = time.perf_counter() - start
+
+        naive_time = ''
+        if size <= args.naive_limit:
+            start = time.perf_counter()
+            expected = naive_dedup(points, args.threshold)
+            naive_time = f"{time.perf_counter() - start:.3f}"
+            if expected != (kept, removed):
+                raise SystemExit(f"❌ Ergebnis weicht vom O(n²)-Algorithmus ab (n={size})")
+
+        print(f"{size:>10} {grid_time:>10.3f} {naive_time:>10} {len(kept):>10} {len(removed):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: Importzeit der Einstiegspunkte und welche schweren Abhängigkeiten sie laden.
+
+Jeder Fall läuft in einem frischen Python-Prozess (bestes von --repeat Läufen). Lädt ein
+Fall eine für ihn verbotene Abhängigkeit - z.B. geopandas bei einem Lauf ohne Änderungen
+oder pandas in process_delta_metabhf.py - oder braucht er länger als --budget Sekunden,
+endet das Skript mit Exit-Code 1.
+
+Aufruf: python benchmarks/bench_imports.py [--repeat 5] [--budget 0.5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+HEAVY = ('numpy', 'pandas', 'geopandas', 'shapely', 'pyproj', 'pyogrio', 'fiona', 'requests')
+GEO_STACK = ('pandas', 'geopandas', 'shapely', 'pyproj', 'pyogrio', 'fiona')
+
+# Lauf ohne Änderungen: Downloads melden keine Änderung (offline), danach früher Abbruch
+NO_CHANGE_RUN = """
+import os, tempfile
+os.chdir(tempfile.mkdtemp(prefix='transfer_stops_imports_'))
+from transfer_stops import cli, config
+from transfer_stops.etl import extract
+extract.download_all_sources = lambda providers: (False, {p['name']: False for p in providers})
+cli.run(cli.select_stages(), cleanup=False)
+"""
+
+HELP = """
+import main
+try:
+    main.main(['--help'])
+except SystemExit:
+    pass
+"""
+
+# (Name, Code, verbotene Module)
+CASES = [
+    ('main.py --help', HELP, HEAVY),
+    ('Lauf ohne Änderungen', NO_CHANGE_RUN, GEO_STACK),
+    ('process_delta_metabhf.py', "import process_delta_metabhf", GEO_STACK + ('requests',)),
+    ('etl.pipeline', "import transfer_stops.etl.pipeline", GEO_STACK),
+    ('etl.extract (Filter)', "from transfer_stops.etl.extract import filter_points_in_boundary\n"
+                             "import geopandas", ()),
+]
+
+RUNNER = """
+import contextlib, io, json, sys, time
+sys.path[:0] = [{root!r}, {src!r}]
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    exec({code!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'modules': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_case(code: str):
+    """Führt code in einem frischen Interpreter aus. Returns: (Sekunden, geladene schwere Module)"""
+    script = RUNNER.format(root=ROOT, src=os.path.join(ROOT, 'src'), code=code, heavy=HEAVY)
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, cwd=ROOT)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'Fehler')
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    return data['seconds'], data['modules']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=None,
+                        help='maximale Zeit pro Fall in Sekunden (Standard: nur verbotene Module prüfen)')
+    args = parser.parse_args()
+
+    problems = []
+    print(f"{'Fall':<28} {'Zeit [s]':>9}  geladen")
+    for name, code, forbidden in CASES:
+        timings = []
+        for _ in range(args.repeat):
+            seconds, modules = measure_case(code)
+            timings.append(seconds)
+        best = min(timings)
+        print(f"{name:<28} {best:>9.3f}  {', '.join(modules) or '-'}")
+        loaded = [module for module in forbidden if module in modules]
+        if loaded:
+            problems.append(f"{name}: lädt {', '.join(loaded)}")
+        if args.budget is not None and best > args.budget:
+            problems.append(f"{name}: {best:.3f}s > {args.budget:.3f}s")
+
+    if problems:
+        print(f"\n❌ {len(problems)} Probleme:")
+        for problem in problems:
+            print(f"   - {problem}")
+        raise SystemExit(1)
+    print("\n✅ Keine verbotenen Importe")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Deterministische synthetische Testdaten für die Benchmarks (kein Download nötig).
+
+- stops.txt (GTFS) in beliebiger Grösse, europaweit verteilt, ~8% in der Schweiz,
+  mit exakten ÖV-Duplikaten, nahen Duplikaten und FlixTrain-Einträgen
+- ÖV-Referenz oevSammlung/BFKOORD_WGS und METABHF im HRDF-Format
+- QGIS-Export (QGIS_METABHF.csv) und delta/BAHNHOF für die UMSTEIGB-Erstellung
+- vereinfachte Landesgrenze (GeoPackage, Layer tlm_landesgebiet, LV95)
+
+Gleicher seed -> byteweise gleiche Dateien (GeoPackage: gleiche Geometrie, SQLite-Zeitstempel variieren).
+"""
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import Polygon
+
+# Grob vereinfachte Landesgrenze der Schweiz (WGS84), reicht für Bounding-Box und Punkt-in-Polygon
+SWISS_OUTLINE_WGS84 = [
+    (5.96, 46.20), (6.10, 46.60), (6.45, 46.95), (6.95, 47.30), (7.55, 47.58), (8.55, 47.80),
+    (9.55, 47.55), (9.50, 47.05), (10.45, 46.95), (10.45, 46.55), (10.05, 46.23), (9.00, 45.85),
+    (8.45, 46.25), (7.85, 45.95), (7.05, 45.90), (6.80, 46.15), (5.96, 46.20),
+]
+SWISS_BBOX = (5.9, 45.8, 10.5, 47.8)
+EUROPE_BBOX = (-10.0, 35.0, 30.0, 70.0)
+
+STOPS_HEADER = [
+    'stop_id', 'stop_name', 'stop_lat', 'stop_lon', 'stop_desc', 'zone_id', 'stop_url',
+    'location_type', 'parent_station', 'wheelchair_boarding', 'platform_code', 'stop_timezone',
+]
+
+
+def write_boundary(path: str):
+    """Landesgrenze als GeoPackage (Layer tlm_landesgebiet, EPSG:2056) wie swissBOUNDARIES3D."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    outline = gpd.GeoSeries([Polygon(SWISS_OUTLINE_WGS84)], crs='EPSG:4326').to_crs('EPSG:2056')
+    gpd.GeoDataFrame({'ICC': ['CH']}, geometry=outline).to_file(path, layer='tlm_landesgebiet', driver='GPKG')
+
+
+def oev_stops(n: int, seed: int = 1):
+    """n ÖV-Haltestellen in der Schweiz: (ids, lons, lats) mit 6 Nachkommastellen."""
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = SWISS_BBOX
+    ids = 8500000 + np.arange(n)
+    lons = np.round(rng.uniform(minx, maxx, n), 6)
+    lats = np.round(rng.uniform(miny, maxy, n), 6)
+    return ids, lons, lats
+
+
+def write_oev_bfkoord(path: str, n: int = 50000, seed: int = 1):
+    """oevSammlung/BFKOORD_WGS im HRDF-Format (ID LON LAT HÖHE % NAME)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    ids, lons, lats = oev_stops(n, seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("*F Synthetische ÖV-Haltestellen\n")
+        f.write(''.join(
+            f"{id_:07d} {lon:>10.6f} {lat:>10.6f}      0 % Halt {id_}\n"
+            for id_, lon, lat in zip(ids.tolist(), lons.tolist(), lats.tolist())
+        ))
+
+
+def write_oev_metabhf(path: str, n_oev: int = 50000, n_relations: int = 100000, seed: int = 2):
+    """oevSammlung/METABHF: Umsteigebeziehungen 'ID1 ID2 NNN' + '*A Y' zwischen ÖV-Haltestellen."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rng = np.random.default_rng(seed)
+    first = 8500000 + rng.integers(0, n_oev, n_relations)
+    second = 8500000 + rng.integers(0, n_oev, n_relations)
+    minutes = rng.integers(2, 15, n_relations)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(''.join(
+            f"{a:07d} {b:07d} {m:03d}\n*A Y\n"
+            for a, b, m in zip(first.tolist(), second.tolist(), minutes.tolist())
+        ))
+
+
+def write_stops_txt(path: str, n: int, n_oev: int = 50000, seed: int = 3):
+    """
+    GTFS stops.txt mit n Haltestellen (Flixbus-Spalten): ~8% in der Schweiz, davon je ein
+    Teil exakt auf ÖV-Haltestellen und in < 100m zu anderen Haltestellen; ~3% FlixTrain.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rng = np.random.default_rng(seed)
+    in_ch = rng.random(n) < 0.08
+    box = np.where(in_ch[:, None], SWISS_BBOX, EUROPE_BBOX)
+    lons = rng.uniform(box[:, 0], box[:, 2])
+    lats = rng.uniform(box[:, 1], box[:, 3])
+
+    # Exakt auf ÖV-Haltestellen (5% der Schweizer Haltestellen)
+    _, oev_lons, oev_lats = oev_stops(n_oev)
+    on_oev = np.flatnonzero(in_ch & (rng.random(n) < 0.05))
+    picked = rng.integers(0, n_oev, len(on_oev))
+    lons[on_oev], lats[on_oev] = oev_lons[picked], oev_lats[picked]
+
+    # Nahe Duplikate (< ~90m) einer früheren Haltestelle (10%)
+    near = np.flatnonzero(rng.random(n) < 0.10)
+    near = near[near > 0]
+    base = (rng.random(len(near)) * near).astype(np.int64)
+    lons[near] = lons[base] + rng.uniform(-0.0008, 0.0008, len(near))
+    lats[near] = lats[base] + rng.uniform(-0.0006, 0.0006, len(near))
+
+    names = np.char.add('Stop ', np.arange(n).astype(str))
+    flixtrain = rng.random(n) < 0.03
+    names[flixtrain] = np.char.add(names[flixtrain], ' FlixTrain')
+    df = pd.DataFrame({
+        'stop_id': np.char.add('id', np.arange(n).astype(str)),
+        'stop_name': names,
+        'stop_lat': lats,
+        'stop_lon': lons,
+        'stop_desc': '',
+        'zone_id': '',
+        'stop_url': '',
+        'location_type': 0,
+        'parent_station': '',
+        'wheelchair_boarding': 0,
+        'platform_code': '',
+        'stop_timezone': np.where(in_ch, 'Europe/Zurich', 'Europe/Berlin'),
+    }, columns=STOPS_HEADER)
+    df.to_csv(path, index=False, float_format='%.8f')
+
+
+def write_qgis_metabhf(csv_path: str, bahnhof_path: str, n_stops: int = 2000, n_oev: int = 50000, seed: int = 4):
+    """
+    QGIS-Export (final_line) mit einer Umsteigebeziehung pro neuer Haltestelle
+    (17xxxxx -> ÖV-ID) und das passende delta/BAHNHOF.
+    """
+    for path in (csv_path, bahnhof_path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    rng = np.random.default_rng(seed)
+    new_ids = 1700000 + np.arange(n_stops)
+    oev_ids = 8500000 + rng.integers(0, n_oev, n_stops)
+    minutes = rng.integers(2, 10, n_stops)
+    with open(csv_path, 'w', encoding='utf-8') as f:
+        f.write("final_line\n")
+        f.write(''.join(
+            f'"{a:07d} {b:07d} {m:03d}\n*A Y"\n'
+            for a, b, m in zip(new_ids.tolist(), oev_ids.tolist(), minutes.tolist())
+        ))
+    with open(bahnhof_path, 'w', encoding='utf-8') as f:
+        f.write(''.join(f"{id_:07d}      Stop {id_} [Flixbus]$<1>\n" for id_ in new_ids.tolist()))
+
+
+def build_fixtures(root: str, sizes, n_oev: int = 50000, n_relations: int = 100000):
+    """
+    Schreibt alle Testdaten unter root (Struktur wie im Projekt: data/raw, data/external, ...).
+    Returns: Dict mit den Pfaden (stops pro Grösse unter 'stops')
+    """
+    paths = {
+        'boundary': os.path.join(root, 'data', 'external', 'boundary.gpkg'),
+        'oev_bfkoord': os.path.join(root, 'data', 'raw', 'oevSammlung', 'BFKOORD_WGS'),
+        'oev_metabhf': os.path.join(root, 'data', 'raw', 'oevSammlung', 'METABHF'),
+        'qgis_metabhf': os.path.join(root, 'data', 'processed', 'QGIS_METABHF.csv'),
+        'bahnhof': os.path.join(root, 'data', 'processed', 'delta', 'BAHNHOF'),
+        'stops': {},
+    }
+    write_boundary(paths['boundary'])
+    write_oev_bfkoord(paths['oev_bfkoord'], n_oev)
+    write_oev_metabhf(paths['oev_metabhf'], n_oev, n_relations)
+    write_qgis_metabhf(paths['qgis_metabhf'], paths['bahnhof'], n_oev=n_oev)
+    for size in sizes:
+        path = os.path.join(root, 'data', 'raw', f'stops_{size}', 'stops.txt')
+        write_stops_txt(path, size, n_oev)
+        paths['stops'][size] = path
+    return paths
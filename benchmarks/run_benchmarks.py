@@ -0,0 +1,183 @@
+"""
+Benchmark der Pipeline-Stufen mit synthetischen Testdaten (offline, deterministisch).
+
+Erzeugt die Testdaten (siehe fixtures.py) in einem Arbeitsordner, misst jede Stufe
+(Wand-/CPU-Zeit, Anstieg des Spitzen-RSS über transfer_stops.instrument; bestes von --repeat Läufen)
+für jede stops.txt-Grösse und vergleicht mit benchmarks/baseline.json. Eine Stufe gilt
+als Regression, wenn sie mehr als --tolerance langsamer und mindestens --min-delta
+Sekunden langsamer ist als die Baseline; dann endet das Skript mit Exit-Code 1.
+
+Aufruf:
+    python benchmarks/run_benchmarks.py [--sizes 10000 100000] [--repeat 3]
+    python benchmarks/run_benchmarks.py --update-baseline   # Baseline neu schreiben
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from transfer_stops import config, instrument
+from transfer_stops.etl.boundary import load_swiss_boundary
+from transfer_stops.etl.extract import extract_swiss_stops_csv, read_stops_csv
+from transfer_stops.etl.load import write_bahnhof
+from transfer_stops.etl.metabhf import (
+    MetabhfIndex, create_umsteigb_file, iter_metabhf_lines, metabhf_candidates, process_metabhf_file
+)
+from transfer_stops.etl.reference import parse_oev_bfkoord_wgs
+from transfer_stops.etl.transform import (
+    assign_ids, clean_entries, collect_new_coords, standardize_lat_lon, write_bfkoord_csv, write_bfkoord_wgs
+)
+from transfer_stops.log import setup_logging
+
+from fixtures import build_fixtures
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+BASELINE_VERSION = 1
+FLIXBUS = config.providers[0]
+
+
+def measure(results, key: str, repeat: int, func, *args):
+    """Führt func(*args) repeat-mal als Stufe key aus; behält den schnellsten Lauf. Returns: Ergebnis des letzten Laufs."""
+    best = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            with instrument.stage(key, report=False) as record:
+                value = func(*args)
+        if best is None or record.wall_s < best['wall_s']:
+            best = {'wall_s': record.wall_s, 'cpu_s': record.cpu_s,
+                    'process_peak_rss_mb': record.process_peak_rss_mb,
+                    'peak_rss_growth_mb': record.peak_rss_growth_mb}
+    results[key] = best
+    print(f"  {key:<28} {best['wall_s']:>9.3f}s  CPU {best['cpu_s']:>8.3f}s  RSS +{best['peak_rss_growth_mb']} MB")
+    return value
+
+
+def bench_reference_stages(results, paths, repeat: int):
+    """Grössenunabhängige Stufen: ÖV-Referenz, METABHF-Index, METABHF-Nachbearbeitung, UMSTEIGB."""
+    reference = measure(results, 'oev_reference', repeat, parse_oev_bfkoord_wgs, paths['oev_bfkoord'])
+    measure(results, 'oev_metabhf_index', repeat,
+            lambda: MetabhfIndex.from_lines(iter_metabhf_lines(paths['oev_metabhf'])))
+    metabhf_path = os.path.join('data', 'processed', 'delta', 'METABHF')
+    index = measure(results, 'process_metabhf', repeat, process_metabhf_file, paths['qgis_metabhf'], metabhf_path)
+    measure(results, 'umsteigb', repeat, create_umsteigb_file, paths['bahnhof'], metabhf_path,
+            os.path.join('data', 'processed', 'delta', 'UMSTEIGB'), index)
+    return reference
+
+
+def bench_provider_stages(results, stops_path: str, size: int, reference, repeat: int):
+    """Stufen eines Providers mit stops.txt der Grösse size, von Extract bis METABHF-Vorschläge."""
+    lat, lon, drop = FLIXBUS['lat'], FLIXBUS['lon'], FLIXBUS['columns_to_drop']
+    measure(results, f'read_stops@{size}', repeat, read_stops_csv, stops_path, lat, lon, drop)
+    df = measure(results, f'extract@{size}', repeat, extract_swiss_stops_csv,
+                 stops_path, None, FLIXBUS['name'], lat, lon, config.BOUNDARY_PATH, drop)
+    df = standardize_lat_lon(df, lat, lon)
+    stops = measure(results, f'collect@{size}', repeat,
+                    lambda: collect_new_coords(df, FLIXBUS['name'], reference, set(), []))
+    stops = measure(results, f'clean@{size}', repeat, clean_entries, stops)
+
+    def assign():
+        # Jeder Lauf mit leerem ID-Register
+        if os.path.exists(config.ID_REGISTRY_PATH):
+            os.remove(config.ID_REGISTRY_PATH)
+        assign_ids(stops, reference.used_ids())
+    measure(results, f'assign_ids@{size}', repeat, assign)
+
+    def write_outputs():
+        write_bfkoord_wgs(stops)
+        write_bfkoord_csv(stops, os.path.join('data', 'processed', 'BFKOORD_WGS_KOMMAGETRENNT.csv'))
+        write_bahnhof(stops, [FLIXBUS['name']])
+    measure(results, f'write_outputs@{size}', repeat, write_outputs)
+    measure(results, f'metabhf_candidates@{size}', repeat, metabhf_candidates, stops, reference)
+
+
+def compare(results, baseline, tolerance: float, min_delta: float):
+    """Regressionen gegenüber der Baseline als Liste von Meldungen."""
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        ratio = result['wall_s'] / reference['wall_s'] if reference['wall_s'] else float('inf')
+        if ratio > 1 + tolerance and result['wall_s'] - reference['wall_s'] >= min_delta:
+            regressions.append(f"{key}: {reference['wall_s']:.3f}s -> {result['wall_s']:.3f}s ({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 500000],
+                        help='Anzahl Haltestellen in stops.txt')
+    parser.add_argument('--oev', type=int, default=50000, help='Anzahl ÖV-Haltestellen in BFKOORD_WGS')
+    parser.add_argument('--relations', type=int, default=100000, help='Anzahl Umsteigebeziehungen in METABHF')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workdir', help='Ordner für Testdaten und Ausgaben (Standard: temporär)')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='erlaubte Verlangsamung (0.25 = 25%%)')
+    parser.add_argument('--min-delta', type=float, default=0.02, help='kleinere Unterschiede (Sekunden) ignorieren')
+    parser.add_argument('--output', help='Ergebnisse zusätzlich als JSON schreiben')
+    args = parser.parse_args()
+
+    baseline_path = os.path.abspath(args.baseline)
+    output_path = os.path.abspath(args.output) if args.output else None
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='transfer_stops_bench_'))
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    setup_logging('WARNING')
+
+    print(f"Erzeuge Testdaten in {workdir} ...")
+    paths = build_fixtures(workdir, args.sizes, args.oev, args.relations)
+    config.BOUNDARY_PATH = paths['boundary']
+    config.CACHE_DIR = os.path.join(workdir, 'cache')
+    config.ID_REGISTRY_PATH = os.path.join(workdir, 'data', 'id_registry.json')
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_swiss_boundary(config.BOUNDARY_PATH)
+
+    results = {}
+    print(f"\nÖV-Referenz ({args.oev} Haltestellen, {args.relations} Umsteigebeziehungen)")
+    reference = bench_reference_stages(results, paths, args.repeat)
+    for size in args.sizes:
+        print(f"\nstops.txt mit {size} Haltestellen")
+        bench_provider_stages(results, paths['stops'][size], size, reference, args.repeat)
+
+    report = {
+        'version': BASELINE_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {'sizes': args.sizes, 'oev': args.oev, 'relations': args.relations, 'repeat': args.repeat},
+        'stages': results,
+    }
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"\n✅ Baseline geschrieben: {baseline_path}")
+        return
+
+    if not os.path.exists(baseline_path):
+        print(f"\nℹ️ Keine Baseline ({baseline_path}) - mit --update-baseline erstellen")
+        return
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline['stages'], args.tolerance, args.min_delta)
+    if regressions:
+        print(f"\n❌ {len(regressions)} Regressionen gegenüber {baseline_path}:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        raise SystemExit(1)
+    print(f"\n✅ Keine Regression gegenüber der Baseline (Toleranz {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
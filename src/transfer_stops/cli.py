@@ -0,0 +1,297 @@
+"""
+Kommandozeile der Pipeline: ganzer Lauf oder einzelne Stufen, auch ohne Konsole (cron, Worker).
+
+Stufen in Reihenfolge (STAGES):
+    download    ÖV-Referenzdaten und GTFS-Daten laden, bei Änderungen alte Outputs löschen
+    extract     Schweiz-Filter pro Provider ({Provider}_stops.csv), Sammeln, OEV_ABGLEICH.csv
+    clean       FlixTrain und räumliche Duplikate entfernen (nur zusammen mit assign-ids)
+    assign-ids  IDs vergeben, delta/BFKOORD_WGS und ID_AENDERUNGEN.csv schreiben
+    load        CSV-Dateien, delta/BAHNHOF und AUTO_METABHF.csv aus delta/BFKOORD_WGS
+    metabhf     delta/METABHF aus QGIS_METABHF.csv (sonst AUTO_METABHF.csv) und delta/UMSTEIGB
+    zip         delta/ nach data/processed/delta.zip
+
+Aufruf:
+    python main.py                           # download bis load, wie bisher
+    python main.py run --from load --to zip  # Stufenbereich
+    python main.py load                      # nur eine Stufe (wie run --only load)
+    python main.py run --from clean --to assign-ids
+    python main.py run --yes                 # ohne Rückfragen, z.B. aus cron (Daten bleiben erhalten)
+    python main.py run --cleanup             # Daten am Ende ohne Rückfrage löschen
+
+Ohne download werden keine Outputs gelöscht. clean schreibt selbst nichts - die bereinigte
+Tabelle wird erst mit den IDs gespeichert -, deshalb gibt es clean nur in einem Bereich mit
+assign-ids (kein eigener Befehl). Stufen vor der ersten ausgewählten werden
+nicht ausgeführt; clean und assign-ids sammeln die Tabelle dafür aus den gefilterten
+Provider-CSVs des letzten Laufs neu (ohne Download und Schweiz-Filter), load und metabhf
+lesen delta/BFKOORD_WGS bzw. delta/BAHNHOF.
+Die Rückfrage beim Zippen trotz unfertiger METABHF beantwortet --yes mit ja; ohne Konsole
+(stdin kein Terminal) und ohne --yes gilt nein. Das Löschen der Daten am Ende eines
+vollständigen Laufs ist davon getrennt: nur mit --cleanup oder nach Rückfrage auf der
+Konsole, ohne Konsole nie (sonst begänne jeder cron-Lauf ohne Manifest und Caches von vorn).
+
+Die ETL-Module werden erst in den Stufen importiert, die sie brauchen: --help und ein
+Lauf ohne Änderungen (nur Downloads) laden weder pandas noch den Geo-Stack
+(siehe benchmarks/bench_imports.py).
+"""
+import argparse
+import os
+import sys
+
+from transfer_stops import config, instrument
+from transfer_stops.log import setup_logging
+
+STAGES = ('download', 'extract', 'clean', 'assign-ids', 'load', 'metabhf', 'zip')
+# Stufen von run_pipeline (wie etl.pipeline.PIPELINE_STAGES, hier ohne die Pipeline zu importieren)
+PIPELINE_STAGES = STAGES[1:5]
+DEFAULT_LAST_STAGE = 'load'
+# Stufen, die nur zusammen mit einer späteren Stufe laufen (ihr Ergebnis wird erst dort geschrieben)
+REQUIRES_STAGE = {'clean': 'assign-ids'}
+# Stufen, die einzeln als Befehl bzw. mit run --only laufen können
+STANDALONE_STAGES = tuple(stage for stage in STAGES if stage not in REQUIRES_STAGE)
+
+STAGE_HELP = {
+    'download': "ÖV-Referenzdaten und GTFS-Daten herunterladen",
+    'extract': "Schweiz-Filter und Sammeln pro Provider",
+    'clean': "FlixTrain und räumliche Duplikate entfernen (nur mit assign-ids)",
+    'assign-ids': "IDs vergeben und delta/BFKOORD_WGS schreiben",
+    'load': "CSV-Dateien, delta/BAHNHOF und AUTO_METABHF.csv schreiben",
+    'metabhf': "delta/METABHF und delta/UMSTEIGB erstellen (Post-Processing)",
+    'zip': "Delta-Dateien zippen",
+}
+
+OUTPUT_FILES = [
+    "data/processed/delta/BFKOORD_WGS",
+    "data/processed/delta/BAHNHOF",
+    "data/processed/BFKOORD_WGS_KOMMAGETRENNT.csv",
+    "data/processed/OEV_BFKOORD_WGS_KOMMAGETRENNT.csv",
+    "data/processed/ID_AENDERUNGEN.csv",
+    "data/processed/OEV_ABGLEICH.csv",
+    "data/processed/AUTO_METABHF.csv"
+]
+
+
+def select_stages(only: str = None, first: str = None, last: str = None):
+    """
+    Ausgewählte Stufen in Reihenfolge: nur only, sonst first bis last
+    (Standard: download bis load; beginnt first nach load, bis first).
+    ValueError bei leerem Bereich oder wenn eine Stufe aus REQUIRES_STAGE ohne ihre Folgestufe bleibt.
+    """
+    if only:
+        selected = [only]
+    else:
+        start = STAGES.index(first or STAGES[0])
+        end = STAGES.index(last) if last else max(start, STAGES.index(DEFAULT_LAST_STAGE))
+        if start > end:
+            raise ValueError(f"--from {STAGES[start]} liegt nach --to {STAGES[end]}")
+        selected = list(STAGES[start:end + 1])
+    for stage, required in REQUIRES_STAGE.items():
+        if stage in selected and required not in selected:
+            raise ValueError(f"{stage} nur zusammen mit {required} (z.B. run --from {stage} --to {required}) - "
+                             f"das Ergebnis von {stage} wird erst dort gespeichert")
+    return selected
+
+
+def confirmation(assume_yes: bool = False, interactive: bool = None):
+    """
+    Funktion frage -> bool für Rückfragen: mit assume_yes immer ja, ohne Konsole immer nein,
+    sonst Eingabe auf der Konsole (ask_yes_no).
+    """
+    interactive = sys.stdin.isatty() if interactive is None else interactive
+
+    def confirm(question: str):
+        if assume_yes:
+            print(f"{question}ja (--yes)")
+            return True
+        if not interactive:
+            print(f"{question}nein (keine Konsole, --yes zum Bestätigen)")
+            return False
+        from transfer_stops.etl.load import ask_yes_no
+        return ask_yes_no(question)
+    return confirm
+
+
+def write_run_report(stages=None):
+    """Schreibt den Laufbericht (config.RUN_REPORT_PATH) mit Laufzeit/Speicher pro Stufe."""
+    instrument.write_report(config.RUN_REPORT_PATH, meta={
+        'stages': list(stages) if stages else None,
+        'provider_workers': config.PROVIDER_WORKERS,
+        'download_workers': config.DOWNLOAD_WORKERS,
+        'profile_dir': instrument.profiling_dir(),
+    })
+    print(f"\n📄 Laufbericht: {config.RUN_REPORT_PATH}")
+
+
+def download_and_reset_outputs():
+    """
+    Lädt alle Quellen herunter und löscht bei Änderungen die alten Output-Dateien.
+    Returns: Dict Provider-Name -> bool (gefilterte Haltestellen wiederverwenden),
+    None wenn keine Quelle geändert wurde
+    """
+    from transfer_stops.etl.extract import download_all_sources
+
+    # Download ÖV reference data and GTFS data in parallel
+    print("\n" + "=" * 50)
+    print("Lade ÖV-Referenzdaten und GTFS-Daten herunter...")
+    print("=" * 50)
+    oev_has_changes, download_results = download_all_sources(config.providers)
+
+    # Check if any provider or ÖV data has changes
+    if not any(download_results.values()) and not oev_has_changes:
+        print("\nℹ️ Keine Änderungen bei den Providern oder ÖV-Daten erkannt. Überspringe Verarbeitung.")
+        return None
+
+    # If there are changes, delete all output files to recreate them.
+    # In incremental mode the filtered stops of unchanged providers are kept and reused.
+    print("\n" + "=" * 50)
+    print("Änderungen erkannt - Lösche alte Output-Dateien...")
+    print("=" * 50)
+
+    for output_file in OUTPUT_FILES:
+        if os.path.exists(output_file):
+            os.remove(output_file)
+            print(f"🗑️ Gelöscht: {output_file}")
+
+    # Also delete provider-specific output files (except reusable ones in incremental mode)
+    reuse_cached = {}
+    for provider in config.providers:
+        reuse_cached[provider['name']] = (
+            config.INCREMENTAL and not download_results.get(provider['name'], True)
+        )
+        if reuse_cached[provider['name']]:
+            continue
+        if os.path.exists(provider['output_path']):
+            os.remove(provider['output_path'])
+            print(f"🗑️ Gelöscht: {provider['output_path']}")
+    return reuse_cached
+
+
+def run(stages=None, assume_yes: bool = False, cleanup: bool = None, profile_dir: str = None):
+    """
+    Führt die ausgewählten Stufen aus (Standard: download bis load).
+
+    cleanup: Clean-Up am Ende eines vollständigen Laufs (download bis load oder weiter),
+    siehe cleanup_after_run; assume_yes gilt dafür nicht.
+    Returns: True wenn alle ausgewählten Stufen ohne Fehler gelaufen sind (zip: Archiv erstellt);
+    nach einer fehlgeschlagenen Stufe laufen metabhf und zip nicht mehr
+    """
+    stages = list(stages or select_stages())
+    confirm = confirmation(assume_yes)
+    setup_logging()
+    instrument.reset()
+    instrument.enable_profiling(profile_dir)
+
+    reuse_cached = None
+    if 'download' in stages:
+        reuse_cached = download_and_reset_outputs()
+        if reuse_cached is None:
+            write_run_report(stages)
+            print("\n" + "=" * 50)
+            print("✅ ETL-Pipeline abgeschlossen!")
+            print("=" * 50)
+            return True
+
+    ok = True
+    pipeline_stages = [stage for stage in stages if stage in PIPELINE_STAGES]
+    if pipeline_stages:
+        from transfer_stops.etl.pipeline import run_pipeline
+        # Extract, transform and load all providers in memory (unchanged providers reuse their filtered stops)
+        ok = run_pipeline(config.providers, reuse_cached, pipeline_stages)
+    if 'metabhf' in stages and ok:
+        from transfer_stops.etl.metabhf import postprocess_metabhf
+        with instrument.stage('METABHF-Nachbearbeitung'):
+            ok = postprocess_metabhf()
+    if 'zip' in stages and ok:
+        from transfer_stops.etl.load import zip_delta_files
+        with instrument.stage('Zip'):
+            ok = zip_delta_files(confirm)
+    write_run_report(stages)
+
+    print("\n" + "=" * 50)
+    print("✅ ETL-Pipeline abgeschlossen!" if ok else "⚠️ ETL-Pipeline mit Fehlern beendet")
+    print("=" * 50)
+
+    full_run = 'download' in stages and 'load' in stages
+    if full_run and cleanup is not False:
+        cleanup_after_run(cleanup)
+    return ok
+
+
+def cleanup_after_run(cleanup: bool = None, interactive: bool = None):
+    """
+    Löscht die generierten Rohdaten und Output-Dateien (clean_data).
+    cleanup=True ohne Rückfrage; None fragt auf der Konsole nach und lässt ohne Konsole
+    alles stehen - unabhängig von --yes, damit unbeaufsichtigte Läufe inkrementell bleiben.
+    """
+    interactive = sys.stdin.isatty() if interactive is None else interactive
+    if cleanup is None:
+        if not interactive:
+            print("\nℹ️ Dateien bleiben erhalten (keine Konsole, --cleanup zum Löschen).")
+            return
+        # Frage ob Daten gelöscht werden sollen
+        print("\n⚠️  Möchtest du die generierten Rohdaten und Output-Dateien löschen?")
+        print("   - Alle Dateien in data/processed/ (ausser QGIS-METABHF.csv)")
+        print("   - Alle Dateien in data/raw/")
+        print()
+        from transfer_stops.etl.load import ask_yes_no
+        cleanup = ask_yes_no("Dateien löschen? (ja/nein): ")
+    if cleanup:
+        from transfer_stops.clean_data import clean_data
+        clean_data()
+    else:
+        print("\n✅ Dateien bleiben erhalten.")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Generate transfer stops for coach providers.",
+        epilog="Stufen: " + ", ".join(STAGES) + ". Ohne Befehl: run (download bis load)."
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--yes', '-y', action='store_true',
+                        help="Rückfragen mit ja beantworten (nicht das Löschen der Daten, siehe --cleanup)")
+    cleanup = common.add_mutually_exclusive_group()
+    cleanup.add_argument('--cleanup', action='store_true',
+                         help="am Ende eines vollständigen Laufs die Daten ohne Rückfrage löschen")
+    cleanup.add_argument('--no-cleanup', action='store_true', help="am Ende nicht nach dem Löschen der Daten fragen")
+    common.add_argument(
+        '--profile', nargs='?', const=os.path.join(config.CACHE_DIR, 'profile'), default=None, metavar='DIR',
+        help="write one cProfile dump per stage (default folder: cache/profile)"
+    )
+
+    subparsers = parser.add_subparsers(dest='command', metavar='BEFEHL')
+    run_parser = subparsers.add_parser(
+        'run', parents=[common], help="Stufenbereich ausführen (Standard: download bis load)"
+    )
+    selection = run_parser.add_mutually_exclusive_group()
+    selection.add_argument('--only', choices=STANDALONE_STAGES, help="nur diese Stufe")
+    selection.add_argument('--from', dest='first', choices=STAGES, help="ab dieser Stufe")
+    run_parser.add_argument('--to', dest='last', choices=STAGES, help="bis zu dieser Stufe")
+    for stage in STANDALONE_STAGES:
+        subparsers.add_parser(stage, parents=[common], help=STAGE_HELP[stage])
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = build_parser()
+    if not argv or argv[0].startswith('-') and argv[0] not in ('-h', '--help'):
+        argv = ['run'] + argv
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        if args.only and args.last:
+            parser.error("--to nur zusammen mit --from")
+        try:
+            stages = select_stages(args.only, args.first, args.last)
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        stages = [args.command]
+
+    cleanup = True if args.cleanup else False if args.no_cleanup else None
+    ok = run(stages, assume_yes=args.yes, cleanup=cleanup, profile_dir=args.profile)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,9 +3,60 @@
 # Start-ID für neue Haltestellen
 BEGINNING_ID = 1700000
 
+# Persistentes ID-Register (Haltestelle -> ID), damit IDs über Läufe stabil bleiben
+ID_REGISTRY_PATH = 'data/id_registry.json'
+
+# Cache-Ordner (Landesgrenze, Manifest mit Hashes)
+CACHE_DIR = 'cache'
+
+# Hashes immer neu berechnen und mit dem Manifest vergleichen (statt Grösse/Änderungszeit zu vertrauen)
+VERIFY_HASHES = False
+
+# Schweizer Landesgrenze (swissBOUNDARIES3D)
+BOUNDARY_PATH = 'data\\external\\swissBOUNDARIES3D_1_5_LV95_LN02.gpkg'
+
+# Stage-Cache (cache/stages/): Ergebnisse unveränderter Stufen wiederverwenden, Grösse begrenzt (MB, älteste zuerst entfernt)
+STAGE_CACHE = True
+STAGE_CACHE_MAX_MB = 1024
+
+# Inkrementell: gefilterte Haltestellen unveränderter Provider aus dem letzten Lauf wiederverwenden
+INCREMENTAL = True
+
+# Haltestellen näher als dieser Radius (Meter) an einer ÖV-Haltestelle gelten als ÖV-Haltestelle (0 = nur exakt gleiche Koordinate)
+OEV_MATCH_RADIUS_METERS = 10
+
+# Automatische METABHF-Vorschläge: Suchradius (Meter), Anzahl ÖV-Haltestellen pro neuer Haltestelle,
+# Gehgeschwindigkeit (Meter pro Minute) und minimale Umsteigezeit (Minuten)
+METABHF_RADIUS_METERS = 500
+METABHF_MAX_CANDIDATES = 1
+METABHF_WALKING_SPEED_M_PER_MIN = 60
+METABHF_MIN_TRANSFER_MINUTES = 2
+
 # ÖV-Referenzdaten URL
 OEV_SAMMLUNG_URL = 'https://data.opentransportdata.swiss/dataset/timetable-54-2025-hrdf/resource_permalink/oev_sammlung_ch_hrdf_5_40_41_2025_20251128_211010.zip'
 
+# CSV-Parser für stops.txt: 'auto' = pyarrow falls installiert, sonst 'c' (pandas)
+CSV_ENGINE = 'auto'
+
+# Laufbericht (JSON): Laufzeit, CPU-Zeit, Anstieg des Spitzen-RSS, Zeilen und Bytes pro Stufe und Provider
+RUN_REPORT_PATH = 'data/processed/LAUFBERICHT.json'
+
+# Logging: Level (DEBUG zeigt Details pro Haltestelle) und Ausgabe als JSON-Zeilen statt Text
+LOG_LEVEL = 'INFO'
+LOG_JSON = False
+
+# Anzahl Prozesse für Extract/Schweiz-Filter der Provider (1 = nacheinander im Hauptprozess)
+PROVIDER_WORKERS = 1
+
+# Anzahl paralleler Downloads (ÖV-Sammlung + Provider-GTFS)
+DOWNLOAD_WORKERS = 4
+
+# Downloads werden in Blöcken dieser Grösse auf Disk gespoolt (Bytes)
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Nur zentrales ZIP-Verzeichnis + benötigte Dateien per HTTP-Range laden (falls Server es unterstützt)
+HTTP_RANGE_DOWNLOADS = False
+
 # ÖV-Referenzdateien
 oev_files = ['BAHNHOF', 'BFKOORD_WGS', 'METABHF', 'UMSTEIGB']
 
@@ -0,0 +1,113 @@
+"""
+Cache für die Schweizer Landesgrenze (swissBOUNDARIES3D, Layer tlm_landesgebiet).
+
+geopandas und shapely werden erst beim Lesen/Bauen der Grenze importiert.
+"""
+import json
+import os
+
+from transfer_stops import config
+from transfer_stops.io_utils import atomic_write
+from transfer_stops.log import get_logger
+from transfer_stops.manifest import get_manifest
+
+logger = get_logger('boundary')
+
+BOUNDARY_LAYER = 'tlm_landesgebiet'
+CACHE_VERSION = 2
+
+
+def swiss_bbox_wgs84(boundary, margin_deg: float = 0.01):
+    """
+    Berechnet die Bounding-Box der Landesgrenze in WGS84 (EPSG:4326) mit Sicherheitsrand.
+
+    Die LV95-Box wird vor der Transformation verdichtet, damit gekrümmte Kanten
+    nach der Projektion vollständig in der WGS84-Box liegen.
+    """
+    import geopandas as gpd
+    import shapely
+
+    envelope = shapely.segmentize(shapely.box(*boundary.total_bounds), max_segment_length=1000)
+    minx, miny, maxx, maxy = gpd.GeoSeries([envelope], crs=boundary.crs).to_crs('EPSG:4326').total_bounds
+    return minx - margin_deg, miny - margin_deg, maxx + margin_deg, maxy + margin_deg
+
+
+def _cache_paths(cache_dir):
+    return (os.path.join(cache_dir, 'swiss_boundary.wkb'),
+            os.path.join(cache_dir, 'swiss_boundary.json'))
+
+
+def build_boundary_cache(gpkg_path: str, cache_dir: str = None, source_hash: str = None):
+    """
+    Liest tlm_landesgebiet, vereinigt alle Polygone zu einer Geometrie und speichert
+    sie als WKB zusammen mit Metadaten (Quell-Hash, CRS, Bounding-Boxen).
+    Die Geometrie wird nicht vereinfacht - alle Stützpunkte bleiben erhalten.
+    cache_dir: Standard config.CACHE_DIR
+    """
+    import geopandas as gpd
+    import shapely
+
+    cache_dir = config.CACHE_DIR if cache_dir is None else cache_dir
+    wkb_path, meta_path = _cache_paths(cache_dir)
+    landesgebiet = gpd.read_file(gpkg_path, layer=BOUNDARY_LAYER)
+    boundary = gpd.GeoDataFrame(geometry=[landesgebiet.union_all()], crs=landesgebiet.crs)
+
+    meta = {
+        'version': CACHE_VERSION,
+        'source': os.path.abspath(gpkg_path),
+        'source_hash': source_hash or get_manifest().file_hash(gpkg_path),
+        'layer': BOUNDARY_LAYER,
+        'crs': boundary.crs.to_wkt(),
+        'bounds': list(boundary.total_bounds),
+        'bbox_wgs84': list(swiss_bbox_wgs84(boundary)),
+    }
+
+    with atomic_write(wkb_path, 'wb') as f:
+        f.write(shapely.to_wkb(boundary.geometry.iloc[0]))
+    with atomic_write(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    logger.info(f"✅ Landesgrenze-Cache erstellt: {wkb_path}")
+    return boundary, meta
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('version') == CACHE_VERSION else None
+
+
+def load_swiss_boundary(gpkg_path: str, cache_dir: str = None):
+    """
+    Lädt die vereinigte Landesgrenze aus dem Cache, baut ihn bei Bedarf neu.
+
+    Gültig ist der Cache, wenn Pfad und Inhalts-Hash des GeoPackage mit den Metadaten
+    übereinstimmen. Der Hash kommt aus dem Manifest und wird nur neu berechnet, wenn
+    sich Grösse oder Änderungszeit der Datei geändert haben.
+    cache_dir: Standard config.CACHE_DIR
+
+    Returns: (GeoDataFrame mit einer Geometrie, Metadaten-Dict)
+    """
+    if not os.path.exists(gpkg_path):
+        raise FileNotFoundError(f"Landesgrenze-Datei nicht gefunden: {gpkg_path}")
+    cache_dir = config.CACHE_DIR if cache_dir is None else cache_dir
+
+    wkb_path, meta_path = _cache_paths(cache_dir)
+    meta = _read_meta(meta_path) if os.path.exists(wkb_path) else None
+    if meta is None or meta['source'] != os.path.abspath(gpkg_path):
+        return build_boundary_cache(gpkg_path, cache_dir)
+
+    source_hash = get_manifest().file_hash(gpkg_path)
+    if source_hash != meta['source_hash']:
+        logger.info("ℹ️ Landesgrenze geändert - erstelle Cache neu")
+        return build_boundary_cache(gpkg_path, cache_dir, source_hash)
+
+    import geopandas as gpd
+    import shapely
+
+    with open(wkb_path, 'rb') as f:
+        geometry = shapely.from_wkb(f.read())
+    return gpd.GeoDataFrame(geometry=[geometry], crs=meta['crs']), meta
@@ -1,28 +1,34 @@
-"""GTFS-Daten herunterladen und Schweizer Haltestellen extrahieren."""
-import pandas as pd
-import geopandas as gpd
+"""
+GTFS-Daten herunterladen und Schweizer Haltestellen extrahieren.
+
+pandas, geopandas und shapely werden erst in den Funktionen importiert, die sie brauchen:
+ein Lauf ohne Änderungen (nur Downloads) lädt den Geo-Stack nie.
+"""
+import importlib.util
 import os
-import requests
-import zipfile
-from io import BytesIO
-import hashlib
-from transfer_stops import config
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from transfer_stops import config, instrument
+from transfer_stops.manifest import get_manifest
+from transfer_stops.etl import boundary
+from transfer_stops.etl.boundary import load_swiss_boundary, swiss_bbox_wgs84
+from transfer_stops.etl.fetch import extract_member_if_changed, open_remote_zip
+from transfer_stops.log import get_logger
+from transfer_stops.stage_cache import code_version, get_stage_cache, stage_key
+
+logger = get_logger('extract')
 
 
 def get_file_hash(filepath):
     """
-    Berechnet MD5-Hash einer Datei.
+    Gibt den Inhalts-Hash einer Datei zurück (None wenn sie nicht existiert).
     Wird verwendet um zu prüfen ob sich der Inhalt von stops.txt geändert hat,
     damit die Pipeline nur bei tatsächlichen Änderungen neu ausgeführt wird.
+    Der Hash kommt aus dem Manifest (cache/manifest.json); die Datei wird nur
+    neu gelesen, wenn sich Grösse oder Änderungszeit geändert haben.
     """
-    if not os.path.exists(filepath):
-        return None
-    
-    md5_hash = hashlib.md5()
-    with open(filepath, 'rb') as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            md5_hash.update(chunk)
-    return md5_hash.hexdigest()
+    return get_manifest().file_hash(filepath)
 
 
 def download_oev_sammlung():
@@ -30,44 +36,44 @@ def download_oev_sammlung():
     Lädt ÖV-Referenzdaten herunter (BAHNHOF, BFKOORD_WGS, METABHF, UMSTEIGB).
     Gibt True zurück wenn Dateien aktualisiert wurden, False wenn keine Änderungen.
     """
-    print("\n=== Lade ÖV-Referenzdaten herunter ===")
+    logger.info("\n=== Lade ÖV-Referenzdaten herunter ===")
     
     url = config.OEV_SAMMLUNG_URL
     output_dir = 'data/raw/oevSammlung'
     
     try:
-        print(f"Lade ÖV-Daten herunter von: opentransportdata.swiss")
-        response = requests.get(url, timeout=120)
-        response.raise_for_status()
-        
+        logger.info(f"Lade ÖV-Daten herunter von: opentransportdata.swiss")
         os.makedirs(output_dir, exist_ok=True)
         
+        # Bedingter Request nur wenn alle Dateien lokal vorhanden sind
+        local_complete = all(os.path.exists(os.path.join(output_dir, f)) for f in config.oev_files)
+        
         has_changes = False
-        with zipfile.ZipFile(BytesIO(response.content)) as zip_file:
+        with open_remote_zip(url, conditional=local_complete) as zip_file:
+            if zip_file is None:
+                logger.info("  ℹ️ ÖV-Daten unverändert (HTTP 304)")
+                return False
+            names = zip_file.namelist()
             for file_name in config.oev_files:
-                if file_name in zip_file.namelist():
-                    new_content = zip_file.read(file_name)
-                    new_hash = hashlib.md5(new_content).hexdigest()
-                    
+                if file_name in names:
                     output_file = os.path.join(output_dir, file_name)
                     existing_hash = get_file_hash(output_file)
                     
-                    if existing_hash != new_hash:
-                        with open(output_file, 'wb') as f:
-                            f.write(new_content)
+                    if extract_member_if_changed(zip_file, file_name, output_file, existing_hash, source=url):
                         status = "erstellt" if existing_hash is None else "aktualisiert"
-                        print(f"  ✅ {file_name} {status}")
+                        logger.info(f"  ✅ {file_name} {status}")
+                        _record_written(output_file)
                         has_changes = True
                     else:
-                        print(f"  ℹ️ {file_name} unverändert")
+                        logger.info(f"  ℹ️ {file_name} unverändert")
                 else:
-                    print(f"  ⚠️ {file_name} nicht im ZIP gefunden")
+                    logger.warning(f"  ⚠️ {file_name} nicht im ZIP gefunden")
         
         return has_changes
         
     except Exception as e:
-        print(f"❌ Fehler beim Download der ÖV-Daten: {e}")
-        print("ℹ️ Verwende vorhandene Dateien falls verfügbar")
+        logger.error(f"❌ Fehler beim Download der ÖV-Daten: {e}")
+        logger.info("ℹ️ Verwende vorhandene Dateien falls verfügbar")
         return False
 
 
@@ -75,78 +81,262 @@ def download_and_extract_gtfs(url: str, output_dir: str):
     """
     Lädt GTFS-ZIP herunter und extrahiert stops.txt.
     Gibt True zurück wenn Datei aktualisiert wurde, False wenn keine Änderungen.
+    Der Download wird gestreamt (siehe fetch.open_remote_zip), das ZIP liegt nie
+    vollständig im Speicher.
     """
-    print(f"Lade Daten herunter von: {url}")
-    
-    response = requests.get(url, timeout=120)
-    response.raise_for_status()
+    logger.info(f"Lade Daten herunter von: {url}")
     
     os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, 'stops.txt')
+    existing_hash = get_file_hash(output_file)
     
-    with zipfile.ZipFile(BytesIO(response.content)) as zip_file:
+    with open_remote_zip(url, conditional=existing_hash is not None) as zip_file:
+        if zip_file is None:
+            logger.info(f"ℹ️ Keine Änderungen in stops.txt erkannt (HTTP 304)")
+            return False
         if 'stops.txt' not in zip_file.namelist():
             raise FileNotFoundError("stops.txt nicht in ZIP-Datei gefunden")
-        new_content = zip_file.read('stops.txt')
-    
-    new_hash = hashlib.md5(new_content).hexdigest()
-    output_file = os.path.join(output_dir, 'stops.txt')
-    existing_hash = get_file_hash(output_file)
+        changed = extract_member_if_changed(zip_file, 'stops.txt', output_file, existing_hash, source=url)
     
-    if existing_hash == new_hash:
-        print(f"ℹ️ Keine Änderungen in stops.txt erkannt")
+    if not changed:
+        logger.info(f"ℹ️ Keine Änderungen in stops.txt erkannt")
         return False
     
-    with open(output_file, 'wb') as f:
-        f.write(new_content)
-    
     status = "erstellt" if existing_hash is None else "aktualisiert"
-    print(f"✅ stops.txt {status} in: {output_dir}")
+    _record_written(output_file)
+    logger.info(f"✅ stops.txt {status} in: {output_dir}")
     return True
 
 
-def download_all_providers(providers):
-    """Lädt GTFS-Daten für alle Provider herunter."""
-    results = {}
+def _record_written(path: str):
+    record = instrument.current()
+    if record is not None:
+        record.wrote_file(path)
+
+
+def _measured(stage_name: str, provider: str, func, *args):
+    """Führt func(*args) als gemessene Stufe aus (im Download-Thread)."""
+    with instrument.stage(stage_name, provider):
+        return func(*args)
+
+
+def _submit_provider_downloads(executor, providers):
+    """Startet die GTFS-Downloads aller Provider im Executor. Gibt {name: Future} zurück."""
+    futures = {}
     for provider in providers:
         if 'gtfs_url' not in provider:
-            results[provider['name']] = True
             continue
-        
         output_dir = os.path.dirname(provider['input_path'])
-        print(f"\nLade {provider['name']} herunter...")
-        
+        logger.info(f"\nLade {provider['name']} herunter...")
+        futures[provider['name']] = executor.submit(
+            _measured, 'Download', provider['name'], download_and_extract_gtfs, provider['gtfs_url'], output_dir
+        )
+    return futures
+
+
+def _collect_provider_results(providers, futures):
+    """
+    Sammelt die Ergebnisse in Config-Reihenfolge. Ein fehlgeschlagener Download
+    bricht die anderen nicht ab; der erste Fehler wird danach weitergereicht.
+    """
+    results = {}
+    first_error = None
+    for provider in providers:
+        name = provider['name']
+        if name not in futures:
+            results[name] = True
+            continue
         try:
-            results[provider['name']] = download_and_extract_gtfs(provider['gtfs_url'], output_dir)
+            results[name] = futures[name].result()
         except Exception as e:
-            print(f"❌ Fehler: {e}")
-            raise
-    
+            logger.error(f"❌ Fehler bei {name}: {e}")
+            first_error = first_error or e
+    if first_error is not None:
+        raise first_error
     return results
 
 
+def download_all_providers(providers, max_workers: int = None):
+    """Lädt GTFS-Daten für alle Provider parallel herunter (max_workers: Standard config.DOWNLOAD_WORKERS)."""
+    max_workers = config.DOWNLOAD_WORKERS if max_workers is None else max_workers
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = _submit_provider_downloads(executor, providers)
+    return _collect_provider_results(providers, futures)
+
+
+def download_all_sources(providers, max_workers: int = None):
+    """
+    Lädt ÖV-Referenzdaten und alle Provider-GTFS gleichzeitig in einem Thread-Pool.
+    Die Laufzeit entspricht damit dem grössten statt der Summe aller Downloads.
+    max_workers: Standard config.DOWNLOAD_WORKERS
+
+    Returns: (oev_has_changes, {provider_name: has_changes})
+    """
+    max_workers = config.DOWNLOAD_WORKERS if max_workers is None else max_workers
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        oev_future = executor.submit(_measured, 'Download', 'ÖV', download_oev_sammlung)
+        futures = _submit_provider_downloads(executor, providers)
+    return oev_future.result(), _collect_provider_results(providers, futures)
+
+
+def filter_points_in_boundary(df, boundary, stop_lat: str, stop_long: str, bbox_wgs84=None):
+    """
+    Gibt die Haltestellen innerhalb der Landesgrenze als GeoDataFrame (CRS der Grenze) zurück.
+
+    1. Bounding-Box-Vorfilter in WGS84: klar ausländische Punkte werden ohne
+       CRS-Transformation verworfen.
+    2. Punkt-in-Polygon für die restlichen Punkte gesammelt über einen STRtree der
+       Grenzpolygone (GEOS prepared geometries), statt jeden Punkt einzeln gegen
+       alle Polygone zu testen. Ein Punkt wird behalten, wenn er in mindestens einem
+       Polygon liegt - gleiche Semantik wie contains(pt).any().
+    """
+    import geopandas as gpd
+    import numpy as np
+    import shapely
+
+    minx, miny, maxx, maxy = bbox_wgs84 if bbox_wgs84 is not None else swiss_bbox_wgs84(boundary)
+    lon, lat = df[stop_long].to_numpy(), df[stop_lat].to_numpy()
+    in_bbox = (lon >= minx) & (lon <= maxx) & (lat >= miny) & (lat <= maxy)
+    candidates = df[in_bbox]
+
+    points = gpd.GeoSeries(
+        gpd.points_from_xy(candidates[stop_long], candidates[stop_lat]),
+        index=candidates.index,
+        crs='EPSG:4326'
+    ).to_crs(boundary.crs)
+
+    tree = shapely.STRtree(boundary.geometry.values)
+    point_idx, _ = tree.query(points.values, predicate='within')
+    inside = np.zeros(len(points), dtype=bool)
+    inside[point_idx] = True
+
+    return gpd.GeoDataFrame(candidates[inside].copy(), geometry=points[inside], crs=boundary.crs)
+
+
+# Spalten mit (fast) eindeutigen Werten werden als Text gelesen, alle übrigen als Kategorie
+TEXT_COLUMNS = ('stop_id', 'stop_code', 'stop_name', 'stop_desc', 'stop_url', 'parent_station', 'geometry')
+
+
+def csv_engine():
+    """CSV-Parser gemäss config.CSV_ENGINE; 'auto' nimmt pyarrow (mehrere Threads) falls installiert."""
+    if config.CSV_ENGINE != 'auto':
+        return config.CSV_ENGINE
+    return 'pyarrow' if importlib.util.find_spec('pyarrow') is not None else 'c'
+
+
+def read_stops_csv(input_path: str, stop_lat: str, stop_long: str, columns_to_drop=()):
+    """
+    Liest eine Haltestellen-CSV (GTFS stops.txt oder gefilterte Provider-CSV) nur mit den
+    benötigten Spalten und festen Typen statt Typ-Erkennung für jede Spalte:
+    Koordinaten float64, Text-Spalten (TEXT_COLUMNS) als Text, alle übrigen kategorisch.
+
+    Zuerst wird nur die Kopfzeile gelesen; Spalten aus columns_to_drop werden gar nicht erst geparst.
+    """
+    import pandas as pd
+
+    header = pd.read_csv(input_path, nrows=0).columns
+    dropped = set(columns_to_drop)
+    usecols = [col for col in header if col not in dropped]
+    dtype = {}
+    for col in usecols:
+        if col in (stop_lat, stop_long):
+            dtype[col] = 'float64'
+        elif col in TEXT_COLUMNS:
+            dtype[col] = 'str'
+        else:
+            dtype[col] = 'category'
+    return pd.read_csv(input_path, usecols=usecols, dtype=dtype, engine=csv_engine())
+
+
 def extract_swiss_stops_csv(input_path: str, output_path: str, provider_name: str, 
-                            stop_lat: str, stop_long: str, 
-                            geojson_path: str = 'data\\external\\swissBOUNDARIES3D_1_5_LV95_LN02.gpkg'):
-    """Liest CSV, filtert Schweizer Haltestellen und schreibt Ergebnis."""
-    df = pd.read_csv(input_path)
-    df[stop_lat] = df[stop_lat].astype(float)
-    df[stop_long] = df[stop_long].astype(float)
-    
-    if not os.path.exists(geojson_path):
-        raise FileNotFoundError(f"Landesgrenze-Datei nicht gefunden: {geojson_path}")
+                            stop_lat: str, stop_long: str, geojson_path: str = None, columns_to_drop=()):
+    """
+    Liest CSV (ohne columns_to_drop), filtert Schweizer Haltestellen und schreibt Ergebnis
+    (falls output_path gesetzt).
+    """
+    import pandas as pd
+
+    geojson_path = geojson_path or config.BOUNDARY_PATH
+    df = read_stops_csv(input_path, stop_lat, stop_long, columns_to_drop)
+    record = instrument.current()
+    if record is not None:
+        record.rows(rows_in=len(df))
     
-    # Lese GeoPackage mit tlm_landesgebiet Layer (Schweizer Landesgrenze)
-    swiss_landesgebiet = gpd.read_file(geojson_path, layer='tlm_landesgebiet')
-    gdf_points = gpd.GeoDataFrame(
-        df, 
-        geometry=gpd.points_from_xy(df[stop_long], df[stop_lat]), 
-        crs='EPSG:4326'
+    # Vereinigte Landesgrenze (tlm_landesgebiet) aus dem Cache, bei Änderung des GeoPackage neu aufgebaut
+    swiss_landesgebiet, boundary_meta = load_swiss_boundary(geojson_path)
+    swiss_stops_df = filter_points_in_boundary(
+        df, swiss_landesgebiet, stop_lat, stop_long, bbox_wgs84=boundary_meta['bbox_wgs84']
     )
-    gdf_points = gdf_points.to_crs(swiss_landesgebiet.crs)
-    
-    mask = gdf_points.geometry.apply(lambda pt: swiss_landesgebiet.contains(pt).any())
-    swiss_stops_df = gdf_points[mask].copy()
-    swiss_stops_df['provider'] = provider_name
-    swiss_stops_df.to_csv(output_path, index=False)
+    swiss_stops_df['provider'] = pd.Categorical([provider_name] * len(swiss_stops_df))
+    if output_path:
+        swiss_stops_df.to_csv(output_path, index=False)
     
     return swiss_stops_df
+
+
+def swiss_stops_cache_inputs(provider_config, geojson_path: str = None):
+    """
+    Eingaben, von denen die gefilterte Provider-CSV abhängt: Hash von stops.txt,
+    Hash der Landesgrenze und die Spalten-Konfiguration des Providers.
+    """
+    return {
+        'stops': get_file_hash(provider_config['input_path']),
+        'boundary': get_file_hash(geojson_path or config.BOUNDARY_PATH),
+        'lat': provider_config['lat'],
+        'lon': provider_config['lon'],
+        'columns_to_drop': list(provider_config['columns_to_drop']),
+    }
+
+
+def record_swiss_stops(provider_config, geojson_path: str = None):
+    """Vermerkt im Manifest, aus welchen Eingaben output_path erzeugt wurde."""
+    get_manifest().record_derived(
+        provider_config['output_path'], swiss_stops_cache_inputs(provider_config, geojson_path)
+    )
+
+
+def swiss_stops_cache_current(provider_config, geojson_path: str = None):
+    """True wenn output_path aus dem aktuellen stops.txt, der Landesgrenze und der Provider-Konfiguration erzeugt wurde."""
+    output_path = provider_config['output_path']
+    if not os.path.exists(output_path):
+        return False
+    return get_manifest().is_derived_current(output_path, swiss_stops_cache_inputs(provider_config, geojson_path))
+
+
+def swiss_stops_cache_key(provider_config, geojson_path: str = None):
+    """Schlüssel der gefilterten Haltestellen im Stage-Cache: Eingaben wie swiss_stops_cache_inputs und Code-Version."""
+    return stage_key(
+        'extract', swiss_stops_cache_inputs(provider_config, geojson_path), code_version(sys.modules[__name__], boundary)
+    )
+
+
+def restore_swiss_stops(provider_config, key: str):
+    """Kopiert die gefilterten Haltestellen aus dem Stage-Cache nach output_path. Returns: True bei Treffer."""
+    cache = get_stage_cache()
+    entry = cache.get('extract', key) if cache is not None else None
+    if entry is None:
+        return False
+    try:
+        shutil.copyfile(os.path.join(entry, 'stops.csv'), provider_config['output_path'])
+    except OSError:
+        return False  # gleichzeitig entfernt
+    return True
+
+
+def store_swiss_stops(provider_config, key: str):
+    """Legt output_path (gefilterte Haltestellen) unter key im Stage-Cache ab."""
+    cache = get_stage_cache()
+    if cache is None:
+        return
+    with cache.put('extract', key, {'provider': provider_config['name']}) as entry:
+        shutil.copyfile(provider_config['output_path'], os.path.join(entry, 'stops.csv'))
+
+
+def load_cached_swiss_stops(provider_config, geojson_path: str = None):
+    """
+    Gibt die gefilterten Haltestellen aus output_path des letzten Laufs zurück, wenn
+    stops.txt, Landesgrenze und Provider-Konfiguration unverändert sind - sonst None.
+    """
+    if not swiss_stops_cache_current(provider_config, geojson_path):
+        return None
+    return read_stops_csv(provider_config['output_path'], provider_config['lat'], provider_config['lon'])
@@ -0,0 +1,207 @@
+"""HTTP-Downloads mit begrenztem Speicherbedarf: Spool auf Disk oder HTTP-Range-Zugriff auf ZIPs."""
+import io
+import tempfile
+import zipfile
+from contextlib import contextmanager
+
+import requests
+
+from transfer_stops import config
+from transfer_stops.io_utils import UnchangedContent, atomic_write
+from transfer_stops.log import get_logger
+from transfer_stops.manifest import get_manifest, new_hasher
+
+logger = get_logger('fetch')
+
+# Lesepuffer für Range-Zugriffe: klein halten, damit nicht unnötig viel vom Archiv übertragen wird
+RANGE_BUFFER_SIZE = 256 * 1024
+
+
+def conditional_headers(url: str):
+    """Header für einen bedingten Request aus den im Manifest gespeicherten Validatoren."""
+    metadata = get_manifest().source_metadata(url)
+    headers = {}
+    if metadata.get('etag'):
+        headers['If-None-Match'] = metadata['etag']
+    if metadata.get('last_modified'):
+        headers['If-Modified-Since'] = metadata['last_modified']
+    return headers
+
+
+def store_upstream_metadata(url: str, response_headers):
+    """Speichert ETag, Last-Modified und Content-Length einer Antwort im Manifest."""
+    metadata = {
+        'etag': response_headers.get('ETag'),
+        'last_modified': response_headers.get('Last-Modified'),
+        'content_length': response_headers.get('Content-Length'),
+    }
+    # Ohne Validator ist kein bedingter Request möglich
+    if not (metadata['etag'] or metadata['last_modified']):
+        metadata = None
+    get_manifest().set_source_metadata(url, metadata)
+
+
+def spool_download(url: str, timeout: int = 120, chunk_size: int = None, headers=None):
+    """
+    Lädt url blockweise in eine temporäre Datei (wird beim Schliessen gelöscht).
+    Im Speicher liegt jeweils nur ein Block (chunk_size, Standard config.DOWNLOAD_CHUNK_SIZE),
+    unabhängig von der Grösse des Downloads.
+
+    Returns: (Datei oder None bei HTTP 304, Antwort-Header)
+    """
+    chunk_size = config.DOWNLOAD_CHUNK_SIZE if chunk_size is None else chunk_size
+    with requests.get(url, timeout=timeout, stream=True, headers=headers) as response:
+        if response.status_code == 304:
+            return None, response.headers
+        response.raise_for_status()
+        spool = tempfile.TemporaryFile()
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                spool.write(chunk)
+            spool.seek(0)
+            return spool, response.headers
+        except BaseException:
+            spool.close()
+            raise
+
+
+def range_validator(response_headers):
+    """Wert für If-Range: starker ETag, sonst Last-Modified (schwache ETags sind dort nicht erlaubt)."""
+    etag = response_headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response_headers.get('Last-Modified')
+
+
+class HttpRangeFile(io.RawIOBase):
+    """
+    Lesbare, seekbare Datei über HTTP-Range-Requests.
+
+    zipfile liest damit nur das zentrale Verzeichnis am Dateiende und die Bytes der
+    benötigten Einträge - der Rest des Archivs (z.B. stop_times.txt) wird nie übertragen.
+
+    validator (ETag oder Last-Modified der HEAD-Antwort) wird als If-Range mitgeschickt: wird
+    die Datei während des Lesens ersetzt, antwortet der Server mit 200 statt 206 und das
+    Lesen bricht ab, statt das Archiv aus zwei Versionen zusammenzusetzen.
+    """
+
+    def __init__(self, url: str, size: int, session: requests.Session, timeout: int = 120, validator: str = None):
+        super().__init__()
+        self.url = url
+        self.size = size
+        self.session = session
+        self.timeout = timeout
+        self.validator = validator
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        else:
+            raise ValueError(f"Ungültiges whence: {whence}")
+        return self.position
+
+    def readinto(self, buffer):
+        if self.position >= self.size or len(buffer) == 0:
+            return 0
+        end = min(self.position + len(buffer), self.size) - 1
+        headers = {'Range': f'bytes={self.position}-{end}'}
+        if self.validator:
+            headers['If-Range'] = self.validator
+        response = self.session.get(self.url, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise IOError(f"Keine Teilantwort (HTTP {response.status_code}) für {self.url} - "
+                          f"Datei während des Lesens geändert oder keine Range-Requests")
+        data = response.content
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+@contextmanager
+def open_remote_zip(url: str, use_range: bool = None, conditional: bool = False, timeout: int = 120):
+    """
+    Öffnet ein entferntes ZIP-Archiv als zipfile.ZipFile.
+
+    use_range=True: liest per HTTP-Range nur zentrales Verzeichnis und benötigte Einträge,
+    sofern der Server 'Accept-Ranges: bytes' meldet; sonst Rückfall auf den Spool-Download.
+    use_range=False: Download wird blockweise in eine temporäre Datei geschrieben.
+    Standard ist config.HTTP_RANGE_DOWNLOADS.
+
+    conditional=True: bedingter Request mit den Validatoren aus dem Manifest. Ist die
+    Quelle unverändert (HTTP 304), wird None geliefert. Die neuen Validatoren werden erst
+    gespeichert, wenn der with-Block ohne Fehler verlassen wurde.
+    """
+    if use_range is None:
+        use_range = config.HTTP_RANGE_DOWNLOADS
+    headers = conditional_headers(url) if conditional else {}
+
+    if use_range:
+        session = requests.Session()
+        try:
+            head = session.head(url, timeout=timeout, allow_redirects=True, headers=headers)
+            if head.status_code == 304:
+                yield None
+                return
+            head.raise_for_status()
+            size = int(head.headers.get('Content-Length', 0))
+            if head.headers.get('Accept-Ranges', '').lower() == 'bytes' and size > 0:
+                raw = HttpRangeFile(head.url, size, session, timeout, range_validator(head.headers))
+                with zipfile.ZipFile(io.BufferedReader(raw, buffer_size=RANGE_BUFFER_SIZE)) as zip_file:
+                    yield zip_file
+                store_upstream_metadata(url, head.headers)
+                return
+            logger.info("ℹ️ Server unterstützt keine Range-Requests - lade vollständig herunter")
+        finally:
+            session.close()
+
+    spool, response_headers = spool_download(url, timeout, headers=headers)
+    if spool is None:
+        yield None
+        return
+    with spool:
+        with zipfile.ZipFile(spool) as zip_file:
+            yield zip_file
+    store_upstream_metadata(url, response_headers)
+
+
+def extract_member_if_changed(zip_file, member: str, output_file: str, existing_hash, source: str = None,
+                              chunk_size: int = None):
+    """
+    Entpackt member blockweise nach output_file, falls sich der Inhalt geändert hat.
+
+    Der Inhalt wird beim Entpacken in eine temporäre Datei gehasht und nur bei
+    abweichendem Hash übernommen (atomic_write). Der neue Hash wird mit der
+    Quell-URL ins Manifest eingetragen, damit er beim nächsten Lauf nicht neu
+    berechnet werden muss.
+    chunk_size: Standard config.DOWNLOAD_CHUNK_SIZE
+
+    Returns: True wenn output_file geschrieben wurde, sonst False
+    """
+    chunk_size = config.DOWNLOAD_CHUNK_SIZE if chunk_size is None else chunk_size
+    hasher = new_hasher()
+    with atomic_write(output_file, 'wb') as out:
+        with zip_file.open(member) as src:
+            for chunk in iter(lambda: src.read(chunk_size), b""):
+                hasher.update(chunk)
+                out.write(chunk)
+        if hasher.hexdigest() == existing_hash:
+            raise UnchangedContent()
+    if hasher.hexdigest() == existing_hash:
+        return False
+    get_manifest().record(output_file, hasher.hexdigest(), source=source)
+    return True
@@ -3,95 +3,118 @@ import os
 import zipfile
 import re
 
+from transfer_stops.etl.transform import DELTA_BFKOORD_PATH, parse_bfkoord_wgs
+from transfer_stops.id_registry import format_id
+from transfer_stops.io_utils import atomic_write
+from transfer_stops.log import count, get_logger
 
-def write_bahnhof_format(transportProvider: str):
-    """Extrahiert Einträge eines Providers und schreibt sie im BAHNHOF-Format."""
-    input_file = "data/processed/delta/BFKOORD_WGS"
-    output_file = "data/processed/delta/BAHNHOF"
+logger = get_logger('load')
 
-    if not os.path.exists(input_file):
-        print(f"Datei nicht gefunden: {input_file}")
-        return
+DELTA_BAHNHOF_PATH = 'data/processed/delta/BAHNHOF'
 
-    # Einträge des Providers extrahieren
-    delta_entries = []
-    with open(input_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            if '%' in line and f'[{transportProvider}]' in line:
-                try:
-                    id_ = line[:8].strip()
-                    name_part = line.split('%', 1)[1].strip()
-                    name = name_part.split(f' [{transportProvider}]')[0].strip()
-                    # Format: ID (8 Zeichen linksbündig, mit Spaces gefüllt) + 5 Spaces + Name + $<1>
-                    delta_entries.append(f"{id_:<8}     {name}$<1>")
-                except Exception:
-                    continue
-
-    if not delta_entries:
-        print(f"Keine Einträge für {transportProvider} gefunden")
-        return
 
-    # Erstelle Ordner falls nicht vorhanden
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+def bahnhof_lines(entries, transportProviders):
+    """BAHNHOF-Zeilen pro Provider (Dict in Reihenfolge von transportProviders), in einem Durchgang über die Einträge."""
+    lines = {transportProvider: [] for transportProvider in transportProviders}
+    for entry in entries:
+        provider_lines = lines.get(entry['provider'])
+        if provider_lines is None:
+            continue
+        name = entry['name'].split(f" [{entry['provider']}]")[0].strip()
+        # Format: ID (8 Zeichen linksbündig, mit Spaces gefüllt) + 5 Spaces + Name + $<1>
+        provider_lines.append(f"{format_id(entry['id']):<8}     {name}$<1>\n")
+    return lines
+
+
+def write_bahnhof(entries, transportProviders, output_file: str = DELTA_BAHNHOF_PATH, existing_lines=()):
+    """
+    Schreibt die BAHNHOF-Zeilen aller Provider (in Reihenfolge von transportProviders) in einem
+    Durchgang und atomar. existing_lines: bereits vorhandene Zeilen, die vorne erhalten bleiben;
+    gleiche Zeilen werden nicht nochmals angehängt.
+    """
+    known = set(existing_lines)
+    lines = list(existing_lines)
+    for transportProvider, provider_lines in bahnhof_lines(entries, transportProviders).items():
+        new_lines = [line for line in provider_lines if line not in known]
+        if not provider_lines:
+            logger.info(f"Keine Einträge für {transportProvider} gefunden")
+        elif not new_lines:
+            logger.info(f"ℹ️ Alle Einträge von {transportProvider} bereits vorhanden")
+        else:
+            lines.extend(new_lines)
+            known.update(new_lines)
+            count('BAHNHOF', transportProvider, len(new_lines))
+            logger.info(f"✅ {len(new_lines)} neue Einträge von {transportProvider} hinzugefügt")
+
+    with atomic_write(output_file, 'w', encoding='utf-8') as f:
+        f.write(''.join(lines))
 
-    # Bereits vorhandene Einträge laden
-    existing_entries = set()
+
+def write_bahnhof_format(transportProviders):
+    """
+    Ergänzt delta/BAHNHOF um die Einträge der Provider (Name oder Liste) aus delta/BFKOORD_WGS.
+    Die Datei wird einmal gelesen und für alle Provider zusammen geschrieben.
+    """
+    input_file = DELTA_BFKOORD_PATH
+    output_file = DELTA_BAHNHOF_PATH
+    if isinstance(transportProviders, str):
+        transportProviders = [transportProviders]
+
+    if not os.path.exists(input_file):
+        logger.warning(f"Datei nicht gefunden: {input_file}")
+        return
+
+    # Bereits vorhandene Einträge bleiben erhalten
+    existing_lines = []
     if os.path.exists(output_file):
         with open(output_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                existing_entries.add(line.rstrip('\n'))
+            existing_lines = [line.rstrip('\n') + '\n' for line in f]
 
-    # Nur neue Einträge hinzufügen
-    entries_to_add = [e for e in delta_entries if e not in existing_entries]
+    write_bahnhof(parse_bfkoord_wgs(input_file, with_ids=True), transportProviders, output_file, existing_lines)
 
-    if entries_to_add:
-        with open(output_file, 'a', encoding='utf-8') as f:
-            for entry in entries_to_add:
-                f.write(entry + '\n')
-        print(f"✅ {len(entries_to_add)} neue Einträge von {transportProvider} hinzugefügt")
-    else:
-        print(f"ℹ️ Alle Einträge von {transportProvider} bereits vorhanden")
+
+def ask_yes_no(question: str):
+    """Rückfrage auf der Konsole; True bei 'ja'/'j'/'yes'/'y'."""
+    return input(question).strip().lower() in ['ja', 'j', 'yes', 'y']
 
 
-def zip_delta_files():
+def zip_delta_files(confirm=ask_yes_no):
     """
     Zipped alle Dateien im delta/ Ordner.
-    Prüft zuerst ob metabhf existiert und korrekt formatiert ist.
+    Prüft zuerst ob METABHF existiert und korrekt formatiert ist; sonst entscheidet
+    confirm(frage) -> bool, ob trotzdem gezippt wird (Standard: Rückfrage auf der Konsole).
     """
     delta_dir = "data/processed/delta"
-    metabhf_path = os.path.join(delta_dir, "metabhf")
+    metabhf_path = os.path.join(delta_dir, "METABHF")
     output_zip = "data/processed/delta.zip"
     
-    # Prüfe ob metabhf existiert
+    # Prüfe ob METABHF existiert
     if not os.path.exists(metabhf_path):
-        print("\n⚠️  metabhf existiert nicht!")
+        print("\n⚠️  METABHF existiert nicht!")
         print("   Möchtest du die Delta-Dateien trotzdem zippen?")
-        response = input("   (ja/nein): ").strip().lower()
-        if response not in ['ja', 'j', 'yes', 'y']:
+        if not confirm("   (ja/nein): "):
             print("❌ Zippen abgebrochen.")
             return False
     else:
-        # Prüfe letzte Zeile von metabhf
+        # Prüfe letzte Zeile von METABHF
         with open(metabhf_path, 'r', encoding='utf-8') as f:
             lines = [line.strip() for line in f if line.strip()]
         
         if not lines:
-            print("\n⚠️  metabhf ist leer!")
+            print("\n⚠️  METABHF ist leer!")
             print("   Bitte führe 'python process_delta_metabhf.py' aus.")
-            response = input("   Trotzdem zippen? (ja/nein): ").strip().lower()
-            if response not in ['ja', 'j', 'yes', 'y']:
+            if not confirm("   Trotzdem zippen? (ja/nein): "):
                 print("❌ Zippen abgebrochen.")
                 return False
         else:
             last_line = lines[-1]
             # Prüfe Format: "Zahl : Zahl"
             if not re.match(r'^\d+\s*:\s*\d+$', last_line):
-                print(f"\n⚠️  metabhf ist noch nicht fertig!")
+                print(f"\n⚠️  METABHF ist noch nicht fertig!")
                 print(f"   Letzte Zeile: {last_line}")
                 print(f"   Erwartet: Format wie '8577245 : 1700007'")
                 print(f"\n   Bitte führe 'python process_delta_metabhf.py' aus.")
-                response = input("   Trotzdem zippen? (ja/nein): ").strip().lower()
-                if response not in ['ja', 'j', 'yes', 'y']:
+                if not confirm("   Trotzdem zippen? (ja/nein): "):
                     print("❌ Zippen abgebrochen.")
                     return False
     
@@ -0,0 +1,341 @@
+"""
+METABHF: automatische Vorschläge (nahe ÖV-Haltestellen für jede neue 17xxxxx-Haltestelle)
+und Nachbearbeitung des QGIS-Exports zu delta/METABHF und delta/UMSTEIGB.
+"""
+import csv
+import math
+import os
+
+import numpy as np
+
+from transfer_stops import config
+from transfer_stops.etl.load import DELTA_BAHNHOF_PATH
+from transfer_stops.etl.reference import load_oev_reference
+from transfer_stops.etl.transform import DELTA_BFKOORD_PATH, OEV_BFKOORD_PATH, parse_bfkoord_wgs
+from transfer_stops.id_registry import format_id
+from transfer_stops.io_utils import atomic_write
+from transfer_stops.log import banner, count, get_logger
+from transfer_stops.spatial import pairs_within
+
+logger = get_logger('metabhf')
+
+AUTO_METABHF_PATH = 'data/processed/AUTO_METABHF.csv'
+QGIS_METABHF_PATH = 'data/processed/QGIS_METABHF.csv'
+DELTA_METABHF_PATH = 'data/processed/delta/METABHF'
+DELTA_UMSTEIGB_PATH = 'data/processed/delta/UMSTEIGB'
+
+
+def transfer_minutes(distance_meters: float, walking_speed: float = None, min_minutes: int = None):
+    """Umsteigezeit in Minuten: Luftlinie / Gehgeschwindigkeit (m/min), aufgerundet, mindestens min_minutes."""
+    walking_speed = config.METABHF_WALKING_SPEED_M_PER_MIN if walking_speed is None else walking_speed
+    min_minutes = config.METABHF_MIN_TRANSFER_MINUTES if min_minutes is None else min_minutes
+    return max(min_minutes, math.ceil(distance_meters / walking_speed))
+
+
+def metabhf_candidates(stops, reference, radius_meters: float = None, max_per_stop: int = None):
+    """
+    Umsteige-Kandidaten zwischen neuen Haltestellen (Einträge mit 'id', 'lat', 'lon') und
+    ÖV-Haltestellen aus reference innerhalb radius_meters (Grid-Index, keine Paarvergleiche).
+    Pro Haltestelle werden die max_per_stop nächsten ÖV-Haltestellen genommen.
+
+    Returns: Liste von Dicts mit 'id', 'oev_id', 'distance', 'minutes', sortiert nach
+    Umsteigezeit und danach Reihenfolge der Haltestellen
+    """
+    radius_meters = config.METABHF_RADIUS_METERS if radius_meters is None else radius_meters
+    max_per_stop = config.METABHF_MAX_CANDIDATES if max_per_stop is None else max_per_stop
+    if not stops:
+        return []
+
+    lats = np.fromiter((stop['lat'] for stop in stops), dtype=np.float64, count=len(stops))
+    lons = np.fromiter((stop['lon'] for stop in stops), dtype=np.float64, count=len(stops))
+    i, j, d = pairs_within(lats, lons, reference.lats, reference.lons, radius_meters)
+
+    # Pro Haltestelle nach Distanz (bei Gleichstand Dateireihenfolge der ÖV-Haltestellen)
+    order = np.lexsort((j, d, i))
+    i, j, d = i[order], j[order], d[order]
+    group_start = np.searchsorted(i, i, side='left')
+    rank = np.arange(len(i)) - group_start
+    keep = rank < max_per_stop
+
+    candidates = []
+    for stop_index, oev_row, distance in zip(i[keep].tolist(), j[keep].tolist(), d[keep].tolist()):
+        candidates.append({
+            'index': stop_index,
+            'id': format_id(stops[stop_index]['id']),
+            'oev_id': str(reference.ids[oev_row]),
+            'distance': distance,
+            'minutes': transfer_minutes(distance),
+        })
+    candidates.sort(key=lambda candidate: (candidate['minutes'], candidate['index']))
+    return candidates
+
+
+def write_metabhf_csv(candidates, output_path: str = AUTO_METABHF_PATH):
+    """
+    Schreibt die Kandidaten im Format des QGIS-Exports (Spalte final_line, ein Eintrag
+    'ID1 ID2 NNN' + Zeilenumbruch + '*A Y' pro Zeile), direkt lesbar für process_metabhf_file.
+    Die Datei wird atomar geschrieben.
+    """
+    with atomic_write(output_path, 'w', encoding='utf-8', newline='') as outf:
+        writer = csv.writer(outf, lineterminator='\n')
+        writer.writerow(['final_line'])
+        writer.writerows(
+            [f"{candidate['id']} {candidate['oev_id']} {candidate['minutes']:03d}\n*A Y"] for candidate in candidates
+        )
+
+    covered = len({candidate['id'] for candidate in candidates})
+    count('METABHF', 'beziehungen', len(candidates))
+    count('METABHF', 'haltestellen', covered)
+    logger.info(f"✅ METABHF-Vorschläge: {len(candidates)} Umsteigebeziehungen für {covered} Haltestellen -> {output_path}")
+
+
+def generate_metabhf_candidates(delta_path: str = DELTA_BFKOORD_PATH, output_path: str = AUTO_METABHF_PATH):
+    """Erstellt AUTO_METABHF.csv aus delta/BFKOORD_WGS (mit IDs) und der ÖV-Referenz."""
+    if not os.path.exists(delta_path):
+        logger.warning(f"⚠️ Datei {delta_path} existiert nicht")
+        return
+    stops = parse_bfkoord_wgs(delta_path, with_ids=True)
+    write_metabhf_csv(metabhf_candidates(stops, load_oev_reference(OEV_BFKOORD_PATH)), output_path)
+
+
+def iter_qgis_metabhf_lines(csv_path: str):
+    """Zeilen eines QGIS-METABHF-Exports ohne Anführungszeichen und Header, zeilenweise gelesen."""
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            cleaned_line = line.strip()
+            # Entferne äußere und verbleibende Anführungszeichen
+            if cleaned_line.startswith('"') and cleaned_line.endswith('"'):
+                cleaned_line = cleaned_line[1:-1]
+            cleaned_line = cleaned_line.replace('"', '')
+            # Überspringe Header "final_line"
+            if cleaned_line and cleaned_line != 'final_line':
+                yield cleaned_line
+
+
+def iter_metabhf_lines(metabhf_path: str):
+    """Nicht-leere Zeilen einer METABHF-Datei, zeilenweise gelesen."""
+    with open(metabhf_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def _is_new_stop_id(stop_id: str):
+    return len(stop_id) == 7 and stop_id.isdigit() and config.BEGINNING_ID <= int(stop_id) < config.BEGINNING_ID + 100000
+
+
+class MetabhfIndex:
+    """
+    Adjazenz-Index über METABHF-Zeilen, in einem Durchgang aufgebaut (add() pro Zeile):
+
+    - transfers: ID1 -> [(ID2, Minuten), ...] aus Zeilen 'ID1 ID2 NNN' in Dateireihenfolge
+    - pairs: (ID1, ID2) aller Zeilen mit zwei 7-8-stelligen IDs, für den Abschnitt 'ID2 : ID1'
+    - invalid: Beziehungen ohne numerische Minutenangabe
+
+    Zeilen 'ID2 : ID1' und Attributzeilen ('*A Y') werden übersprungen, damit der Index
+    auch aus einer bereits verarbeiteten METABHF-Datei gleich aufgebaut wird.
+    """
+
+    def __init__(self):
+        self.transfers = {}
+        self.pairs = []
+        self.invalid = []
+
+    def add(self, line: str):
+        parts = line.split()
+        if len(parts) >= 2:
+            first_id, second_id = parts[0], parts[1]
+            if first_id.isdigit() and second_id.isdigit() and len(first_id) >= 7 and len(second_id) >= 7:
+                self.pairs.append((first_id, second_id))
+        if len(parts) >= 3 and parts[1] != ':' and not line.startswith('*'):
+            self.transfers.setdefault(parts[0], []).append((parts[1], parts[2]))
+            if not parts[2].isdigit():
+                self.invalid.append(line)
+
+    @classmethod
+    def from_lines(cls, lines):
+        index = cls()
+        for line in lines:
+            index.add(line)
+        return index
+
+    def umsteigb_number(self, stop_id: str):
+        """Umsteigezeit für UMSTEIGB: letzte 2 Stellen der ersten Beziehung von stop_id ('00' ohne Beziehung)."""
+        transfers = self.transfers.get(stop_id)
+        if not transfers:
+            return "00"
+        minutes = transfers[0][1]
+        return minutes[-2:] if len(minutes) >= 2 else minutes.zfill(2)
+
+    def validate(self, bahnhof_ids=None):
+        """
+        Prüft den Index und gibt Meldungen zurück (leer wenn alles stimmt): ungültige
+        Minutenangaben und - falls bahnhof_ids gesetzt - neue Haltestellen (17xxxxx) in
+        METABHF ohne Eintrag in BAHNHOF sowie Haltestellen aus BAHNHOF ohne Umsteigebeziehung.
+        """
+        problems = []
+        for line in self.invalid[:10]:
+            problems.append(f"Ungültige Umsteigezeit: {line}")
+        if len(self.invalid) > 10:
+            problems.append(f"... und {len(self.invalid) - 10} weitere ungültige Umsteigezeiten")
+
+        if bahnhof_ids is not None:
+            unknown = sorted(stop_id for stop_id in self.transfers
+                             if _is_new_stop_id(stop_id) and stop_id not in bahnhof_ids)
+            if unknown:
+                problems.append(f"{len(unknown)} Haltestellen in METABHF fehlen in BAHNHOF: {', '.join(unknown[:10])}")
+            without_transfer = [stop_id for stop_id in bahnhof_ids if stop_id not in self.transfers]
+            if without_transfer:
+                problems.append(f"{len(without_transfer)} Haltestellen aus BAHNHOF ohne Umsteigebeziehung (UMSTEIGB: 00)")
+        return problems
+
+
+class _NoPairsFound(Exception):
+    pass
+
+
+def process_metabhf_file(csv_path: str = None, output_path: str = DELTA_METABHF_PATH):
+    """
+    Verarbeitet METABHF.csv:
+    1. Prüft ob CSV existiert (Standard: QGIS_METABHF.csv, sonst AUTO_METABHF.csv)
+    2. Kopiert Original-Inhalt (ID1 ID2 000 *A Y Format)
+    3. Extrahiert ID-Paare
+    4. Fügt am Ende Einträge im Format "ID2 : ID1" hinzu
+
+    Returns: MetabhfIndex (Umsteigebeziehungen) bei Erfolg, sonst False
+    """
+    # Manuell erstellte QGIS-Datei hat Vorrang vor den automatischen Vorschlägen
+    if csv_path is None:
+        csv_path = QGIS_METABHF_PATH
+        if not os.path.exists(QGIS_METABHF_PATH) and os.path.exists(AUTO_METABHF_PATH):
+            logger.info(f"ℹ️ {QGIS_METABHF_PATH} nicht vorhanden - verwende {AUTO_METABHF_PATH}")
+            csv_path = AUTO_METABHF_PATH
+
+    # Prüfe ob CSV existiert
+    if not os.path.exists(csv_path):
+        logger.error(
+            f"\n❌ FEHLER: {csv_path} existiert nicht!\n"
+            f"\nDer Prozess kann nicht fortgesetzt werden.\n"
+            f"\nBitte stelle sicher, dass:\n"
+            f"  1. Die ETL-Pipeline ausgeführt wurde (python main.py)\n"
+            f"  2. METABHF in QGIS als CSV erstellt wurde (oder {AUTO_METABHF_PATH} existiert)\n"
+            f"  3. Die CSV-Datei als {csv_path} gespeichert wurde"
+        )
+        return False
+
+    logger.info(f"\n=== Verarbeite {csv_path} ===")
+
+    # Zeilenweise lesen: Original-Inhalt (ID1 ID2 000 *A Y Format) direkt schreiben,
+    # ID-Paare im Index sammeln und am Ende im Format "ID2 : ID1" anhängen
+    index = MetabhfIndex()
+    try:
+        with atomic_write(output_path, 'w', encoding='utf-8') as f:
+            for line in iter_qgis_metabhf_lines(csv_path):
+                index.add(line)
+                f.write(line + '\n')
+
+            if not index.pairs:
+                # Bisherige METABHF bleibt unverändert
+                raise _NoPairsFound()
+
+            for first_id, second_id in index.pairs:
+                f.write(f"{second_id} : {first_id}\n")
+    except _NoPairsFound:
+        logger.warning("⚠️ Keine gültigen ID-Paare gefunden")
+        return False
+    except Exception as e:
+        logger.error(f"❌ Fehler beim Lesen der CSV: {e}")
+        return False
+
+    logger.info(f"✅ Original-Inhalt kopiert")
+    logger.info(f"✅ {len(index.pairs)} ID-Paare im Format 'ID2 : ID1' hinzugefügt")
+    logger.info(f"✅ {output_path} erfolgreich erstellt")
+    return index
+
+
+def read_bahnhof_names(bahnhof_path: str = DELTA_BAHNHOF_PATH):
+    """Liest BAHNHOF zeilenweise und gibt das Mapping ID -> Name (ohne $<1>) zurück."""
+    id_to_name = {}
+    with open(bahnhof_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+
+            # Format: "ID      NAME$<1>"
+            parts = line.split(None, 1)  # Split bei erstem Whitespace
+            if len(parts) == 2:
+                id_str = parts[0].strip()
+                name_with_suffix = parts[1].strip()
+
+                # Entferne $<1> am Ende
+                name = name_with_suffix.replace('$<1>', '').strip()
+                id_to_name[id_str] = name
+    return id_to_name
+
+
+def create_umsteigb_file(bahnhof_path: str = DELTA_BAHNHOF_PATH,
+                         metabhf_path: str = DELTA_METABHF_PATH,
+                         output_path: str = DELTA_UMSTEIGB_PATH,
+                         index=None):
+    """
+    Erstellt UMSTEIGB-Datei aus BAHNHOF und METABHF.
+
+    Format: ID NUMMER NUMMER NAME
+    - ID: aus BAHNHOF
+    - NUMMER: dritte Zahl aus der ersten METABHF-Zeile der ID (2x wiederholt)
+    - NAME: aus BAHNHOF ohne $<1> am Ende
+
+    index: MetabhfIndex aus process_metabhf_file(); ohne Index wird METABHF einmal
+    zeilenweise eingelesen.
+    """
+    # Prüfe ob benötigte Dateien existieren
+    if not os.path.exists(bahnhof_path):
+        logger.error(f"\n❌ FEHLER: {bahnhof_path} existiert nicht!")
+        return False
+
+    if index is None and not os.path.exists(metabhf_path):
+        logger.error(f"\n❌ FEHLER: {metabhf_path} existiert nicht!")
+        return False
+
+    logger.info(f"\n=== Erstelle UMSTEIGB-Datei ===")
+
+    # 1. Lese BAHNHOF und extrahiere ID -> Name Mapping
+    id_to_name = read_bahnhof_names(bahnhof_path)
+
+    # 2. Umsteigebeziehungen aus dem METABHF-Index
+    if index is None:
+        index = MetabhfIndex.from_lines(iter_metabhf_lines(metabhf_path))
+
+    # 3. Schreibe UMSTEIGB-Einträge, sortierte IDs für konsistente Ausgabe
+    with atomic_write(output_path, 'w', encoding='utf-8') as f:
+        for id_str in sorted(id_to_name):
+            number = index.umsteigb_number(id_str)  # Default: 00 falls nicht in METABHF
+            f.write(f"{id_str} {number} {number} {id_to_name[id_str]}\n")
+        if not id_to_name:
+            f.write('\n')
+
+    logger.info(f"✅ UMSTEIGB erstellt: {len(id_to_name)-1} Einträge (+ Header)")
+    logger.info(f"✅ {output_path} erfolgreich erstellt")
+
+    # 4. Prüfe METABHF gegen BAHNHOF
+    for problem in index.validate(set(id_to_name)):
+        logger.warning(f"⚠️  {problem}")
+    return True
+
+
+def postprocess_metabhf(csv_path: str = None):
+    """
+    Nachbearbeitung nach der Pipeline: delta/METABHF aus QGIS_METABHF.csv (sonst
+    AUTO_METABHF.csv) und daraus delta/UMSTEIGB. Returns: True wenn METABHF erstellt wurde.
+    """
+    banner(logger, "METABHF Post-Processing")
+    metabhf_index = process_metabhf_file(csv_path)
+    if not metabhf_index:
+        return False
+
+    banner(logger, "Erstelle UMSTEIGB-Datei...")
+    if not create_umsteigb_file(index=metabhf_index):
+        logger.warning("\n⚠️  UMSTEIGB konnte nicht erstellt werden")
+    return True
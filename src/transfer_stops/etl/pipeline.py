@@ -0,0 +1,436 @@
+"""
+In-Memory-Pipeline: eine Haltestellen-Tabelle von Extract bis Load.
+
+Die Stufen reichen die Tabelle direkt weiter, statt delta/BFKOORD_WGS nach jeder
+Stufe neu zu schreiben und einzulesen; jedes Artefakt wird genau einmal (atomar) geschrieben.
+Die Tabelle ist eine Liste von Einträgen (Dicts) mit den Feldern aus STOP_FIELDS:
+'lon'/'lat' in geschriebener Genauigkeit (6 Stellen), 'name' mit Zusatz '[Provider]',
+'provider' und ab der ID-Vergabe 'id'.
+
+Einzelne Stufen (PIPELINE_STAGES) lassen sich getrennt ausführen: Zwischenstände sind die
+gefilterten {Provider}_stops.csv (nach extract) und delta/BFKOORD_WGS mit IDs (nach assign-ids).
+"""
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from transfer_stops import config, instrument, spatial
+from transfer_stops.etl import boundary, extract, transform
+from transfer_stops.etl import reference as reference_module
+from transfer_stops.etl.boundary import load_swiss_boundary
+from transfer_stops.etl.extract import (
+    extract_swiss_stops_csv, get_file_hash, read_stops_csv, record_swiss_stops, restore_swiss_stops,
+    store_swiss_stops, swiss_stops_cache_current, swiss_stops_cache_inputs, swiss_stops_cache_key
+)
+from transfer_stops.etl.load import DELTA_BAHNHOF_PATH, write_bahnhof
+from transfer_stops.etl.metabhf import AUTO_METABHF_PATH, metabhf_candidates, write_metabhf_csv
+from transfer_stops.etl.reference import load_oev_reference
+from transfer_stops.etl.transform import (
+    CLEAN_DISTANCE_METERS, DELTA_BFKOORD_PATH, OEV_BFKOORD_PATH, OEV_MATCH_REPORT_PATH, assign_ids, clean_entries,
+    collect_new_coords, drop_columns, load_used_ids, parse_bfkoord_wgs, standardize_lat_lon,
+    write_bfkoord_csv, write_bfkoord_wgs, write_oev_match_report
+)
+from transfer_stops.log import banner, count, counters, get_logger, log_counters, reset_counters
+from transfer_stops.stage_cache import code_version, get_stage_cache, stage_key
+
+logger = get_logger('pipeline')
+
+BFKOORD_CSV_PATH = 'data/processed/BFKOORD_WGS_KOMMAGETRENNT.csv'
+OEV_BFKOORD_CSV_PATH = 'data/processed/OEV_BFKOORD_WGS_KOMMAGETRENNT.csv'
+
+# Stufen in Reihenfolge; extract bis assign-ids arbeiten auf der Tabelle im Speicher
+PIPELINE_STAGES = ('extract', 'clean', 'assign-ids', 'load')
+
+
+def prepare_provider_stops(provider_config, use_cached: bool, geojson_path: str = None):
+    """
+    Extract, Schweiz-Filter und Standardisierung eines Providers.
+
+    use_cached=True liest die gefilterten Haltestellen des letzten Laufs aus output_path,
+    sonst wird neu gefiltert und output_path einmal (ohne die entfernten Spalten) geschrieben.
+    Schreibt nichts ins Manifest und nichts auf die Konsole, damit die Funktion auch in
+    einem Worker-Prozess laufen kann.
+    """
+    if use_cached:
+        df = read_stops_csv(provider_config['output_path'], provider_config['lat'], provider_config['lon'])
+    else:
+        df = extract_swiss_stops_csv(
+            provider_config['input_path'],
+            None,
+            provider_config['name'],
+            provider_config['lat'],
+            provider_config['lon'],
+            geojson_path=geojson_path,
+            columns_to_drop=provider_config['columns_to_drop']
+        )
+        drop_columns(df, provider_config['columns_to_drop'], provider_config['output_path'])
+    return standardize_lat_lon(df, provider_config['lat'], provider_config['lon'])
+
+
+def _prepare_measured(provider_config, use_cached: bool, geojson_path: str, profile_dir: str, cache_key: str = None):
+    """
+    prepare_provider_stops als Stufe 'Extract' gemessen; gibt (DataFrame, Messwerte) zurück.
+    cache_key (swiss_stops_cache_key): ohne use_cached wird output_path zuerst aus dem
+    Stage-Cache wiederhergestellt und nur bei einem Fehltreffer neu gefiltert und abgelegt.
+    """
+    with instrument.stage('Extract', provider_config['name'], report=False, profile_dir=profile_dir) as record:
+        if not use_cached and cache_key is not None:
+            record.cache_hit = restore_swiss_stops(provider_config, cache_key)
+        from_file = use_cached or bool(record.cache_hit)
+        df = prepare_provider_stops(provider_config, from_file, geojson_path)
+        if cache_key is not None and not from_file:
+            store_swiss_stops(provider_config, cache_key)
+        record.read_file(provider_config['output_path'] if from_file else provider_config['input_path'])
+        if not use_cached:
+            record.wrote_file(provider_config['output_path'])
+        record.rows(rows_out=len(df))
+    return df, record.as_dict()
+
+
+def _prepared_providers(providers, use_cached, workers: int, cache_keys=None):
+    """
+    Liefert (provider, DataFrame, Fehler, aus Stage-Cache) in Konfigurations-Reihenfolge.
+    Mit workers > 1 laufen Extract/Filter/Standardisierung parallel in einem Prozess-Pool;
+    sonst nacheinander im Hauptprozess, jeweils erst wenn der Provider an der Reihe ist.
+    Die Messwerte der Stufe 'Extract' (auch aus den Worker-Prozessen) kommen in den Laufbericht.
+    cache_keys: Dict Provider-Name -> Schlüssel im Stage-Cache (im Hauptprozess berechnet)
+    """
+    geojson_path = config.BOUNDARY_PATH
+    profile_dir = instrument.profiling_dir()
+    cache_keys = cache_keys or {}
+    if workers <= 1 or len(providers) <= 1:
+        for provider in providers:
+            try:
+                df, record = _prepare_measured(provider, use_cached[provider['name']], geojson_path, profile_dir,
+                                               cache_keys.get(provider['name']))
+            except Exception as e:
+                yield provider, None, e, False
+                continue
+            instrument.add_record(record)
+            yield provider, df, None, bool(record['cache_hit'])
+        return
+
+    if not all(use_cached.values()):
+        # Landesgrenze-Cache einmal im Hauptprozess aufbauen statt parallel in jedem Worker
+        load_swiss_boundary(geojson_path)
+    with ProcessPoolExecutor(max_workers=min(workers, len(providers))) as executor:
+        futures = [
+            executor.submit(_prepare_measured, provider, use_cached[provider['name']], geojson_path, profile_dir,
+                            cache_keys.get(provider['name']))
+            for provider in providers
+        ]
+        for provider, future in zip(providers, futures):
+            try:
+                df, record = future.result()
+            except Exception as e:
+                yield provider, None, e, False
+                continue
+            instrument.add_record(record)
+            yield provider, df, None, bool(record['cache_hit'])
+    cache = get_stage_cache()
+    if cache is not None:
+        # Worker-Prozesse räumen den Stage-Cache nicht auf (siehe StageCache.put)
+        cache.evict()
+
+
+def _use_cached(providers, reuse_cached):
+    """Dict Provider-Name -> True, wenn die gefilterte Provider-CSV wiederverwendet werden darf und aktuell ist."""
+    reuse_cached = reuse_cached or {}
+    return {
+        provider['name']: bool(reuse_cached.get(provider['name'], False)) and swiss_stops_cache_current(provider)
+        for provider in providers
+    }
+
+
+def _extract_cache_keys(providers, use_cached):
+    """Schlüssel im Stage-Cache für alle Provider, die neu gefiltert werden müssten (leer ohne Stage-Cache)."""
+    if get_stage_cache() is None:
+        return {}
+    return {
+        provider['name']: swiss_stops_cache_key(provider)
+        for provider in providers if not use_cached[provider['name']]
+    }
+
+
+def collect_provider_stops(providers, reference, collected_coords, match_report, reuse_cached=None,
+                           workers: int = None, failed=None):
+    """
+    Extrahiert alle Provider (bei workers > 1 parallel, Standard: config.PROVIDER_WORKERS) und
+    sammelt ihre neuen Einträge in Konfigurations-Reihenfolge - das Ergebnis ist unabhängig
+    von der Anzahl Worker.
+    reuse_cached: Dict Provider-Name -> bool (gefilterte Haltestellen wiederverwenden)
+    failed: Liste, an die die Namen fehlgeschlagener Provider angehängt werden (falls gesetzt)
+    """
+    workers = config.PROVIDER_WORKERS if workers is None else workers
+    use_cached = _use_cached(providers, reuse_cached)
+    cache_keys = _extract_cache_keys(providers, use_cached)
+
+    stops = []
+    for provider, df, error, from_cache in _prepared_providers(providers, use_cached, workers, cache_keys):
+        logger.info(f"\n=== Verarbeite {provider['name']} ===")
+        if error is not None:
+            logger.error(f"❌ Fehler bei Verarbeitung von {provider['name']}: {error}")
+            if failed is not None:
+                failed.append(provider['name'])
+            continue
+        try:
+            if use_cached[provider['name']]:
+                logger.info(f"ℹ️ Unverändert - verwende {provider['output_path']}")
+            elif from_cache:
+                logger.info(f"♻️ Gefilterte Haltestellen aus dem Stage-Cache -> {provider['output_path']}")
+                record_swiss_stops(provider)
+            else:
+                logger.info("Extrahiere Daten...")
+                record_swiss_stops(provider)
+
+            logger.info("Transformiere Daten...")
+            with instrument.stage('Sammeln', provider['name']) as record:
+                new_entries = collect_new_coords(df, provider['name'], reference, collected_coords, match_report)
+                record.rows(rows_in=len(df), rows_out=len(new_entries))
+            stops.extend(new_entries)
+            logger.info(f"✅ {provider['name']} abgeschlossen!")
+        except Exception as e:
+            logger.error(f"❌ Fehler bei Verarbeitung von {provider['name']}: {e}")
+            if failed is not None:
+                failed.append(provider['name'])
+            continue
+    return stops
+
+
+def ensure_provider_stops(providers, reuse_cached=None, workers: int = None, failed=None):
+    """
+    Stellt die gefilterten {Provider}_stops.csv sicher, ohne zu sammeln (bei einem Treffer
+    für Sammeln/Bereinigen im Stage-Cache): aktuelle Dateien bleiben, sonst aus dem
+    Stage-Cache wiederhergestellt oder neu gefiltert.
+    failed: Liste, an die die Namen fehlgeschlagener Provider angehängt werden (falls gesetzt)
+    """
+    workers = config.PROVIDER_WORKERS if workers is None else workers
+    use_cached = _use_cached(providers, reuse_cached)
+    pending = [provider for provider in providers if not use_cached[provider['name']]]
+    cache_keys = _extract_cache_keys(pending, use_cached)
+    for provider, _, error, _ in _prepared_providers(pending, use_cached, workers, cache_keys):
+        if error is not None:
+            logger.error(f"❌ Fehler bei Verarbeitung von {provider['name']}: {error}")
+            if failed is not None:
+                failed.append(provider['name'])
+            continue
+        record_swiss_stops(provider)
+
+
+def transform_cache_key(providers):
+    """
+    Schlüssel für Sammeln + Bereinigen im Stage-Cache: Eingaben der gefilterten Haltestellen
+    aller Provider (in Reihenfolge), Hash der ÖV-Referenz, Radien und Code-Version.
+    """
+    inputs = {
+        'providers': [[provider['name'], swiss_stops_cache_inputs(provider)] for provider in providers],
+        'reference': get_file_hash(OEV_BFKOORD_PATH),
+        'oev_match_radius_meters': config.OEV_MATCH_RADIUS_METERS,
+        'clean_distance_meters': CLEAN_DISTANCE_METERS,
+    }
+    code = code_version(extract, boundary, reference_module, spatial, transform, sys.modules[__name__])
+    return stage_key('transform', inputs, code)
+
+
+def _store_transform(cache, key: str, stops, match_report):
+    """Legt bereinigte Haltestellen, ÖV-Abgleich und die Zähler von Sammeln/Bereinigen im Stage-Cache ab."""
+    meta = {'counters': {stage: counters(stage) for stage in ('Sammeln', 'Bereinigen')}, 'rows': len(stops)}
+    with cache.put('transform', key, meta) as entry:
+        with open(os.path.join(entry, 'stops.json'), 'w', encoding='utf-8') as f:
+            json.dump({'stops': stops, 'match_report': match_report}, f, ensure_ascii=False)
+
+
+def _read_transform(cache, entry: str):
+    """
+    Liest einen Eintrag von Sammeln/Bereinigen direkt nach cache.get(), bevor ihn eine weitere
+    Ablage (ensure_provider_stops) beim Aufräumen löschen kann.
+    Returns: Dict mit 'stops', 'match_report' und 'counters' oder None (fehlt/unlesbar = Fehltreffer)
+    """
+    try:
+        with open(os.path.join(entry, 'stops.json'), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return {'stops': data['stops'], 'match_report': data['match_report'],
+                'counters': cache.meta(entry)['counters']}
+    except (OSError, KeyError, ValueError) as e:
+        logger.warning(f"⚠️ Stage-Cache-Eintrag unlesbar ({e}) - sammle neu")
+        return None
+
+
+def _restore_transform(cached, providers, reuse_cached, failed=None):
+    """Bereinigte Haltestellen und ÖV-Abgleich aus dem Stage-Cache; Zähler wie im ursprünglichen Lauf."""
+    ensure_provider_stops(providers, reuse_cached, failed=failed)
+    with instrument.stage('Sammeln/Bereinigen') as record:
+        record.cache_hit = True
+        for stage, values in cached['counters'].items():
+            for name, n in values.items():
+                count(stage, name, n)
+        record.rows(rows_out=len(cached['stops']))
+    logger.info(f"♻️ Sammeln und Bereinigen aus dem Stage-Cache: {len(cached['stops'])} Einträge")
+    return cached['stops'], cached['match_report']
+
+
+def load_delta_stops(path: str = DELTA_BFKOORD_PATH):
+    """Haltestellen-Tabelle mit IDs aus delta/BFKOORD_WGS (Zwischenstand nach assign-ids)."""
+    with instrument.stage('Delta lesen') as record:
+        stops = parse_bfkoord_wgs(path, with_ids=True)
+        record.read_file(path)
+        record.rows(rows_out=len(stops))
+    logger.info(f"ℹ️ {len(stops)} Haltestellen aus {path} gelesen")
+    return stops
+
+
+def run_pipeline(providers, reuse_cached=None, stages=None):
+    """
+    Führt Extract, Transform und Load für alle Provider im Speicher aus und schreibt
+    delta/BFKOORD_WGS, delta/BAHNHOF, die CSV-Dateien, OEV_ABGLEICH.csv, ID_AENDERUNGEN.csv
+    und die METABHF-Vorschläge (AUTO_METABHF.csv).
+    reuse_cached: Dict Provider-Name -> bool (gefilterte Haltestellen wiederverwenden)
+    stages: Auswahl aus PIPELINE_STAGES (Standard: alle). Ist extract nicht ausgewählt, aber
+    eine spätere Stufe im Speicher (clean, assign-ids), wird die Tabelle aus den gefilterten
+    Provider-CSVs des letzten Laufs neu gesammelt (kein Schweiz-Filter); load ohne assign-ids
+    liest delta/BFKOORD_WGS. clean gibt es nur zusammen mit assign-ids: die bereinigte Tabelle
+    wird erst mit den IDs geschrieben (ValueError sonst).
+
+    Die Zähler der Stufen (siehe log.count) werden zu Beginn zurückgesetzt und am Ende
+    als Zusammenfassung geloggt.
+    Returns: True, wenn alle ausgewählten Stufen ohne Fehler gelaufen sind (Fehler werden geloggt)
+    """
+    stages = set(PIPELINE_STAGES if stages is None else stages)
+    if 'clean' in stages and 'assign-ids' not in stages:
+        raise ValueError("clean nur zusammen mit assign-ids - die Bereinigung wird erst mit den IDs gespeichert")
+    reset_counters()
+    try:
+        return _run_stages(providers, reuse_cached, stages)
+    finally:
+        log_counters(logger)
+
+
+def _run_stages(providers, reuse_cached, stages):
+    banner(logger, "Verarbeite alle Provider...")
+    with instrument.stage('ÖV-Referenz') as record:
+        reference = load_oev_reference(OEV_BFKOORD_PATH)
+        record.rows(rows_out=len(reference))
+        record.read_file(OEV_BFKOORD_PATH)
+
+    ok = True
+    if stages & {'extract', 'clean', 'assign-ids'}:
+        stops, ok = _transform_stages(providers, reuse_cached, stages, reference)
+        if stops is None:
+            return ok
+    elif 'load' in stages:
+        if not os.path.exists(DELTA_BFKOORD_PATH):
+            logger.error(f"❌ {DELTA_BFKOORD_PATH} existiert nicht - zuerst bis assign-ids ausführen")
+            return False
+        stops = load_delta_stops(DELTA_BFKOORD_PATH)
+    if 'load' in stages:
+        ok = _load_stages(providers, stops, reference) and ok
+    return ok
+
+
+def _transform_stages(providers, reuse_cached, stages, reference):
+    """
+    Sammeln, Bereinigen und ID-Vergabe im Speicher bis zur letzten ausgewählten Stufe.
+    Returns: (Tabelle, ok) - die Tabelle mit IDs (geschrieben nach delta/BFKOORD_WGS) oder None,
+    wenn die Auswahl vor assign-ids endet (nur extract), nichts gesammelt wurde oder eine Stufe
+    fehlschlägt; ok ist False, sobald ein Provider oder eine Stufe fehlgeschlagen ist.
+    """
+    if 'extract' not in stages:
+        logger.info("ℹ️ extract nicht ausgewählt - verwende die gefilterten Haltestellen des letzten Laufs")
+        reuse_cached = {provider['name']: True for provider in providers}
+    cache = get_stage_cache()
+    key = transform_cache_key(providers) if cache is not None else None
+    entry = cache.get('transform', key) if key is not None else None
+    cached = _read_transform(cache, entry) if entry is not None else None
+    failed = []
+    if cached is not None:
+        stops, match_report = _restore_transform(cached, providers, reuse_cached, failed)
+    else:
+        match_report = []
+        stops = collect_provider_stops(providers, reference, set(), match_report, reuse_cached, failed=failed)
+    if 'extract' in stages:
+        with instrument.stage('ÖV-Abgleich') as record:
+            write_oev_match_report(match_report)
+            record.rows(rows_out=len(match_report))
+            record.wrote_file(OEV_MATCH_REPORT_PATH)
+
+    if failed:
+        # Ohne die Haltestellen eines Providers würden dessen IDs stillgelegt und an andere vergeben
+        logger.error(f"❌ Fehlgeschlagene Provider: {', '.join(failed)} - überspringe Bereinigung, ID-Vergabe "
+                     f"und Ausgabe, ID-Register und {DELTA_BFKOORD_PATH} bleiben unverändert")
+        return None, False
+    if not stops:
+        # Ohne Einträge nichts schreiben - das ID-Register bleibt unverändert
+        logger.warning("⚠️ Keine neuen Koordinaten gesammelt - überspringe Bereinigung, ID-Vergabe und Ausgabe")
+        return None, True
+    if 'assign-ids' not in stages:
+        return None, True
+
+    if cached is None:
+        banner(logger, "Bereinige gesammelte Koordinaten...")
+        try:
+            with instrument.stage('Bereinigen') as record:
+                cleaned = clean_entries(stops, CLEAN_DISTANCE_METERS)
+                record.rows(rows_in=len(stops), rows_out=len(cleaned))
+            stops = cleaned
+            if key is not None:
+                _store_transform(cache, key, stops, match_report)
+        except Exception as e:
+            # Keine IDs für unbereinigte Koordinaten
+            logger.error(f"❌ Fehler bei Bereinigung: {e}")
+            return None, False
+
+    banner(logger, "Vergebe IDs an bereinigte Koordinaten...")
+    try:
+        with instrument.stage('IDs') as record:
+            assign_ids(stops, load_used_ids())
+            write_bfkoord_wgs(stops, DELTA_BFKOORD_PATH)
+            record.rows(rows_in=len(stops), rows_out=len(stops))
+            record.wrote_file(DELTA_BFKOORD_PATH)
+    except Exception as e:
+        logger.error(f"❌ Fehler bei ID-Vergabe: {e}")
+        return None, False
+    return stops, True
+
+
+def _load_stages(providers, stops, reference):
+    """
+    Ausgabedateien aus der Tabelle mit IDs: CSV, delta/BAHNHOF und AUTO_METABHF.csv.
+    Alle Provider werden zusammen in einem Durchgang über die Tabelle geschrieben; jede Datei
+    atomar (temporäre Datei + Umbenennen), ein Abbruch hinterlässt keine halben Ausgaben.
+    Returns: True, wenn alle Dateien geschrieben wurden
+    """
+    ok = True
+    banner(logger, "Erstelle CSV-Dateien...")
+    try:
+        with instrument.stage('CSV') as record:
+            write_bfkoord_csv(reference.entries(), OEV_BFKOORD_CSV_PATH)
+            write_bfkoord_csv(stops, BFKOORD_CSV_PATH)
+            record.rows(rows_in=len(stops) + len(reference), rows_out=len(stops) + len(reference))
+            record.wrote_file(OEV_BFKOORD_CSV_PATH)
+            record.wrote_file(BFKOORD_CSV_PATH)
+    except Exception as e:
+        logger.error(f"❌ Fehler bei CSV-Erstellung: {e}")
+        ok = False
+
+    banner(logger, "Erstelle BAHNHOF-Format...")
+    try:
+        with instrument.stage('BAHNHOF') as record:
+            write_bahnhof(stops, [provider['name'] for provider in providers])
+            record.rows(rows_in=len(stops))
+            record.wrote_file(DELTA_BAHNHOF_PATH)
+    except Exception as e:
+        logger.error(f"❌ Fehler bei BAHNHOF-Format: {e}")
+        ok = False
+
+    banner(logger, "Erstelle METABHF-Vorschläge...")
+    try:
+        with instrument.stage('METABHF') as record:
+            candidates = metabhf_candidates(stops, reference)
+            write_metabhf_csv(candidates)
+            record.rows(rows_in=len(stops), rows_out=len(candidates))
+            record.wrote_file(AUTO_METABHF_PATH)
+    except Exception as e:
+        logger.error(f"❌ Fehler bei METABHF-Vorschlägen: {e}")
+        ok = False
+    return ok
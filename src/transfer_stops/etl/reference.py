@@ -0,0 +1,186 @@
+"""ÖV-Referenzdaten (oevSammlung/BFKOORD_WGS): einmal einlesen, spaltenweise im Speicher und als Binär-Cache."""
+import os
+
+import numpy as np
+
+from transfer_stops import config
+from transfer_stops.io_utils import atomic_write
+from transfer_stops.log import get_logger
+from transfer_stops.manifest import get_manifest
+from transfer_stops.spatial import micro_degree_keys, pairs_within
+
+logger = get_logger('reference')
+
+CACHE_VERSION = 1
+CACHE_FILE = 'oev_bfkoord_wgs.npz'
+
+
+class OevReference:
+    """
+    ÖV-Haltestellen aus BFKOORD_WGS als Spalten (NumPy-Arrays gleicher Länge):
+    ids (Text wie in der Datei), lons, lats, names.
+    unlocated_ids: numerische IDs von Zeilen ohne gültige Koordinate (nur für die ID-Belegung).
+
+    Die Nachschlage-Indizes (Koordinaten-Schlüssel, belegte IDs, ID -> Zeile) werden
+    beim ersten Zugriff erstellt.
+    """
+
+    def __init__(self, ids, lons, lats, names, unlocated_ids=()):
+        self.ids = np.asarray(ids, dtype=str)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.names = np.asarray(names, dtype=str)
+        self.unlocated_ids = np.asarray(unlocated_ids, dtype=np.int64)
+        self._coord_keys = None
+        self._first_rows = None
+        self._used_ids = None
+        self._row_by_id = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def coord_keys(self):
+        """Sortierte, eindeutige Koordinaten-Schlüssel (siehe spatial.micro_degree_keys) aller Haltestellen."""
+        if self._coord_keys is None:
+            self._coord_keys, self._first_rows = np.unique(
+                micro_degree_keys(self.lats, self.lons), return_index=True
+            )
+        return self._coord_keys
+
+    def exact_rows(self, keys):
+        """
+        Erste Zeile mit gleicher Koordinate für jeden Schlüssel in keys (Sortier-Join,
+        keine Schleife pro Punkt). Returns: Zeilenindizes, -1 ohne Treffer
+        """
+        coord_keys = self.coord_keys()
+        keys = np.asarray(keys, dtype=np.int64)
+        rows = np.full(len(keys), -1, dtype=np.int64)
+        if len(coord_keys) == 0:
+            return rows
+        pos = np.minimum(np.searchsorted(coord_keys, keys), len(coord_keys) - 1)
+        hit = coord_keys[pos] == keys
+        rows[hit] = self._first_rows[pos[hit]]
+        return rows
+
+    def used_ids(self):
+        """Alle belegten numerischen IDs."""
+        if self._used_ids is None:
+            used_ids = set(self.unlocated_ids.tolist())
+            for id_ in self.ids.tolist():
+                try:
+                    used_ids.add(int(id_))
+                except ValueError:
+                    continue
+            self._used_ids = used_ids
+        return self._used_ids
+
+    def row_of(self, id_):
+        """Zeilenindex der Haltestelle mit ID id_ (Text wie in der Datei), None wenn unbekannt."""
+        if self._row_by_id is None:
+            self._row_by_id = {value: row for row, value in enumerate(self.ids.tolist())}
+        return self._row_by_id.get(id_)
+
+    def nearest(self, lats, lons, radius_meters: float):
+        """
+        Nächste ÖV-Haltestelle innerhalb radius_meters für jeden Punkt (lats[k], lons[k]).
+        Bei gleicher Distanz gewinnt die Haltestelle, die in der Datei zuerst steht.
+
+        Returns: (rows, distances) - Zeilenindex bzw. -1 ohne Treffer, Distanz in Metern bzw. NaN
+        """
+        lats, lons = np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
+        rows = np.full(len(lats), -1, dtype=np.int64)
+        distances = np.full(len(lats), np.nan)
+        if radius_meters <= 0:
+            return rows, distances
+
+        i, j, d = pairs_within(lats, lons, self.lats, self.lons, radius_meters)
+        order = np.lexsort((j, d, i))
+        i, j, d = i[order], j[order], d[order]
+        first = np.flatnonzero(np.r_[True, i[1:] != i[:-1]]) if len(i) else np.empty(0, dtype=np.int64)
+        rows[i[first]] = j[first]
+        distances[i[first]] = d[first]
+        return rows, distances
+
+    def entries(self):
+        """Haltestellen als Einträge (Dicts mit 'id', 'lon', 'lat', 'name')."""
+        return [
+            {'id': id_, 'lon': lon, 'lat': lat, 'name': name}
+            for id_, lon, lat, name in zip(self.ids.tolist(), self.lons.tolist(),
+                                           self.lats.tolist(), self.names.tolist())
+        ]
+
+
+def parse_oev_bfkoord_wgs(path: str):
+    """Liest BFKOORD_WGS (ID LON LAT ... % NAME) in eine OevReference."""
+    ids, lons, lats, names, unlocated_ids = [], [], [], [], []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+
+            coords_part, name = line.split('%', 1) if '%' in line else (line, '')
+            parts = coords_part.split()
+            try:
+                if len(parts) < 3:
+                    raise ValueError
+                lon, lat = float(parts[1]), float(parts[2])
+            except ValueError:
+                # Zeile ohne Koordinate: ID trotzdem als belegt merken
+                try:
+                    unlocated_ids.append(int(line.split()[0]))
+                except ValueError:
+                    pass
+                continue
+            ids.append(parts[0])
+            lons.append(lon)
+            lats.append(lat)
+            names.append(name.strip())
+    return OevReference(ids, lons, lats, names, unlocated_ids)
+
+
+def _read_cache(cache_path: str, source_hash: str):
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            if int(data['version']) != CACHE_VERSION or str(data['source_hash']) != source_hash:
+                return None
+            return OevReference(data['ids'], data['lons'], data['lats'], data['names'], data['unlocated_ids'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _write_cache(cache_path: str, source_hash: str, reference: OevReference):
+    with atomic_write(cache_path, 'wb') as f:
+        np.savez(
+            f, version=CACHE_VERSION, source_hash=source_hash, ids=reference.ids, lons=reference.lons,
+            lats=reference.lats, names=reference.names, unlocated_ids=reference.unlocated_ids
+        )
+
+
+_loaded = {}
+
+
+def load_oev_reference(path: str = 'data/raw/oevSammlung/BFKOORD_WGS', cache_dir: str = None):
+    """
+    ÖV-Referenz aus path. Wird pro Lauf nur einmal geladen; der Binär-Cache
+    (cache/oev_bfkoord_wgs.npz) gilt, solange der Inhalts-Hash von path übereinstimmt,
+    sonst wird die Textdatei neu eingelesen und der Cache ersetzt.
+    """
+    source_hash = get_manifest().file_hash(path)
+    if source_hash is None:
+        raise FileNotFoundError(f"ÖV-Referenzdatei nicht gefunden: {path}")
+
+    key = (os.path.abspath(path), source_hash)
+    if key in _loaded:
+        return _loaded[key]
+
+    cache_path = os.path.join(cache_dir or config.CACHE_DIR, CACHE_FILE)
+    reference = _read_cache(cache_path, source_hash)
+    if reference is None:
+        reference = parse_oev_bfkoord_wgs(path)
+        _write_cache(cache_path, source_hash, reference)
+        logger.info(f"✅ ÖV-Referenz eingelesen: {len(reference)} Haltestellen")
+
+    _loaded.clear()
+    _loaded[key] = reference
+    return reference
@@ -1,9 +1,25 @@
 """Daten-Transformationen: Koordinaten sammeln, bereinigen, IDs vergeben."""
 from transfer_stops import config
-import math
+from transfer_stops.etl.reference import load_oev_reference
+from transfer_stops.id_registry import IdRegistry, format_id
+from transfer_stops.io_utils import atomic_write
+from transfer_stops.log import count, get_logger
+from transfer_stops.spatial import dedup_by_distance, micro_degree_keys
+import numpy as np
+import logging
 import os
 import csv
 
+logger = get_logger('transform')
+
+OEV_BFKOORD_PATH = 'data/raw/oevSammlung/BFKOORD_WGS'
+DELTA_BFKOORD_PATH = 'data/processed/delta/BFKOORD_WGS'
+OEV_MATCH_REPORT_PATH = 'data/processed/OEV_ABGLEICH.csv'
+STOP_FIELDS = ['id', 'lon', 'lat', 'name', 'provider']
+OEV_MATCH_FIELDS = ['provider', 'name', 'lon', 'lat', 'oev_id', 'oev_name', 'distanz_m', 'abgleich']
+# Haltestellen näher als dieser Abstand (Meter) gelten bei der Bereinigung als Duplikat
+CLEAN_DISTANCE_METERS = 100
+
 
 def standardize_lat_lon(df, lat_col, lon_col):
     """Benennt Lat/Lon-Spalten zu 'lat' und 'lon' um."""
@@ -16,262 +32,313 @@ def standardize_lat_lon(df, lat_col, lon_col):
     return df
 
 
-def drop_columns(df, colnames: list, output_path: str):
-    """Entfernt angegebene Spalten und speichert DataFrame als CSV."""
+def drop_columns(df, colnames: list, output_path: str = None):
+    """Entfernt angegebene Spalten und speichert DataFrame als CSV (falls output_path gesetzt)."""
     df.drop(columns=[col for col in colnames if col in df.columns], inplace=True)
-    df.to_csv(output_path, index=False)
+    if output_path:
+        df.to_csv(output_path, index=False)
 
 
-def check_and_add_new_coords(df, transportProvider: str):
-    """Sammelt neue Koordinaten ohne ID-Vergabe in data/processed/delta/BFKOORD_WGS."""
-    def format_coord(lat, lon):
-        return f"{lat:.8f},{lon:.8f}"
-    
-    existing_coords_path = 'data/raw/oevSammlung/BFKOORD_WGS'
-    existing_coords = set()
-    
-    with open(existing_coords_path, 'r', encoding='utf-8') as f:
+def load_existing_coords(path: str = OEV_BFKOORD_PATH):
+    """Koordinaten-Schlüssel aller ÖV-Haltestellen aus BFKOORD_WGS."""
+    return load_oev_reference(path).coord_keys()
+
+
+def load_used_ids(path: str = OEV_BFKOORD_PATH):
+    """Bereits verwendete IDs aus BFKOORD_WGS."""
+    return load_oev_reference(path).used_ids()
+
+
+def parse_bfkoord_wgs(file_path: str, with_ids: bool = False):
+    """
+    Liest BFKOORD_WGS-Zeilen in Einträge (Dicts mit 'lon', 'lat', 'name', 'provider', 'line').
+    with_ids=True: Zeilen im Format ID LON LAT % NAME, zusätzlich mit 'id' (Text wie in der Datei).
+    """
+    entries = []
+    with open(file_path, 'r', encoding='utf-8') as f:
         for line in f:
-            parts = line.strip().split()
-            if len(parts) >= 3:
-                try:
-                    lon, lat = float(parts[1]), float(parts[2])
-                    existing_coords.add(format_coord(lat, lon))
-                except ValueError:
+            line = line.strip()
+            if not line:
+                continue
+
+            coords_part, name = line.split('%', 1) if '%' in line else (line, '')
+            name = name.strip()
+            parts = coords_part.split()
+
+            try:
+                if with_ids and len(parts) >= 3:
+                    entry = {'id': parts[0], 'lon': float(parts[1]), 'lat': float(parts[2])}
+                elif not with_ids and len(parts) >= 2:
+                    entry = {'lon': float(parts[0]), 'lat': float(parts[1])}
+                else:
                     continue
+            except ValueError:
+                continue
+            entry.update({'name': name, 'provider': _provider_from_name(name), 'line': line})
+            entries.append(entry)
+    return entries
+
+
+def _delta_entry(lon, lat, name, transportProvider: str):
+    """Eintrag so, wie er aus einer Zeile von delta/BFKOORD_WGS gelesen wird (6 Nachkommastellen)."""
+    return {
+        'lon': float(f"{lon:.6f}"),
+        'lat': float(f"{lat:.6f}"),
+        'name': f"{name} [{transportProvider}]".strip(),
+        'provider': transportProvider,
+    }
+
+
+def collect_new_coords(df, transportProvider: str, reference, collected_coords, match_report=None,
+                       radius_meters: float = None):
+    """
+    Gibt die Haltestellen aus df zurück, die weder einer ÖV-Haltestelle aus reference
+    entsprechen noch in collected_coords (bereits gesammelte Provider) vorkommen.
+    collected_coords: Menge der Koordinaten-Schlüssel (spatial.micro_degree_keys) der
+    bereits gesammelten Haltestellen, wird um die neuen Koordinaten ergänzt.
+
+    Als ÖV-Haltestelle gilt eine gleiche Koordinate (6 Nachkommastellen) oder die nächste
+    ÖV-Haltestelle näher als radius_meters (Standard: config.OEV_MATCH_RADIUS_METERS, 0 = nur exakt).
+    Treffer werden mit ÖV-ID und Distanz an match_report angehängt (falls gesetzt).
 
-    os.makedirs("data/processed/delta", exist_ok=True)
-    output_file_path = os.path.join("data/processed/delta", "BFKOORD_WGS")
-    
-    new_coords = set()
-    if os.path.exists(output_file_path):
-        with open(output_file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                coords_part = line.split('%')[0].strip() if '%' in line else line.strip()
-                parts = coords_part.split()
-                if len(parts) >= 2:
-                    try:
-                        lon, lat = float(parts[0]), float(parts[1])
-                        new_coords.add(format_coord(lat, lon))
-                    except ValueError:
-                        continue
-
-    to_add = []
-    for _, row in df.iterrows():
-        lon, lat, name = float(row['lon']), float(row['lat']), row['stop_name']
-        coord_key = format_coord(lat, lon)
-
-        if coord_key in existing_coords:
-            print(f"Duplikat (existierend): {name} ({lat}, {lon})")
-        elif coord_key in new_coords:
-            print(f"Duplikat (gesammelt): {name} ({lat}, {lon})")
-        else:
-            to_add.append((lon, lat, name))
-            new_coords.add(coord_key)
-
-    if to_add:
-        mode = 'a' if os.path.exists(output_file_path) else 'w'
-        with open(output_file_path, mode, encoding='utf-8') as f:
-            for (lon, lat, name) in to_add:
-                f.write(f"{lon:>11.6f}{lat:>11.6f} 0      % {name} [{transportProvider}]\n")
-        print(f"✅ {len(to_add)} neue Koordinaten von {transportProvider} gesammelt")
+    Die Einteilung läuft spaltenweise über Schlüssel-Arrays (Sortier-Join, np.isin) statt
+    Zeile für Zeile; Duplikate werden pro Art gezählt statt einzeln ausgegeben.
+    """
+    if radius_meters is None:
+        radius_meters = config.OEV_MATCH_RADIUS_METERS
+    lats = df['lat'].to_numpy(dtype=np.float64)
+    lons = df['lon'].to_numpy(dtype=np.float64)
+    keys = micro_degree_keys(lats, lons)
+
+    exact_rows = reference.exact_rows(keys)
+    near_rows, near_distances = reference.nearest(lats, lons, radius_meters)
+    is_exact = exact_rows >= 0
+    is_near = ~is_exact & (near_rows >= 0)
+
+    # Nicht-ÖV-Haltestellen: neu, wenn die Koordinate weder gesammelt ist noch im Provider früher vorkommt
+    candidates = np.flatnonzero(~(is_exact | is_near))
+    collected = np.fromiter(collected_coords, dtype=np.int64, count=len(collected_coords))
+    uncollected = candidates[~np.isin(keys[candidates], collected)]
+    _, first = np.unique(keys[uncollected], return_index=True)
+    new_rows = np.sort(uncollected[first])
+
+    names = df['stop_name'].tolist()
+    new_entries = [_delta_entry(float(lons[k]), float(lats[k]), names[k], transportProvider)
+                   for k in new_rows.tolist()]
+    collected_coords.update(keys[new_rows].tolist())
+
+    if match_report is not None:
+        for k in np.flatnonzero(is_exact | is_near).tolist():
+            if is_exact[k]:
+                kind, oev_row, distance = 'exakt', int(exact_rows[k]), 0.0
+            else:
+                kind, oev_row, distance = 'naehe', int(near_rows[k]), float(near_distances[k])
+            match_report.append({
+                'provider': transportProvider, 'name': names[k], 'lon': float(lons[k]), 'lat': float(lats[k]),
+                'oev_id': str(reference.ids[oev_row]), 'oev_name': str(reference.names[oev_row]),
+                'distanz_m': round(distance, 1), 'abgleich': kind,
+            })
+
+    if logger.isEnabledFor(logging.DEBUG):
+        _log_duplicates(df, names, reference, is_exact, is_near, near_rows, near_distances,
+                        np.setdiff1d(candidates, new_rows))
+
+    n_exact, n_near = int(is_exact.sum()), int(is_near.sum())
+    n_collected = len(candidates) - len(new_rows)
+    count('Sammeln', 'oev_exakt', n_exact)
+    count('Sammeln', 'oev_naehe', n_near)
+    count('Sammeln', 'gesammelt', n_collected)
+    count('Sammeln', 'neu', len(new_entries))
+    if n_exact or n_near or n_collected:
+        logger.info(f"Duplikate: {n_exact} ÖV exakt, {n_near} ÖV in der Nähe (< {radius_meters}m), "
+                    f"{n_collected} bereits gesammelt")
+    if new_entries:
+        logger.info(f"✅ {len(new_entries)} neue Koordinaten von {transportProvider} gesammelt")
     else:
-        print(f"ℹ️ Keine neuen Koordinaten von {transportProvider}")
+        logger.info(f"ℹ️ Keine neuen Koordinaten von {transportProvider}")
+    return new_entries
+
+
+def _log_duplicates(df, names, reference, is_exact, is_near, near_rows, near_distances, collected_rows):
+    """Eine DEBUG-Meldung pro Duplikat (nur wenn DEBUG aktiv ist)."""
+    lats, lons = df['lat'].tolist(), df['lon'].tolist()
+    for k in np.flatnonzero(is_exact).tolist():
+        logger.debug(f"Duplikat (existierend): {names[k]} ({lats[k]}, {lons[k]})")
+    for k in np.flatnonzero(is_near).tolist():
+        oev_row = int(near_rows[k])
+        logger.debug(f"Duplikat (ÖV {near_distances[k]:.1f}m): {names[k]} ({lats[k]}, {lons[k]}) → "
+                     f"{reference.ids[oev_row]} {reference.names[oev_row]}")
+    for k in collected_rows.tolist():
+        logger.debug(f"Duplikat (gesammelt): {names[k]} ({lats[k]}, {lons[k]})")
+
+
+def write_oev_match_report(match_report, output_path: str = OEV_MATCH_REPORT_PATH, append: bool = False):
+    """Schreibt die ÖV-Treffer (Haltestelle, nächste ÖV-ID, Distanz) als CSV."""
+    if append and os.path.exists(output_path):
+        with open(output_path, 'a', newline='', encoding='utf-8') as outf:
+            csv.DictWriter(outf, fieldnames=OEV_MATCH_FIELDS).writerows(match_report)
+    else:
+        with atomic_write(output_path, 'w', encoding='utf-8', newline='') as outf:
+            writer = csv.DictWriter(outf, fieldnames=OEV_MATCH_FIELDS)
+            writer.writeheader()
+            writer.writerows(match_report)
+
+    near = sum(1 for match in match_report if match['abgleich'] == 'naehe')
+    logger.info(f"✅ ÖV-Abgleich: {len(match_report) - near} exakt, {near} in der Nähe -> {output_path}")
+
+
+def check_and_add_new_coords(df, transportProvider: str):
+    """Sammelt neue Koordinaten ohne ID-Vergabe in data/processed/delta/BFKOORD_WGS."""
+    reference = load_oev_reference(OEV_BFKOORD_PATH)
+
+    os.makedirs(os.path.dirname(DELTA_BFKOORD_PATH), exist_ok=True)
+    collected_coords = set()
+    if os.path.exists(DELTA_BFKOORD_PATH):
+        entries = parse_bfkoord_wgs(DELTA_BFKOORD_PATH)
+        collected_coords = set(micro_degree_keys([entry['lat'] for entry in entries],
+                                                 [entry['lon'] for entry in entries]).tolist())
+
+    match_report = []
+    new_entries = collect_new_coords(df, transportProvider, reference, collected_coords, match_report)
+    if new_entries:
+        with open(DELTA_BFKOORD_PATH, 'a', encoding='utf-8') as f:
+            f.write(''.join(f"{entry['lon']:>11.6f}{entry['lat']:>11.6f} 0      % {entry['name']}\n"
+                            for entry in new_entries))
+    write_oev_match_report(match_report, append=True)
+
+
+def _provider_from_name(name: str):
+    """Provider aus dem Namenszusatz '[Provider]' (leer wenn keiner vorhanden)."""
+    return name.split('[')[-1].split(']')[0] if '[' in name and ']' in name else ''
+
+
+def write_bfkoord_csv(entries, output_path: str):
+    """Schreibt Einträge mit ID als CSV (id, lon, lat, name, provider), atomar."""
+    with atomic_write(output_path, 'w', encoding='utf-8', newline='') as outf:
+        writer = csv.DictWriter(outf, fieldnames=STOP_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(
+            {**entry, 'id': format_id(entry['id']),
+             'provider': entry['provider'] if 'provider' in entry else _provider_from_name(entry['name'])}
+            for entry in entries
+        )
+
+    logger.info(f"✅ CSV erstellt: {output_path} ({len(entries)} Einträge)")
 
 
 def bfkoord_wgs_to_csv(input_path: str, output_path: str):
     """Konvertiert BFKOORD_WGS Format (ID LON LAT % NAME) zu CSV."""
     if not os.path.exists(input_path):
-        print(f"⚠️ Datei {input_path} existiert nicht - überspringe CSV-Erstellung")
+        logger.warning(f"⚠️ Datei {input_path} existiert nicht - überspringe CSV-Erstellung")
         return
-    
-    rows = []
-    with open(input_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            
-            if '%' in line:
-                left, right = line.split('%', 1)
-                name = right.strip()
-            else:
-                left, name = line, ''
-            
-            parts = left.split()
-            if len(parts) >= 3:
-                try:
-                    id_, lon, lat = parts[0], float(parts[1]), float(parts[2])
-                    provider = name.split('[')[-1].split(']')[0] if '[' in name and ']' in name else ''
-                    rows.append({'id': id_, 'lon': lon, 'lat': lat, 'name': name, 'provider': provider})
-                except ValueError:
-                    continue
-    
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, 'w', newline='', encoding='utf-8') as outf:
-        writer = csv.DictWriter(outf, fieldnames=['id', 'lon', 'lat', 'name', 'provider'])
-        writer.writeheader()
-        writer.writerows(rows)
-    
-    print(f"✅ CSV erstellt: {output_path} ({len(rows)} Einträge)")
+    write_bfkoord_csv(parse_bfkoord_wgs(input_path, with_ids=True), output_path)
+
+
+def oev_bfkoord_to_csv(output_path: str = 'data/processed/OEV_BFKOORD_WGS_KOMMAGETRENNT.csv'):
+    """Schreibt die ÖV-Referenz (oevSammlung/BFKOORD_WGS) als CSV."""
+    write_bfkoord_csv(load_oev_reference(OEV_BFKOORD_PATH).entries(), output_path)
 
 
 def convert_all_bfkoord_to_csv():
     """Konvertiert delta/BFKOORD_WGS und oevSammlung/BFKOORD_WGS zu CSV."""
-    bfkoord_wgs_to_csv('data/raw/oevSammlung/BFKOORD_WGS', 'data/processed/OEV_BFKOORD_WGS_KOMMAGETRENNT.csv')
-    bfkoord_wgs_to_csv('data/processed/delta/BFKOORD_WGS', 'data/processed/BFKOORD_WGS_KOMMAGETRENNT.csv')
+    oev_bfkoord_to_csv()
+    bfkoord_wgs_to_csv(DELTA_BFKOORD_PATH, 'data/processed/BFKOORD_WGS_KOMMAGETRENNT.csv')
 
 
-def clean_delta_bfkoord_wgs(file_path: str = 'data/processed/delta/BFKOORD_WGS',
-                              distance_threshold_meters: float = 100):
+def clean_entries(entries, distance_threshold_meters: float = CLEAN_DISTANCE_METERS):
     """
-    Bereinigt BFKOORD_WGS in-place:
+    Bereinigt gesammelte Einträge:
     1. Entfernt FlixTrain-Einträge
     2. Entfernt räumlich nahe Duplikate (< distance_threshold_meters)
+
+    Returns: behaltene Einträge in ursprünglicher Reihenfolge
     """
-    def haversine_distance(lat1, lon1, lat2, lon2):
-        """
-        Berechnet die kürzeste Distanz zwischen zwei GPS-Koordinaten auf der Erdkugel.
-        
-        Die Haversine-Formel berücksichtigt die Erdkrümmung und berechnet die Luftlinie
-        entlang der Erdoberfläche (Großkreis-Distanz). Benannt nach der Haversine-Funktion
-        (hav(θ) = sin²(θ/2)), die numerisch stabiler ist als andere trigonometrische Formeln.
-        
-        Returns: Distanz in Metern
-        """
-        R = 6371000  # Erdradius in Metern
-        phi1, phi2 = math.radians(lat1), math.radians(lat2)
-        delta_phi, delta_lambda = math.radians(lat2 - lat1), math.radians(lon2 - lon1)
-        a = math.sin(delta_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
-        return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    
-    if not os.path.exists(file_path):
-        print(f"⚠️ Datei {file_path} existiert nicht")
-        return
-    
-    cleaned_entries = []
-    removed_flixtrain = 0
-    
-    # Einlesen und FlixTrain-Filter
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            
-            coords_part, name = line.split('%', 1) if '%' in line else (line, '')
-            name = name.strip()
-            
-            if 'flixtrain' in name.lower():
-                removed_flixtrain += 1
-                continue
-            
-            parts = coords_part.strip().split()
-            if len(parts) >= 2:
-                try:
-                    lon, lat = float(parts[0]), float(parts[1])
-                    cleaned_entries.append({'lon': lon, 'lat': lat, 'name': name, 'line': line})
-                except ValueError:
-                    continue
-    
-    # Räumliche Duplikate entfernen
-    final_entries = []
-    removed_duplicates = []
-    
-    for entry in cleaned_entries:
-        is_duplicate = False
-        closest_existing = None
-        min_distance = float('inf')
-        
-        for existing in final_entries:
-            distance = haversine_distance(entry['lat'], entry['lon'], existing['lat'], existing['lon'])
-            if distance < distance_threshold_meters and distance < min_distance:
-                is_duplicate = True
-                min_distance = distance
-                closest_existing = existing
-        
-        if is_duplicate:
-            removed_duplicates.append({
-                'name': entry['name'],
-                'distance': min_distance,
-                'kept_name': closest_existing['name']
-            })
-        else:
-            final_entries.append(entry)
-    
-    # Zurückschreiben
-    with open(file_path, 'w', encoding='utf-8') as f:
-        for entry in final_entries:
-            f.write(entry['line'] + '\n')
-    
-    print(f"✅ Bereinigung abgeschlossen:")
-    print(f"   - {removed_flixtrain} FlixTrain-Einträge entfernt")
-    print(f"   - {len(removed_duplicates)} räumliche Duplikate entfernt (< {distance_threshold_meters}m)")
-    print(f"   - {len(final_entries)} Einträge behalten")
-    
-    if removed_duplicates:
-        print(f"\n   Entfernte Duplikate:")
-        for dup in removed_duplicates[:10]:
-            print(f"     - {dup['name']}")
-            print(f"       → {dup['distance']:.1f}m zu: {dup['kept_name']}")
-        if len(removed_duplicates) > 10:
-            print(f"     ... und {len(removed_duplicates) - 10} weitere")
-
-
-def assign_ids_to_delta(file_path: str = 'data/processed/delta/BFKOORD_WGS'):
-    """Vergibt IDs an bereinigte Koordinaten in BFKOORD_WGS (in-place)."""
+    cleaned_entries = [entry for entry in entries if 'flixtrain' not in entry['name'].lower()]
+    removed_flixtrain = len(entries) - len(cleaned_entries)
+
+    # Räumliche Duplikate entfernen (Grid-Index, nur Nachbarzellen werden verglichen)
+    kept, removed = dedup_by_distance(
+        [(entry['lat'], entry['lon']) for entry in cleaned_entries], distance_threshold_meters
+    )
+    final_entries = [cleaned_entries[i] for i in kept]
+    removed_duplicates = [
+        {'name': cleaned_entries[i]['name'], 'distance': distance, 'kept_name': cleaned_entries[j]['name']}
+        for i, j, distance in removed
+    ]
+
+    count('Bereinigen', 'flixtrain', removed_flixtrain)
+    count('Bereinigen', 'duplikate', len(removed_duplicates))
+    count('Bereinigen', 'behalten', len(final_entries))
+    logger.info(f"✅ Bereinigung abgeschlossen:")
+    logger.info(f"   - {removed_flixtrain} FlixTrain-Einträge entfernt")
+    logger.info(f"   - {len(removed_duplicates)} räumliche Duplikate entfernt (< {distance_threshold_meters}m)")
+    logger.info(f"   - {len(final_entries)} Einträge behalten")
+
+    if removed_duplicates and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"\n   Entfernte Duplikate:")
+        for dup in removed_duplicates:
+            logger.debug(f"     - {dup['name']}")
+            logger.debug(f"       → {dup['distance']:.1f}m zu: {dup['kept_name']}")
+    return final_entries
+
+
+def clean_delta_bfkoord_wgs(file_path: str = DELTA_BFKOORD_PATH,
+                              distance_threshold_meters: float = CLEAN_DISTANCE_METERS):
+    """Bereinigt BFKOORD_WGS in-place (siehe clean_entries)."""
     if not os.path.exists(file_path):
-        print(f"⚠️ Datei {file_path} existiert nicht")
+        logger.warning(f"⚠️ Datei {file_path} existiert nicht")
         return
-    
-    # Sammle bereits verwendete IDs aus BFKOORD_WGS
-    used_ids = set()
-    with open('data/raw/oevSammlung/BFKOORD_WGS', 'r', encoding='utf-8') as f:
-        for line in f:
-            parts = line.strip().split()
-            if parts:
-                try:
-                    used_ids.add(int(parts[0]))
-                except ValueError:
-                    continue
-    
-    # Lese Einträge und weise IDs zu
-    entries_with_ids = []
-    beginning_id = config.BEGINNING_ID
-    
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            
-            coords_part, name = line.split('%', 1) if '%' in line else (line, '')
-            name = name.strip()
-            parts = coords_part.strip().split()
-            
-            if len(parts) >= 2:
-                try:
-                    lon, lat = float(parts[0]), float(parts[1])
-                    
-                    # Finde nächste freie ID
-                    candidate = beginning_id
-                    while candidate in used_ids:
-                        candidate += 1
-                    used_ids.add(candidate)
-                    new_id = str(candidate).zfill(7)
-                    
-                    entries_with_ids.append({'id': new_id, 'lon': lon, 'lat': lat, 'name': name})
-                except ValueError:
-                    continue
-    
-    # Schreibe mit IDs zurück
-    with open(file_path, 'w', encoding='utf-8') as f:
-        for entry in entries_with_ids:
-            f.write(f"{entry['id']:<8}{entry['lon']:>11.6f}{entry['lat']:>11.6f} 0      % {entry['name']}\n")
-    
-    print(f"✅ IDs vergeben: {len(entries_with_ids)} Einträge")
 
+    final_entries = clean_entries(parse_bfkoord_wgs(file_path), distance_threshold_meters)
+    with atomic_write(file_path, 'w', encoding='utf-8') as f:
+        f.write(''.join(entry['line'] + '\n' for entry in final_entries))
+
+
+def write_bfkoord_wgs(entries, output_file: str = DELTA_BFKOORD_PATH):
+    """Schreibt Einträge mit ID im BFKOORD_WGS-Format (ID LON LAT % NAME), atomar in einem Block."""
+    with atomic_write(output_file, 'w', encoding='utf-8') as f:
+        f.write(''.join(
+            f"{format_id(entry['id']):<8}{entry['lon']:>11.6f}{entry['lat']:>11.6f} 0      % {entry['name']}\n"
+            for entry in entries
+        ))
+
+
+def assign_ids(entries, used_ids, diff_path: str = 'data/processed/ID_AENDERUNGEN.csv'):
+    """
+    Vergibt IDs an bereinigte Einträge (in-place 'id').
+
+    Die IDs kommen aus dem persistenten ID-Register (config.ID_REGISTRY_PATH): bekannte
+    Haltestellen (gleicher Provider, gleiche Koordinate) behalten ihre ID aus früheren
+    Läufen, nur neue Haltestellen erhalten neue IDs. Die Änderungen gegenüber dem
+    letzten Lauf werden nach diff_path geschrieben.
+    used_ids: bereits verwendete IDs (ÖV)
+    """
+    registry = IdRegistry()
+    changes = registry.assign(entries, used_ids)
+    registry.save()
+
+    with atomic_write(diff_path, 'w', encoding='utf-8', newline='') as outf:
+        writer = csv.DictWriter(outf, fieldnames=['aenderung'] + STOP_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for change in ('added', 'removed', 'renamed'):
+            for entry in changes[change]:
+                writer.writerow({**entry, 'id': format_id(entry['id']), 'aenderung': change})
 
+    count('IDs', 'unveraendert', changes['unchanged'])
+    for change, name in (('added', 'neu'), ('removed', 'entfernt'), ('renamed', 'umbenannt')):
+        count('IDs', name, len(changes[change]))
+    logger.info(f"✅ IDs vergeben: {len(entries)} Einträge")
+    logger.info(f"   - {changes['unchanged']} unverändert, {len(changes['added'])} neu, "
+                f"{len(changes['removed'])} entfernt, {len(changes['renamed'])} umbenannt")
 
 
+def assign_ids_to_delta(file_path: str = DELTA_BFKOORD_PATH,
+                        diff_path: str = 'data/processed/ID_AENDERUNGEN.csv'):
+    """Vergibt IDs an bereinigte Koordinaten in BFKOORD_WGS (in-place, siehe assign_ids)."""
+    if not os.path.exists(file_path):
+        logger.warning(f"⚠️ Datei {file_path} existiert nicht")
+        return
 
+    entries = parse_bfkoord_wgs(file_path)
+    assign_ids(entries, load_used_ids(), diff_path)
+    write_bfkoord_wgs(entries, file_path)
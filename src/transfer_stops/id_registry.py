@@ -0,0 +1,127 @@
+"""Persistentes ID-Register: gleiche Haltestelle -> gleiche 17xxxxx-ID über alle Läufe."""
+import json
+import os
+
+from transfer_stops import config
+from transfer_stops.io_utils import atomic_write
+
+REGISTRY_VERSION = 1
+
+
+def format_id(stop_id):
+    """ID im Dateiformat: vergebene IDs (int) 7-stellig mit führenden Nullen, gelesene IDs (Text) unverändert."""
+    return str(stop_id).zfill(7) if isinstance(stop_id, int) else stop_id
+
+
+def registry_key(provider: str, lon: float, lat: float):
+    """Schlüssel einer Haltestelle: Provider + Koordinate in der geschriebenen Genauigkeit (6 Stellen)."""
+    return f"{provider}|{lon:.6f}|{lat:.6f}"
+
+
+class IdRegistry:
+    """
+    Zuordnung Haltestelle -> ID, gespeichert in config.ID_REGISTRY_PATH.
+
+    - entries: aktive Haltestellen (Schlüssel -> {'id', 'name'}); kommt eine Koordinate bei
+      einem Provider mehrfach vor, erhalten die weiteren Vorkommen den Schlüssel mit '#2', '#3', ...
+    - retired: entfernte Haltestellen (Schlüssel -> ID) in Reihenfolge der Stilllegung.
+      Taucht eine Haltestelle wieder auf, erhält sie ihre alte ID zurück; sonst dient
+      die Liste als Free-List für neue Haltestellen (älteste zuerst).
+    - next_id: nächste noch nie vergebene ID
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or config.ID_REGISTRY_PATH
+        data = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != REGISTRY_VERSION:
+                raise ValueError(f"Unbekannte Version des ID-Registers: {self.path}")
+        self.entries = data.get('entries', {})
+        self.retired = data.get('retired', {})
+        self.next_id = data.get('next_id', config.BEGINNING_ID)
+
+    def _new_id(self, used_ids):
+        """Nächste freie ID: zuerst aus der Free-List, sonst fortlaufend ab next_id."""
+        while self.retired:
+            key = next(iter(self.retired))
+            candidate = self.retired.pop(key)
+            if candidate not in used_ids:
+                return candidate
+        while self.next_id in used_ids:
+            self.next_id += 1
+        candidate = self.next_id
+        self.next_id += 1
+        return candidate
+
+    def assign(self, stops, used_ids):
+        """
+        Vergibt IDs an stops (Liste von Dicts mit 'provider', 'lon', 'lat', 'name'; in-place 'id').
+
+        Bekannte Haltestellen behalten ihre ID, wieder aufgetauchte erhalten ihre alte ID
+        zurück, neue erhalten eine ID aus der Free-List bzw. fortlaufend. Nicht mehr
+        vorhandene Haltestellen werden stillgelegt - ihre IDs werden erst in einem
+        späteren Lauf wieder vergeben.
+        used_ids: bereits belegte IDs (ÖV); Kollisionen führen zu einer neuen ID.
+
+        Returns: Änderungen als Dict mit Listen 'added', 'removed', 'renamed' und Zahl 'unchanged'
+        """
+        used_ids = set(used_ids)
+        changes = {'added': [], 'removed': [], 'renamed': [], 'unchanged': 0}
+        pending = []
+        seen = set()
+        occurrences = {}
+
+        for stop in stops:
+            key = registry_key(stop['provider'], stop['lon'], stop['lat'])
+            occurrences[key] = occurrences.get(key, 0) + 1
+            if occurrences[key] > 1:
+                # Doppelte Koordinate desselben Providers: n-tes Vorkommen unter eigenem Schlüssel
+                key = f"{key}#{occurrences[key]}"
+            entry = self.entries.get(key)
+            if entry is not None and entry['id'] not in used_ids:
+                stop['id'] = entry['id']
+                if entry['name'] != stop['name']:
+                    changes['renamed'].append(stop)
+                    entry['name'] = stop['name']
+                else:
+                    changes['unchanged'] += 1
+            elif key in self.retired and self.retired[key] not in used_ids:
+                stop['id'] = self.retired.pop(key)
+                self.entries[key] = {'id': stop['id'], 'name': stop['name']}
+                changes['added'].append(stop)
+            else:
+                pending.append((stop, key))
+            seen.add(key)
+            if 'id' in stop:
+                used_ids.add(stop['id'])
+
+        # Stilllegen was nicht mehr vorkommt (noch nicht in die Free-List dieses Laufs)
+        newly_retired = {}
+        for key in list(self.entries):
+            if key not in seen:
+                entry = self.entries.pop(key)
+                newly_retired[key] = entry['id']
+                provider, lon, lat = key.split('|')
+                lat = lat.split('#')[0]
+                changes['removed'].append({'id': entry['id'], 'provider': provider,
+                                           'lon': float(lon), 'lat': float(lat), 'name': entry['name']})
+
+        for stop, key in pending:
+            stop['id'] = self._new_id(used_ids)
+            used_ids.add(stop['id'])
+            self.entries[key] = {'id': stop['id'], 'name': stop['name']}
+            changes['added'].append(stop)
+
+        self.retired.update(newly_retired)
+        return changes
+
+    def save(self):
+        with atomic_write(self.path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': REGISTRY_VERSION,
+                'next_id': self.next_id,
+                'entries': self.entries,
+                'retired': self.retired,
+            }, f, indent=1, ensure_ascii=False)
@@ -0,0 +1,196 @@
+"""
+Messung pro Pipeline-Stufe: Laufzeit, CPU-Zeit, Anstieg des Spitzen-RSS, Zeilen und Bytes.
+
+Jede Stufe läuft in `with stage(name) as record:`; die Messwerte landen im Laufbericht
+(write_report, JSON). Mit enable_profiling(dir) wird zusätzlich pro Stufe ein
+cProfile-Dump geschrieben (auswertbar mit `python -m pstats` oder snakeviz).
+"""
+import cProfile
+import json
+import os
+import platform
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows: kein Spitzen-RSS
+    resource = None
+
+from transfer_stops.io_utils import atomic_write
+
+REPORT_VERSION = 2
+
+_records = []
+_records_lock = threading.Lock()
+_local = threading.local()
+_profile_dir = None
+_started = None
+
+
+def peak_rss_mb():
+    """Höchster Speicherverbrauch (RSS) des Prozesses bisher in MB, None wenn nicht messbar."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux liefert KB, macOS Bytes
+    return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+
+class StageRecord:
+    """Messwerte einer Stufe; Zeilen und Bytes setzt die Stufe selbst (siehe rows(), read_file())."""
+
+    def __init__(self, name: str, provider: str = None):
+        self.name = name
+        self.provider = provider
+        self.rows_in = None
+        self.rows_out = None
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.wall_s = None
+        self.cpu_s = None
+        self.process_peak_rss_mb = None
+        self.peak_rss_growth_mb = None
+        self.ok = True
+        self.cache_hit = None
+        self.profile = None
+
+    def rows(self, rows_in: int = None, rows_out: int = None):
+        if rows_in is not None:
+            self.rows_in = int(rows_in)
+        if rows_out is not None:
+            self.rows_out = int(rows_out)
+
+    def read_file(self, path: str):
+        if path and os.path.exists(path):
+            self.bytes_read += os.path.getsize(path)
+
+    def wrote_file(self, path: str):
+        if path and os.path.exists(path):
+            self.bytes_written += os.path.getsize(path)
+
+    def as_dict(self):
+        return {
+            'stage': self.name, 'provider': self.provider, 'ok': self.ok,
+            'wall_s': self.wall_s, 'cpu_s': self.cpu_s,
+            'process_peak_rss_mb': self.process_peak_rss_mb, 'peak_rss_growth_mb': self.peak_rss_growth_mb,
+            'rows_in': self.rows_in, 'rows_out': self.rows_out,
+            'bytes_read': self.bytes_read, 'bytes_written': self.bytes_written,
+            'cache_hit': self.cache_hit, 'profile': self.profile,
+        }
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def current():
+    """Innerste laufende Stufe dieses Threads (None ausserhalb einer Stufe)."""
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+def _profile_path(profile_dir: str, record: StageRecord):
+    name = f"{record.name}_{record.provider}" if record.provider else record.name
+    slug = re.sub(r'\W+', '_', name).strip('_').lower()
+    return os.path.join(profile_dir, f"{slug}.prof")
+
+
+@contextmanager
+def stage(name: str, provider: str = None, report: bool = True, profile_dir: str = None):
+    """
+    Misst den Block als Stufe name (optional pro provider).
+
+    Wand- und CPU-Zeit (process_time, bei parallelen Stufen überlappend). Speicher:
+    process_peak_rss_mb ist der Spitzen-RSS des Prozesses seit dessen Start (nach der grössten
+    Stufe bei allen folgenden gleich), peak_rss_growth_mb wie weit die Stufe diese Spitze
+    angehoben hat (0: die Stufe blieb unter dem bisherigen Höchststand). report=False misst nur (z.B. im Worker-Prozess, der das
+    Ergebnis mit as_dict() an den Hauptprozess zurückgibt, siehe add_record).
+    profile_dir (Standard: enable_profiling) schreibt einen cProfile-Dump pro Stufe, nur im
+    Hauptthread (cProfile misst nur den eigenen Thread); verschachtelte Stufen werden im
+    Profil der äusseren Stufe mitgezählt.
+    """
+    record = StageRecord(name, provider)
+    stack = _stack()
+    profile_dir = profile_dir or _profile_dir
+    profiler = None
+    if (profile_dir and threading.current_thread() is threading.main_thread()
+            and not any(outer.profile for outer in stack)):
+        profiler = cProfile.Profile()
+        record.profile = _profile_path(profile_dir, record)
+    stack.append(record)
+
+    wall_start, cpu_start, peak_start = time.perf_counter(), time.process_time(), peak_rss_mb()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield record
+    except BaseException:
+        record.ok = False
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(profile_dir, exist_ok=True)
+            profiler.dump_stats(record.profile)
+        record.wall_s = round(time.perf_counter() - wall_start, 4)
+        record.cpu_s = round(time.process_time() - cpu_start, 4)
+        record.process_peak_rss_mb = peak_rss_mb()
+        if peak_start is not None:
+            record.peak_rss_growth_mb = round(record.process_peak_rss_mb - peak_start, 1)
+        stack.pop()
+        if report:
+            add_record(record.as_dict())
+
+
+def add_record(record):
+    """Nimmt die Messwerte einer Stufe (Dict) in den Laufbericht auf."""
+    with _records_lock:
+        _records.append(record)
+
+
+def records():
+    with _records_lock:
+        return list(_records)
+
+
+def reset():
+    """Beginnt einen neuen Laufbericht (löscht bisherige Messwerte)."""
+    global _started
+    with _records_lock:
+        _records.clear()
+    _started = datetime.now().isoformat(timespec='seconds')
+
+
+def enable_profiling(profile_dir: str = None):
+    """Schreibt ab jetzt pro Stufe einen cProfile-Dump nach profile_dir (None schaltet ab)."""
+    global _profile_dir
+    _profile_dir = profile_dir
+
+
+def profiling_dir():
+    return _profile_dir
+
+
+def write_report(path: str, meta=None):
+    """Schreibt den Laufbericht als JSON: Lauf-Informationen und eine Zeile pro Stufe."""
+    stages = records()
+    report = {
+        'version': REPORT_VERSION,
+        'started': _started,
+        'finished': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'process_peak_rss_mb': peak_rss_mb(),
+        'meta': meta or {},
+        'stages': stages,
+    }
+    with atomic_write(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return report
@@ -0,0 +1,50 @@
+"""Datei-Hilfsfunktionen für Caches und Outputs."""
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+def _current_umask():
+    # os.umask lässt sich nur setzen und zurücksetzen - einmal beim Import, bevor Threads laufen
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+_UMASK = _current_umask()
+
+
+class UnchangedContent(Exception):
+    """Im Block von atomic_write auslösen, um die neue Datei zu verwerfen (bisherige Datei bleibt)."""
+
+
+def output_mode(path: str):
+    """Rechte für path: die der bestehenden Datei, sonst wie bei open() (0o666 ohne umask)."""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = 'w', encoding: str = None, newline: str = None):
+    """
+    Schreibt eine Datei atomar: zuerst in eine temporäre Datei im Zielordner,
+    danach os.replace(). Bei einem Fehler bleibt die bisherige Datei unverändert,
+    ebenso wenn der Block UnchangedContent auslöst (ohne Fehler).
+    Die Datei erhält die Rechte der bisherigen Datei bzw. die von open() (mkstemp: nur 0o600).
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, encoding=encoding, newline=newline) as f:
+            yield f
+        os.chmod(tmp_path, output_mode(path))
+        os.replace(tmp_path, path)
+    except UnchangedContent:
+        os.remove(tmp_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,99 @@
+"""
+Logging für die Pipeline: Logger pro Modul unter 'transfer_stops', Zähler pro Stufe
+und Ausgabe als lesbarer Text (wie bisher die print-Ausgaben) oder als JSON-Zeilen.
+
+Zusammenfassungen laufen auf INFO, Details pro Haltestelle nur auf DEBUG.
+"""
+import json
+import logging
+import sys
+from collections import Counter
+
+from transfer_stops import config
+
+LOGGER_NAME = 'transfer_stops'
+BANNER_WIDTH = 50
+
+_counters = {}
+
+
+def get_logger(name: str = None):
+    """Logger 'transfer_stops.<name>' (Modulname ohne Paket, z.B. 'transform')."""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}" if name else LOGGER_NAME)
+
+
+class TextFormatter(logging.Formatter):
+    """Nur die Meldung; Stufen-Titel (extra={'banner': True}) eingerahmt wie bisher."""
+
+    def format(self, record):
+        message = super().format(record)
+        if getattr(record, 'banner', False):
+            line = "=" * BANNER_WIDTH
+            return f"\n{line}\n{message}\n{line}"
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    """Eine JSON-Zeile pro Meldung mit Zeit, Level, Logger, Meldung und ggf. Stufe und Zählern."""
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage().strip(),
+        }
+        for key in ('stage', 'counters'):
+            if hasattr(record, key):
+                data[key] = getattr(record, key)
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+def setup_logging(level: str = None, json_output: bool = None, stream=None):
+    """
+    Richtet den Logger 'transfer_stops' ein (Standard: config.LOG_LEVEL, config.LOG_JSON).
+    Ausgabe auf stdout, damit sie sich wie bisher mit den Meldungen aus main.py mischt.
+    Mehrfacher Aufruf ersetzt die bisherige Einstellung.
+    """
+    level = level or config.LOG_LEVEL
+    json_output = config.LOG_JSON if json_output is None else json_output
+
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter() if json_output else TextFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
+
+
+def banner(logger, title: str):
+    """Titel einer Pipeline-Stufe (im Text-Format zwischen zwei Linien)."""
+    logger.info(title, extra={'banner': True, 'stage': title})
+
+
+def count(stage: str, name: str, n: int = 1):
+    """Erhöht den Zähler name der Stufe stage um n."""
+    _counters.setdefault(stage, Counter())[name] += n
+
+
+def counters(stage: str = None):
+    """Zähler einer Stufe (Dict) bzw. aller Stufen (Dict Stufe -> Dict)."""
+    if stage is not None:
+        return dict(_counters.get(stage, {}))
+    return {name: dict(values) for name, values in _counters.items()}
+
+
+def reset_counters():
+    _counters.clear()
+
+
+def log_counters(logger, level: int = logging.INFO):
+    """Eine Meldung pro Stufe mit allen Zählern (im JSON-Format als Feld 'counters')."""
+    for stage, values in counters().items():
+        summary = ", ".join(f"{name}={value}" for name, value in values.items())
+        logger.log(level, f"📊 {stage}: {summary}", extra={'stage': stage, 'counters': values})
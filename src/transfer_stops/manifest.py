@@ -0,0 +1,159 @@
+"""Persistentes Manifest (cache/manifest.json): Inhalts-Hashes der Dateien und Metadaten der Quellen."""
+import hashlib
+import json
+import os
+import threading
+
+from transfer_stops import config
+from transfer_stops.io_utils import atomic_write
+from transfer_stops.log import get_logger
+
+logger = get_logger('manifest')
+
+MANIFEST_VERSION = 1
+HASH_ALGORITHM = 'blake2b-128'
+
+
+def new_hasher():
+    """Hash-Objekt für Dateiinhalte (BLAKE2b, 128 Bit - deutlich schneller als MD5/SHA-256)."""
+    return hashlib.blake2b(digest_size=16)
+
+
+def compute_file_hash(filepath: str, chunk_size: int = 1 << 20):
+    """Liest filepath blockweise und gibt den Inhalts-Hash zurück."""
+    hasher = new_hasher()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class Manifest:
+    """
+    Speichert pro Datei Hash, Grösse, Änderungszeit und Herkunft sowie pro Quell-URL
+    die HTTP-Metadaten (ETag, Last-Modified, Content-Length).
+
+    file_hash() liest eine Datei nur dann neu, wenn Grösse oder Änderungszeit nicht mehr
+    mit dem Manifest übereinstimmen (oder verify=True gesetzt ist).
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(config.CACHE_DIR, 'manifest.json')
+        self.lock = threading.RLock()
+        data = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if data.get('version') != MANIFEST_VERSION or data.get('algorithm') != HASH_ALGORITHM:
+            data = {}
+        self.files = data.get('files', {})
+        self.sources = data.get('sources', {})
+
+    @staticmethod
+    def _key(filepath: str):
+        return os.path.normpath(filepath).replace('\\', '/')
+
+    def file_hash(self, filepath: str, verify: bool = None):
+        """
+        Hash von filepath; None wenn die Datei nicht existiert.
+        verify=True (Standard: config.VERIFY_HASHES) rechnet immer neu und prüft das Manifest.
+        """
+        if verify is None:
+            verify = config.VERIFY_HASHES
+        key = self._key(filepath)
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            with self.lock:
+                if self.files.pop(key, None) is not None:
+                    self.save()
+            return None
+
+        with self.lock:
+            entry = self.files.get(key)
+        if (not verify and entry is not None
+                and (entry['size'], entry['mtime_ns']) == (stat.st_size, stat.st_mtime_ns)):
+            return entry['hash']
+
+        file_hash = compute_file_hash(filepath)
+        if verify and entry is not None and entry['hash'] != file_hash and entry['size'] == stat.st_size:
+            logger.warning(f"⚠️ Manifest veraltet für {key} - Hash neu berechnet")
+        self.record(filepath, file_hash, source=entry.get('source') if entry else None)
+        return file_hash
+
+    def record(self, filepath: str, file_hash: str, source: str = None, inputs=None):
+        """
+        Trägt eine (neu geschriebene) Datei mit bekanntem Hash ins Manifest ein.
+        inputs: Eingaben (Hashes, Parameter), aus denen die Datei erzeugt wurde; bei
+        unverändertem Hash bleiben bisher eingetragene Eingaben erhalten.
+        """
+        stat = os.stat(filepath)
+        key = self._key(filepath)
+        with self.lock:
+            previous = self.files.get(key)
+            entry = {
+                'hash': file_hash,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'source': source,
+            }
+            if inputs is not None:
+                entry['inputs'] = inputs
+            elif previous is not None and previous['hash'] == file_hash and 'inputs' in previous:
+                entry['inputs'] = previous['inputs']
+            self.files[key] = entry
+            self.save()
+
+    def record_derived(self, filepath: str, inputs):
+        """
+        Trägt eine erzeugte Datei mit den Eingaben ein, aus denen sie entstanden ist.
+        Siehe is_derived_current().
+        """
+        self.record(filepath, compute_file_hash(filepath), inputs=inputs)
+
+    def is_derived_current(self, filepath: str, inputs):
+        """True wenn filepath unverändert existiert und aus genau diesen Eingaben erzeugt wurde."""
+        with self.lock:
+            entry = self.files.get(self._key(filepath))
+        if entry is None or entry.get('inputs') != inputs:
+            return False
+        return self.file_hash(filepath) == entry['hash']
+
+    def source_metadata(self, url: str):
+        """Gespeicherte HTTP-Metadaten einer Quell-URL (leeres Dict wenn unbekannt)."""
+        with self.lock:
+            return dict(self.sources.get(url, {}))
+
+    def set_source_metadata(self, url: str, metadata):
+        """Setzt (oder löscht bei None) die HTTP-Metadaten einer Quell-URL."""
+        with self.lock:
+            if metadata is None:
+                self.sources.pop(url, None)
+            else:
+                self.sources[url] = metadata
+            self.save()
+
+    def save(self):
+        with self.lock:
+            with atomic_write(self.path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': MANIFEST_VERSION,
+                    'algorithm': HASH_ALGORITHM,
+                    'files': self.files,
+                    'sources': self.sources,
+                }, f, indent=2, sort_keys=True)
+
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def get_manifest():
+    """Gemeinsames Manifest für alle (parallelen) Stufen eines Laufs."""
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = Manifest()
+        return _manifest
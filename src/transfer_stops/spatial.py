@@ -0,0 +1,233 @@
+"""Räumliche Hilfsfunktionen: Haversine-Distanz und Grid-Index für Nachbarschaftssuchen."""
+import math
+
+import numpy as np
+
+
+EARTH_RADIUS_METERS = 6371000
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """
+    Berechnet die kürzeste Distanz zwischen zwei GPS-Koordinaten auf der Erdkugel.
+
+    Die Haversine-Formel berücksichtigt die Erdkrümmung und berechnet die Luftlinie
+    entlang der Erdoberfläche (Großkreis-Distanz). Benannt nach der Haversine-Funktion
+    (hav(θ) = sin²(θ/2)), die numerisch stabiler ist als andere trigonometrische Formeln.
+
+    Returns: Distanz in Metern
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    delta_phi, delta_lambda = math.radians(lat2 - lat1), math.radians(lon2 - lon1)
+    a = math.sin(delta_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    return EARTH_RADIUS_METERS * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def haversine_np(lat1, lon1, lat2, lon2):
+    """
+    Vektorisierte Haversine-Distanz in Metern für NumPy-Arrays (mit Broadcasting).
+
+    Gleiche Formel wie haversine_distance, aber für ganze Arrays pro Aufruf:
+    z.B. Skalar gegen Array (one-to-many) oder Spalten- gegen Zeilenvektor (Matrix).
+    """
+    lat1, lon1 = np.asarray(lat1, dtype=np.float64), np.asarray(lon1, dtype=np.float64)
+    lat2, lon2 = np.asarray(lat2, dtype=np.float64), np.asarray(lon2, dtype=np.float64)
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    delta_phi, delta_lambda = np.radians(lat2 - lat1), np.radians(lon2 - lon1)
+    a = np.sin(delta_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda / 2) ** 2
+    a = np.clip(a, 0.0, 1.0)
+    return EARTH_RADIUS_METERS * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def micro_degree_keys(lats, lons):
+    """
+    Koordinaten-Schlüssel als int64: Breite und Länge auf Mikrograd (6 Nachkommastellen,
+    die geschriebene Genauigkeit) gerundet und zu einer Zahl zusammengesetzt.
+    Gleiche Schlüssel = gleiche Koordinate in BFKOORD_WGS.
+    """
+    lat_keys = np.rint(np.asarray(lats, dtype=np.float64) * 1e6).astype(np.int64) + 90_000_000
+    lon_keys = np.rint(np.asarray(lons, dtype=np.float64) * 1e6).astype(np.int64) + 180_000_000
+    return lat_keys * 360_000_001 + lon_keys
+
+
+def haversine_one_to_many(lat, lon, lats, lons):
+    """Distanzen in Metern von einem Punkt zu allen Punkten in lats/lons."""
+    return haversine_np(lat, lon, lats, lons)
+
+
+def haversine_blocks(lats1, lons1, lats2, lons2, block_size: int = 1024):
+    """
+    Distanzmatrix zwischen zwei Punktmengen, blockweise berechnet.
+
+    Liefert (start, block) mit block.shape == (<= block_size, len(lats2)), wobei
+    block[k] die Distanzen von Punkt start + k der ersten Menge enthält.
+    So bleibt der Speicherbedarf auch bei grossen Mengen begrenzt.
+    """
+    lats1, lons1 = np.asarray(lats1, dtype=np.float64), np.asarray(lons1, dtype=np.float64)
+    lats2, lons2 = np.asarray(lats2, dtype=np.float64), np.asarray(lons2, dtype=np.float64)
+    for start in range(0, len(lats1), block_size):
+        stop = start + block_size
+        yield start, haversine_np(lats1[start:stop, None], lons1[start:stop, None], lats2[None, :], lons2[None, :])
+
+
+class GridIndex:
+    """
+    Gitter über Lat/Lon-Zellen mit Kantenlänge = Suchradius.
+
+    Ein Punkt innerhalb von radius_meters liegt höchstens eine Zeile (Breite) entfernt;
+    in Längenrichtung wird die Anzahl Spalten aus der Breite berechnet, damit auch
+    nördliche Punkte (kleiner Längenkreis) korrekt gefunden werden.
+    Über den Datumsgrenzen-Übergang (±180°) wird umgebrochen.
+    """
+
+    def __init__(self, radius_meters: float):
+        if radius_meters <= 0:
+            raise ValueError("radius_meters muss grösser als 0 sein")
+        self.radius_meters = radius_meters
+        # Zellgrösse in Grad; minimal 1e-6° damit sehr kleine Radien keine Riesengitter erzeugen
+        self.cell_deg = max(math.degrees(radius_meters / EARTH_RADIUS_METERS), 1e-6)
+        self.n_cols = max(1, math.ceil(360.0 / self.cell_deg))
+
+    def cells(self, lats, lons):
+        """Zeilen- und Spaltenindex der Zellen für Arrays von Koordinaten."""
+        rows = np.floor(lats / self.cell_deg).astype(np.int64)
+        cols = np.floor((lons + 180.0) / self.cell_deg).astype(np.int64) % self.n_cols
+        return rows, cols
+
+    def _col_span(self, lat):
+        """Anzahl Nachbarspalten, die für einen Punkt auf Breite lat geprüft werden müssen."""
+        delta_phi = self.radius_meters / EARTH_RADIUS_METERS
+        phi_max = abs(math.radians(lat)) + delta_phi
+        if phi_max >= math.pi / 2:
+            return self.n_cols
+        # Aus der Haversine-Formel: sin(Δλ/2) <= sin(d/2R) / cos(φ_max)
+        ratio = math.sin(delta_phi / 2) / math.cos(phi_max)
+        if ratio >= 1:
+            return self.n_cols
+        delta_lambda = math.degrees(2 * math.asin(ratio))
+        return math.ceil(delta_lambda / self.cell_deg) + 1
+
+    def row_col_span(self, row):
+        """Spaltenspanne für eine ganze Gitterzeile (massgebend ist der polnähere Rand)."""
+        edge_lat = max(abs(row * self.cell_deg), abs((row + 1) * self.cell_deg))
+        return self._col_span(min(edge_lat, 90.0))
+
+
+def pairs_within(lats1, lons1, lats2, lons2, radius_meters: float, chunk_size: int = 65536):
+    """
+    Alle Paare (i, j) mit Distanz(Menge1[i], Menge2[j]) < radius_meters.
+
+    Beide Mengen werden in Gitterzellen (Kantenlänge = Radius) eingeteilt. Für jeden
+    Nachbarzellen-Versatz werden die Zellschlüssel der ersten Menge per searchsorted
+    in der sortierten zweiten Menge gesucht; die Distanzen aller Kandidaten werden
+    danach in einem Aufruf von haversine_np berechnet. Punkte in Polnähe, deren
+    Nachbarschaft alle Spalten umfasst, werden direkt gegen die ganze Menge geprüft.
+
+    Returns: (i, j, distanz) als NumPy-Arrays, sortiert nach i, dann j
+    """
+    lats1, lons1 = np.asarray(lats1, dtype=np.float64), np.asarray(lons1, dtype=np.float64)
+    lats2, lons2 = np.asarray(lats2, dtype=np.float64), np.asarray(lons2, dtype=np.float64)
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+    if radius_meters <= 0 or len(lats1) == 0 or len(lats2) == 0:
+        return empty
+
+    grid = GridIndex(radius_meters)
+    rows2, cols2 = grid.cells(lats2, lons2)
+    keys2 = rows2 * grid.n_cols + cols2
+    order2 = np.argsort(keys2, kind='stable')
+    sorted_keys2 = keys2[order2]
+
+    rows1, cols1 = grid.cells(lats1, lons1)
+    unique_rows1, row_index1 = np.unique(rows1, return_inverse=True)
+    spans1 = np.array([grid.row_col_span(row) for row in unique_rows1], dtype=np.int64)[row_index1]
+    full_width = 2 * spans1 + 1 >= grid.n_cols
+
+    result_i, result_j, result_d = [], [], []
+
+    def add_candidates(i, j):
+        distances = haversine_np(lats1[i], lons1[i], lats2[j], lons2[j])
+        hit = distances < radius_meters
+        result_i.append(i[hit])
+        result_j.append(j[hit])
+        result_d.append(distances[hit])
+
+    # Polnahe Punkte: Nachbarschaft umfasst alle Längen, direkt gegen alle prüfen
+    all_j = np.arange(len(lats2), dtype=np.int64)
+    for i in np.flatnonzero(full_width):
+        add_candidates(np.full(len(all_j), i, dtype=np.int64), all_j)
+
+    # Nach Zellschlüssel sortiert sind auch die Suchschlüssel sortiert -> searchsorted cache-freundlich
+    regular = np.flatnonzero(~full_width)
+    regular = regular[np.argsort(rows1[regular] * grid.n_cols + cols1[regular], kind='stable')]
+    max_span = int(spans1[regular].max()) if len(regular) else 0
+    for start in range(0, len(regular), chunk_size):
+        chunk = regular[start:start + chunk_size]
+        for d_row in (-1, 0, 1):
+            for d_col in range(-max_span, max_span + 1):
+                part = chunk[np.abs(d_col) <= spans1[chunk]]
+                if not len(part):
+                    continue
+                target = (rows1[part] + d_row) * grid.n_cols + (cols1[part] + d_col) % grid.n_cols
+                left = np.searchsorted(sorted_keys2, target, side='left')
+                counts = np.searchsorted(sorted_keys2, target, side='right') - left
+                total = int(counts.sum())
+                if not total:
+                    continue
+                # Bereiche [left, left + count) pro Punkt zu flachen Kandidatenlisten expandieren
+                offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                add_candidates(np.repeat(part, counts), order2[np.repeat(left, counts) + offsets])
+
+    if not result_i:
+        return empty
+    i, j, d = np.concatenate(result_i), np.concatenate(result_j), np.concatenate(result_d)
+    order = np.lexsort((j, i))
+    return i[order], j[order], d[order]
+
+
+def dedup_by_distance(points, distance_threshold_meters: float):
+    """
+    Entfernt räumlich nahe Duplikate aus einer Liste von (lat, lon)-Punkten.
+
+    Die Punkte werden in Eingabereihenfolge verarbeitet: ein Punkt wird behalten,
+    wenn kein bereits behaltener Punkt näher als distance_threshold_meters liegt
+    (first-kept-wins). Für entfernte Punkte wird der nächstgelegene behaltene Punkt
+    gemeldet; bei gleicher Distanz gewinnt der zuerst behaltene.
+
+    Returns: (kept, removed)
+        kept: Indizes der behaltenen Punkte
+        removed: Liste von (index, kept_index, distanz) für entfernte Punkte
+    """
+    if distance_threshold_meters <= 0:
+        return list(range(len(points))), []
+
+    lats = np.fromiter((p[0] for p in points), dtype=np.float64, count=len(points))
+    lons = np.fromiter((p[1] for p in points), dtype=np.float64, count=len(points))
+
+    # Alle Nachbarpaare in einem Aufruf, danach nur noch die sequentielle Auflösung in Python
+    pair_i, pair_j, pair_d = pairs_within(lats, lons, lats, lons, distance_threshold_meters)
+    earlier = pair_j < pair_i
+    pair_i, pair_j, pair_d = pair_i[earlier].tolist(), pair_j[earlier].tolist(), pair_d[earlier].tolist()
+
+    is_kept = [False] * len(points)
+    kept = []
+    removed = []
+    p = 0
+    for i in range(len(points)):
+        closest = None
+        min_distance = float('inf')
+
+        # Nachbarn sind nach Index sortiert, damit Gleichstände wie bisher aufgelöst werden
+        while p < len(pair_i) and pair_i[p] == i:
+            j, distance = pair_j[p], pair_d[p]
+            if is_kept[j] and distance < min_distance:
+                min_distance = distance
+                closest = j
+            p += 1
+
+        if closest is None:
+            kept.append(i)
+            is_kept[i] = True
+        else:
+            removed.append((i, closest, min_distance))
+
+    return kept, removed
@@ -0,0 +1,205 @@
+"""
+Inhaltsadressierter Cache für Stufen-Ergebnisse (cache/stages/).
+
+Der Schlüssel eines Eintrags ist ein Hash über Stufenname, Eingaben (Inhalts-Hashes der
+Eingabedateien, Parameter) und Code-Version (Hash der Quelltexte der beteiligten Module).
+Ändert sich eines davon, entsteht ein neuer Schlüssel - alte Einträge werden nie mehr
+gelesen und verschwinden per LRU, sobald der Cache grösser als config.STAGE_CACHE_MAX_MB ist.
+
+Ein Eintrag ist ein Ordner cache/stages/<stufe>/<schlüssel>/ mit den Ergebnisdateien und
+meta.json; er wird in einem temporären Ordner geschrieben und erst vollständig umbenannt.
+Die Änderungszeit von meta.json gilt als letzte Verwendung.
+
+Einträge übernehmen, Aufräumen und Löschen sind über Threads und Prozesse gesperrt
+(flock auf cache/stages/.lock). Aufgeräumt wird nur im Hauptprozess: Worker-Prozesse
+(PROVIDER_WORKERS > 1) legen nur Einträge ab, der Hauptprozess ruft danach evict() auf.
+"""
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: Sperre nur zwischen Threads
+    fcntl = None
+
+from transfer_stops import config
+from transfer_stops.log import get_logger
+from transfer_stops.manifest import new_hasher
+
+logger = get_logger('stage_cache')
+
+STAGE_CACHE_VERSION = 1
+META_FILE = 'meta.json'
+LOCK_FILE = '.lock'
+
+# Alle StageCache-Objekte eines Prozesses teilen die Sperre (get_stage_cache erzeugt jeweils ein neues)
+_lock = threading.Lock()
+
+_code_versions = {}
+
+
+def code_version(*modules):
+    """Hash der Quelltexte der Module (einmal pro Prozess gelesen)."""
+    paths = tuple(module.__file__ for module in modules)
+    if paths not in _code_versions:
+        hasher = new_hasher()
+        for path in paths:
+            with open(path, 'rb') as f:
+                hasher.update(f.read())
+        _code_versions[paths] = hasher.hexdigest()
+    return _code_versions[paths]
+
+
+def stage_key(stage: str, inputs, code: str = None):
+    """Schlüssel eines Stufen-Ergebnisses aus Stufenname, Eingaben (JSON-serialisierbar) und Code-Version."""
+    hasher = new_hasher()
+    hasher.update(json.dumps(
+        {'version': STAGE_CACHE_VERSION, 'stage': stage, 'inputs': inputs, 'code': code},
+        sort_keys=True, ensure_ascii=False
+    ).encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def _dir_size(path: str):
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(directory, name))
+            except OSError:
+                pass
+    return total
+
+
+class StageCache:
+    """
+    Einträge pro Stufe und Schlüssel, begrenzt auf max_bytes (älteste Verwendung zuerst entfernt).
+
+        entry = cache.get('extract', key)          # Ordner des Eintrags oder None
+        with cache.put('extract', key) as entry:   # Dateien nach entry schreiben
+            ...
+    """
+
+    def __init__(self, root: str = None, max_bytes: int = None):
+        self.root = root or os.path.join(config.CACHE_DIR, 'stages')
+        self.max_bytes = int(config.STAGE_CACHE_MAX_MB * (1 << 20)) if max_bytes is None else max_bytes
+
+    def path(self, stage: str, key: str):
+        return os.path.join(self.root, stage, key)
+
+    @contextmanager
+    def locked(self):
+        """Sperrt den Cache für andere Threads und (mit fcntl) andere Prozesse."""
+        with _lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, LOCK_FILE), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, stage: str, key: str):
+        """Ordner des Eintrags (als verwendet markiert), None wenn nicht (vollständig) vorhanden."""
+        entry = self.path(stage, key)
+        try:
+            os.utime(os.path.join(entry, META_FILE))
+        except OSError:
+            return None
+        return entry
+
+    def meta(self, entry: str):
+        """Metadaten eines Eintrags (Dict aus put(..., meta))."""
+        with open(os.path.join(entry, META_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)['meta']
+
+    @contextmanager
+    def put(self, stage: str, key: str, meta=None):
+        """
+        Schreibt einen Eintrag: der Block schreibt seine Dateien in den übergebenen Ordner.
+        Bei einem Fehler im Block wird nichts gespeichert; ein gleichzeitig (z.B. von einem
+        anderen Prozess) gespeicherter Eintrag mit demselben Schlüssel bleibt bestehen.
+        Danach wird aufgeräumt (evict), ausser in einem Worker-Prozess.
+        """
+        stage_dir = os.path.join(self.root, stage)
+        os.makedirs(stage_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=stage_dir, prefix=f'.{key}.', suffix='.tmp')
+        try:
+            yield tmp_dir
+            with open(os.path.join(tmp_dir, META_FILE), 'w', encoding='utf-8') as f:
+                json.dump({'stage': stage, 'key': key, 'created': time.time(), 'meta': meta or {}}, f)
+            with self.locked():
+                try:
+                    os.replace(tmp_dir, self.path(stage, key))
+                except OSError:
+                    # Eintrag existiert bereits (gleicher Inhalt, da gleicher Schlüssel)
+                    pass
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        if multiprocessing.parent_process() is None:
+            self.evict()
+
+    def entries(self):
+        """Alle Einträge als Liste von (Ordner, Grösse in Bytes, letzte Verwendung)."""
+        result = []
+        try:
+            stages = os.listdir(self.root)
+        except FileNotFoundError:
+            return result
+        for stage in stages:
+            stage_dir = os.path.join(self.root, stage)
+            try:
+                keys = os.listdir(stage_dir)
+            except (FileNotFoundError, NotADirectoryError):
+                continue  # z.B. LOCK_FILE
+            for key in keys:
+                if key.startswith('.'):
+                    continue  # temporärer Ordner eines put() in Arbeit
+                entry = os.path.join(stage_dir, key)
+                try:
+                    last_used = os.path.getmtime(os.path.join(entry, META_FILE))
+                except OSError:
+                    continue  # unvollständig oder gerade in Arbeit
+                result.append((entry, _dir_size(entry), last_used))
+        return result
+
+    def evict(self, max_bytes: int = None):
+        """Entfernt die am längsten nicht verwendeten Einträge, bis der Cache höchstens max_bytes gross ist."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self.locked():
+            entries = sorted(self.entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for entry, size, _ in entries:
+                if total <= max_bytes:
+                    break
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+                removed += 1
+        if removed:
+            logger.info(f"🗑️ Stage-Cache: {removed} alte Einträge entfernt ({total / (1 << 20):.1f} MB belegt)")
+        return removed
+
+    def clear(self):
+        if not os.path.isdir(self.root):
+            return
+        with self.locked():
+            for name in os.listdir(self.root):
+                if name != LOCK_FILE:
+                    shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+
+def get_stage_cache():
+    """Stage-Cache gemäss config (None wenn config.STAGE_CACHE abgeschaltet ist)."""
+    if not config.STAGE_CACHE:
+        return None
+    return StageCache()
@@ -0,0 +1,106 @@
+"""
+Gemeinsame Fixtures der Tests: src/ auf dem Importpfad und ein lokaler HTTP-Server
+als Ersatz für die Download-Quellen (opentransportdata.swiss, GTFS-Feeds).
+"""
+import hashlib
+import io
+import os
+import sys
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from transfer_stops import config, manifest  # noqa: E402
+
+
+def make_zip(members):
+    """ZIP-Archiv im Speicher aus {Dateiname: Inhalt}."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for name, content in members.items():
+            zip_file.writestr(name, content)
+    return buffer.getvalue()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """GET/HEAD mit Verzögerung pro Datei, ETag und Range/If-Range; unbekannte Pfade -> 404."""
+
+    def do_HEAD(self):
+        self._respond(head_only=True)
+
+    def do_GET(self):
+        self._respond(head_only=False)
+
+    def _respond(self, head_only: bool):
+        stub = self.server.stub
+        stub.requests.append((self.command, self.path, dict(self.headers)))
+        entry = stub.files.get(self.path)
+        if entry is None:
+            self.send_error(404)
+            return
+        body, delay = entry
+        time.sleep(delay)
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+        status, payload = 200, body
+        byte_range = self.headers.get('Range')
+        if byte_range and self.headers.get('If-Range', etag) == etag:
+            start, end = byte_range.split('=', 1)[1].split('-')
+            status, payload = 206, body[int(start):int(end) + 1]
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('ETag', etag)
+        self.send_header('Accept-Ranges', 'bytes')
+        if status == 206:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(body)}")
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """Lokaler HTTP-Server: add(pfad, inhalt, verzögerung) stellt eine Datei bereit."""
+
+    def __init__(self):
+        self.files = {}
+        self.requests = []
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def add(self, path: str, body: bytes, delay: float = 0.0):
+        self.files[path] = (body, delay)
+        return self.url(path)
+
+    def url(self, path: str):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}{path}"
+
+
+@pytest.fixture
+def http_server():
+    server = StubServer()
+    server.thread.start()
+    try:
+        yield server
+    finally:
+        server.httpd.shutdown()
+        server.httpd.server_close()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Leeres Arbeitsverzeichnis mit eigenem Manifest (cache/manifest.json)."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(manifest, '_manifest', None)
+    monkeypatch.setattr(config, 'HTTP_RANGE_DOWNLOADS', False)
+    return tmp_path
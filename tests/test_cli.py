@@ -0,0 +1,76 @@
+"""Tests für die Stufenauswahl der Kommandozeile (transfer_stops.cli)."""
+import io
+import sys
+
+import pytest
+
+from transfer_stops import cli
+
+
+def test_default_range_is_download_to_load():
+    assert cli.select_stages() == ['download', 'extract', 'clean', 'assign-ids', 'load']
+
+
+def test_from_after_load_ends_at_from():
+    assert cli.select_stages(first='zip') == ['zip']
+    assert cli.select_stages(first='metabhf', last='zip') == ['metabhf', 'zip']
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'only': 'clean'},
+    {'last': 'clean'},
+    {'first': 'extract', 'last': 'clean'},
+])
+def test_clean_requires_assign_ids(kwargs):
+    with pytest.raises(ValueError, match='assign-ids'):
+        cli.select_stages(**kwargs)
+
+
+def test_clean_is_no_standalone_command():
+    with pytest.raises(SystemExit):
+        cli.build_parser().parse_args(['clean'])
+    assert cli.select_stages(first='clean', last='assign-ids') == ['clean', 'assign-ids']
+
+
+def test_reversed_range_is_rejected():
+    with pytest.raises(ValueError):
+        cli.select_stages(first='load', last='extract')
+
+
+@pytest.fixture
+def full_run(workdir, monkeypatch):
+    """Vollständiger Lauf ohne Downloads und Pipeline; zeichnet Aufrufe von clean_data auf."""
+    from transfer_stops import clean_data
+    from transfer_stops.etl import pipeline
+
+    calls = []
+    monkeypatch.setattr(cli, 'download_and_reset_outputs', lambda: {})
+    monkeypatch.setattr(pipeline, 'run_pipeline', lambda *args: True)
+    monkeypatch.setattr(clean_data, 'clean_data', lambda: calls.append('clean_data'))
+    monkeypatch.setattr(sys, 'stdin', io.StringIO())  # keine Konsole, wie unter cron
+    return calls
+
+
+def test_yes_does_not_delete_data(full_run):
+    assert cli.main(['run', '--yes']) == 0
+    assert full_run == []
+
+
+def test_cleanup_flag_deletes_data(full_run):
+    assert cli.main(['run', '--cleanup']) == 0
+    assert full_run == ['clean_data']
+
+
+def test_failing_pipeline_stage_exits_with_error(full_run, monkeypatch, capsys):
+    from transfer_stops.etl import metabhf, pipeline
+
+    monkeypatch.setattr(pipeline, 'run_pipeline', lambda *args: False)
+    monkeypatch.setattr(metabhf, 'postprocess_metabhf', lambda: full_run.append('metabhf') or True)
+    assert cli.main(['run', '--to', 'metabhf']) == 1
+    assert full_run == []
+    assert "mit Fehlern" in capsys.readouterr().out
+
+
+def test_cleanup_and_no_cleanup_are_exclusive():
+    with pytest.raises(SystemExit):
+        cli.build_parser().parse_args(['run', '--cleanup', '--no-cleanup'])
@@ -0,0 +1,67 @@
+"""Tests für die parallelen Downloads (extract.download_all_sources) gegen einen lokalen HTTP-Server."""
+import os
+import time
+
+import pytest
+import requests
+
+from transfer_stops import config
+from transfer_stops.etl import extract
+
+from conftest import make_zip
+
+DELAY = 0.5
+STOPS = "stop_id,stop_name,stop_lat,stop_lon\n1,Bern,46.948,7.439\n"
+
+
+def oev_zip():
+    return make_zip({name: f"*F {name}\n" for name in config.oev_files})
+
+
+def provider(server, name: str):
+    return {'name': name, 'gtfs_url': server.url(f'/{name}.zip'), 'input_path': f'data/raw/{name}/stops.txt'}
+
+
+@pytest.fixture
+def sources(http_server, workdir, monkeypatch):
+    """ÖV-Sammlung und zwei Provider, jede Quelle mit DELAY Sekunden Antwortzeit."""
+    monkeypatch.setattr(config, 'OEV_SAMMLUNG_URL', http_server.add('/oev.zip', oev_zip(), DELAY))
+    http_server.add('/A.zip', make_zip({'stops.txt': STOPS}), DELAY)
+    http_server.add('/B.zip', make_zip({'stops.txt': STOPS + "2,Thun,46.75,7.62\n"}), DELAY)
+    return [provider(http_server, 'A'), provider(http_server, 'B')]
+
+
+def test_sources_download_concurrently(sources):
+    start = time.perf_counter()
+    oev_changed, results = extract.download_all_sources(sources)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 3 * DELAY
+    assert oev_changed is True
+    assert results == {'A': True, 'B': True}
+    assert all(os.path.exists(f'data/raw/oevSammlung/{name}') for name in config.oev_files)
+    assert os.path.exists('data/raw/A/stops.txt') and os.path.exists('data/raw/B/stops.txt')
+
+
+def test_unchanged_sources_report_no_changes(sources):
+    extract.download_all_sources(sources)
+    assert extract.download_all_sources(sources) == (False, {'A': False, 'B': False})
+
+
+@pytest.mark.parametrize('broken, error', [
+    (None, requests.HTTPError),                           # 404
+    (make_zip({'routes.txt': 'route_id\n'}), FileNotFoundError),  # ZIP ohne stops.txt
+])
+def test_failing_provider_does_not_stop_the_others(sources, http_server, broken, error):
+    del http_server.files['/A.zip']
+    if broken is not None:
+        http_server.add('/A.zip', broken)
+
+    with pytest.raises(error):
+        extract.download_all_sources(sources)
+
+    # A scheitert sofort, B (langsamer) wird trotzdem fertig geschrieben, bevor der Fehler weitergereicht wird
+    assert not os.path.exists('data/raw/A/stops.txt')
+    with open('data/raw/B/stops.txt', encoding='utf-8') as f:
+        assert f.read() == STOPS + "2,Thun,46.75,7.62\n"
+    assert os.path.exists('data/raw/oevSammlung/BFKOORD_WGS')
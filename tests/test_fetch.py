@@ -0,0 +1,50 @@
+"""Tests für transfer_stops.etl.fetch (HTTP-Range-Zugriff, Entpacken) gegen einen lokalen HTTP-Server."""
+import os
+import stat
+
+import pytest
+
+from transfer_stops.etl.fetch import extract_member_if_changed, open_remote_zip
+from transfer_stops.manifest import get_manifest
+
+from conftest import make_zip
+
+# Zufallsdaten lassen sich nicht komprimieren: stops.txt liegt ausserhalb des ersten Range-Blocks
+STOPS = os.urandom(1 << 20)
+
+
+def test_range_reads_send_if_range(http_server, workdir):
+    url = http_server.add('/feed.zip', make_zip({'stops.txt': STOPS}))
+    with open_remote_zip(url, use_range=True) as zip_file:
+        assert zip_file.read('stops.txt') == STOPS
+
+    range_requests = [headers for command, _, headers in http_server.requests if 'Range' in headers]
+    assert range_requests
+    assert all(headers.get('If-Range', '').startswith('"') for headers in range_requests)
+
+
+def test_feed_replaced_during_range_read_fails(http_server, workdir):
+    url = http_server.add('/feed.zip', make_zip({'stops.txt': STOPS}))
+    with pytest.raises(OSError, match='HTTP 200'):
+        with open_remote_zip(url, use_range=True) as zip_file:
+            # Neue Version nach dem Lesen des zentralen Verzeichnisses
+            http_server.add('/feed.zip', make_zip({'stops.txt': os.urandom(1 << 20)}))
+            zip_file.read('stops.txt')
+
+
+def test_extracted_member_gets_mode_of_plain_open(http_server, workdir):
+    with open('plain.txt', 'w', encoding='utf-8') as f:
+        f.write('x')
+    url = http_server.add('/feed.zip', make_zip({'stops.txt': b'stop_id\n1\n'}))
+
+    with open_remote_zip(url) as zip_file:
+        assert extract_member_if_changed(zip_file, 'stops.txt', 'data/raw/stops.txt', None, source=url)
+    assert stat.S_IMODE(os.stat('data/raw/stops.txt').st_mode) == stat.S_IMODE(os.stat('plain.txt').st_mode)
+
+    # Gleicher Inhalt: Datei bleibt unverändert, keine temporären Dateien
+    before = os.stat('data/raw/stops.txt').st_mtime_ns
+    with open_remote_zip(url) as zip_file:
+        existing_hash = get_manifest().file_hash('data/raw/stops.txt')
+        assert not extract_member_if_changed(zip_file, 'stops.txt', 'data/raw/stops.txt', existing_hash, source=url)
+    assert os.stat('data/raw/stops.txt').st_mtime_ns == before
+    assert os.listdir('data/raw') == ['stops.txt']
@@ -0,0 +1,113 @@
+"""Tests für das persistente ID-Register (transfer_stops.id_registry)."""
+import pytest
+
+from transfer_stops import config
+from transfer_stops.id_registry import IdRegistry, registry_key
+
+FIRST = config.BEGINNING_ID
+
+
+def stop(name: str, lon: float, lat: float, provider: str = 'Flixbus'):
+    return {'provider': provider, 'lon': lon, 'lat': lat, 'name': f"{name} [{provider}]"}
+
+
+def run(stops, used_ids=()):
+    """Ein Lauf wie assign_ids: Register laden, IDs vergeben, speichern."""
+    registry = IdRegistry()
+    changes = registry.assign(stops, used_ids)
+    registry.save()
+    return changes
+
+
+@pytest.fixture(autouse=True)
+def registry_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'ID_REGISTRY_PATH', str(tmp_path / 'id_registry.json'))
+
+
+def test_duplicate_coordinates_keep_their_ids():
+    stops = [stop('Bern', 7.4, 46.9), stop('Bern Bahnhof', 7.4, 46.9), stop('Bern Nord', 7.4, 46.9)]
+    run(stops)
+    assert [s['id'] for s in stops] == [FIRST, FIRST + 1, FIRST + 2]
+
+    rerun = [stop('Bern', 7.4, 46.9), stop('Bern Bahnhof', 7.4, 46.9), stop('Bern Nord', 7.4, 46.9)]
+    changes = run(rerun)
+    assert [s['id'] for s in rerun] == [FIRST, FIRST + 1, FIRST + 2]
+    assert changes['unchanged'] == 3 and not changes['added']
+    assert IdRegistry().next_id == FIRST + 3
+
+    # Weniger Vorkommen: das letzte wird stillgelegt (mit der Koordinate ohne '#3')
+    changes = run([stop('Bern', 7.4, 46.9), stop('Bern Bahnhof', 7.4, 46.9)])
+    assert [(s['id'], s['lon'], s['lat']) for s in changes['removed']] == [(FIRST + 2, 7.4, 46.9)]
+    assert IdRegistry().retired == {registry_key('Flixbus', 7.4, 46.9) + '#3': FIRST + 2}
+
+
+def test_known_stops_keep_their_ids_and_renames_are_reported():
+    run([stop('Bern', 7.4, 46.9), stop('Thun', 7.6, 46.7)])
+
+    stops = [stop('Thun', 7.6, 46.7), stop('Bern Wankdorf', 7.4, 46.9)]
+    changes = run(stops)
+    assert [s['id'] for s in stops] == [FIRST + 1, FIRST]
+    assert changes['unchanged'] == 1
+    assert changes['renamed'] == [stops[1]]
+    assert not changes['added'] and not changes['removed']
+    assert IdRegistry().entries[registry_key('Flixbus', 7.4, 46.9)]['name'] == 'Bern Wankdorf [Flixbus]'
+
+
+def test_same_coordinate_of_another_provider_is_another_stop():
+    stops = [stop('Bern', 7.4, 46.9), stop('Bern', 7.4, 46.9, provider='BlaBlaCar')]
+    run(stops)
+    assert [s['id'] for s in stops] == [FIRST, FIRST + 1]
+
+
+def test_retired_ids_are_reused_in_a_later_run_only():
+    run([stop('Bern', 7.4, 46.9), stop('Thun', 7.6, 46.7), stop('Biel', 7.2, 47.1)])
+
+    # Bern und Thun fallen weg: ihre IDs gehen in diesem Lauf nicht an die neue Haltestelle
+    stops = [stop('Biel', 7.2, 47.1), stop('Olten', 7.9, 47.3)]
+    changes = run(stops)
+    assert stops[1]['id'] == FIRST + 3
+    assert [(s['id'], s['name']) for s in changes['removed']] == [(FIRST, 'Bern [Flixbus]'),
+                                                                  (FIRST + 1, 'Thun [Flixbus]')]
+    assert list(IdRegistry().retired.values()) == [FIRST, FIRST + 1]
+
+    # Neue Haltestellen erhalten die ältesten freien IDs, danach geht es ab next_id weiter
+    stops = [stop('Biel', 7.2, 47.1), stop('Olten', 7.9, 47.3), stop('Aarau', 8.0, 47.4),
+             stop('Baden', 8.3, 47.5), stop('Zug', 8.5, 47.2)]
+    run(stops)
+    assert [s['id'] for s in stops] == [FIRST + 2, FIRST + 3, FIRST, FIRST + 1, FIRST + 4]
+    assert IdRegistry().retired == {}
+
+
+def test_reappearing_stop_gets_its_old_id_back():
+    run([stop('Bern', 7.4, 46.9), stop('Thun', 7.6, 46.7)])
+    run([stop('Thun', 7.6, 46.7)])
+
+    stops = [stop('Olten', 7.9, 47.3), stop('Bern', 7.4, 46.9), stop('Thun', 7.6, 46.7)]
+    changes = run(stops)
+    assert [s['id'] for s in stops] == [FIRST + 2, FIRST, FIRST + 1]
+    assert [s['name'] for s in changes['added']] == ['Bern [Flixbus]', 'Olten [Flixbus]']
+    assert IdRegistry().retired == {}
+
+
+def test_ids_used_by_oev_are_skipped():
+    # next_id ist bereits eine ÖV-ID
+    stops = [stop('Bern', 7.4, 46.9), stop('Thun', 7.6, 46.7)]
+    run(stops, used_ids={FIRST, FIRST + 2})
+    assert [s['id'] for s in stops] == [FIRST + 1, FIRST + 3]
+
+    # Eine registrierte ID ist inzwischen eine ÖV-ID: die Haltestelle erhält eine neue
+    stops = [stop('Bern', 7.4, 46.9), stop('Thun', 7.6, 46.7)]
+    changes = run(stops, used_ids={FIRST + 1})
+    assert [s['id'] for s in stops] == [FIRST + 4, FIRST + 3]
+    assert changes['added'] == [stops[0]]
+    assert IdRegistry().entries[registry_key('Flixbus', 7.4, 46.9)]['id'] == FIRST + 4
+
+
+def test_free_ids_used_by_oev_are_dropped():
+    run([stop('Bern', 7.4, 46.9), stop('Thun', 7.6, 46.7)])
+    run([stop('Thun', 7.6, 46.7)])
+
+    stops = [stop('Thun', 7.6, 46.7), stop('Olten', 7.9, 47.3)]
+    run(stops, used_ids={FIRST})
+    assert stops[1]['id'] == FIRST + 2
+    assert IdRegistry().retired == {}
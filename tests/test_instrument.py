@@ -0,0 +1,20 @@
+"""Tests für transfer_stops.instrument."""
+import pytest
+
+from transfer_stops import instrument
+
+
+@pytest.mark.skipif(instrument.resource is None, reason="kein Spitzen-RSS auf dieser Plattform")
+def test_small_stage_after_big_stage_reports_no_growth():
+    with instrument.stage('gross', report=False) as big:
+        block = bytearray(200 << 20)
+        block[::4096] = b'x' * len(block[::4096])
+        del block
+    with instrument.stage('klein', report=False) as small:
+        sum(range(1000))
+
+    assert big.peak_rss_growth_mb > 100
+    assert small.peak_rss_growth_mb < 5
+    # Der Prozess-Höchststand bleibt nach der grossen Stufe gleich
+    assert small.process_peak_rss_mb >= big.process_peak_rss_mb
+    assert set(small.as_dict()) >= {'process_peak_rss_mb', 'peak_rss_growth_mb'}
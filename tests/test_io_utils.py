@@ -0,0 +1,48 @@
+"""Tests für transfer_stops.io_utils."""
+import os
+import stat
+
+import pytest
+
+from transfer_stops.io_utils import atomic_write
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_file_gets_mode_of_plain_open(tmp_path):
+    plain = tmp_path / 'plain.txt'
+    with open(plain, 'w', encoding='utf-8') as f:
+        f.write('x')
+
+    output = tmp_path / 'delta' / 'BAHNHOF'
+    with atomic_write(str(output), 'w', encoding='utf-8') as f:
+        f.write('x')
+
+    assert _mode(output) == _mode(plain)
+
+
+def test_existing_file_keeps_its_mode(tmp_path):
+    output = tmp_path / 'BFKOORD_WGS'
+    output.write_text('alt', encoding='utf-8')
+    os.chmod(output, 0o640)
+
+    with atomic_write(str(output), 'w', encoding='utf-8') as f:
+        f.write('neu')
+
+    assert output.read_text(encoding='utf-8') == 'neu'
+    assert _mode(output) == 0o640
+
+
+def test_error_keeps_old_file_and_leaves_no_temp_file(tmp_path):
+    output = tmp_path / 'BAHNHOF'
+    output.write_text('alt', encoding='utf-8')
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(output), 'w', encoding='utf-8') as f:
+            f.write('halb')
+            raise RuntimeError('Abbruch')
+
+    assert output.read_text(encoding='utf-8') == 'alt'
+    assert os.listdir(tmp_path) == ['BAHNHOF']
@@ -0,0 +1,103 @@
+"""Tests für METABHF/UMSTEIGB aus dem Umsteige-Index (transfer_stops.etl.metabhf)."""
+import os
+
+from transfer_stops.etl.metabhf import (
+    MetabhfIndex, create_umsteigb_file, iter_metabhf_lines, process_metabhf_file, write_metabhf_csv
+)
+
+# QGIS-Export: eine Spalte final_line, jeder Wert 'ID1 ID2 NNN' + Zeilenumbruch + '*A Y' in Anführungszeichen
+QGIS_CSV = (
+    'final_line\n'
+    '"1700000 8507000 003\n*A Y"\n'
+    '"1700000 8508500 012\n*A Y"\n'
+    '"1700001 8508500 007\n*A Y"\n'
+)
+METABHF = (
+    '1700000 8507000 003\n*A Y\n'
+    '1700000 8508500 012\n*A Y\n'
+    '1700001 8508500 007\n*A Y\n'
+    '8507000 : 1700000\n'
+    '8508500 : 1700000\n'
+    '8508500 : 1700001\n'
+)
+BAHNHOF = (
+    '1700000      Bern Carpark [Flixbus]$<1>\n'
+    '1700001      Thun Nord [Flixbus]$<1>\n'
+    '1700002      Olten [BlaBlaCar]$<1>\n'
+)
+
+
+def write(path: str, content: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def read(path: str):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_metabhf_from_qgis_export(workdir):
+    write('QGIS_METABHF.csv', QGIS_CSV)
+    index = process_metabhf_file('QGIS_METABHF.csv', 'METABHF')
+
+    assert read('METABHF') == METABHF
+    assert index.transfers == {'1700000': [('8507000', '003'), ('8508500', '012')], '1700001': [('8508500', '007')]}
+    assert index.pairs == [('1700000', '8507000'), ('1700000', '8508500'), ('1700001', '8508500')]
+    assert index.invalid == []
+
+
+def test_index_from_written_metabhf_is_the_same(workdir):
+    write('QGIS_METABHF.csv', QGIS_CSV)
+    index = process_metabhf_file('QGIS_METABHF.csv', 'METABHF')
+
+    # 'ID2 : ID1' und '*A Y' zählen nicht: der Index aus delta/METABHF gleicht dem aus dem Export
+    reread = MetabhfIndex.from_lines(iter_metabhf_lines('METABHF'))
+    assert reread.transfers == index.transfers
+    assert reread.pairs == index.pairs
+
+
+def test_auto_metabhf_candidates_round_trip(workdir):
+    candidates = [{'id': '1700001', 'oev_id': '8508500', 'minutes': 7},
+                  {'id': '1700000', 'oev_id': '8507000', 'minutes': 12}]
+    write_metabhf_csv(candidates, 'AUTO_METABHF.csv')
+    index = process_metabhf_file('AUTO_METABHF.csv', 'METABHF')
+
+    assert read('METABHF') == ('1700001 8508500 007\n*A Y\n1700000 8507000 012\n*A Y\n'
+                               '8508500 : 1700001\n8507000 : 1700000\n')
+    assert index.transfers == {'1700001': [('8508500', '007')], '1700000': [('8507000', '012')]}
+
+
+def test_without_pairs_existing_metabhf_is_kept(workdir):
+    write('METABHF', METABHF)
+    write('QGIS_METABHF.csv', 'final_line\n"*A Y"\n')
+    assert process_metabhf_file('QGIS_METABHF.csv', 'METABHF') is False
+    assert read('METABHF') == METABHF
+    assert sorted(os.listdir('.')) == ['METABHF', 'QGIS_METABHF.csv']
+
+
+def test_umsteigb_uses_first_transfer_of_each_stop(workdir):
+    write('QGIS_METABHF.csv', QGIS_CSV)
+    write('BAHNHOF', BAHNHOF)
+    index = process_metabhf_file('QGIS_METABHF.csv', 'METABHF')
+
+    assert create_umsteigb_file('BAHNHOF', 'METABHF', 'UMSTEIGB', index=index)
+    assert read('UMSTEIGB') == (
+        '1700000 03 03 Bern Carpark [Flixbus]\n'
+        '1700001 07 07 Thun Nord [Flixbus]\n'
+        '1700002 00 00 Olten [BlaBlaCar]\n'
+    )
+    # Ohne Index aus delta/METABHF gelesen: gleiches Ergebnis
+    umsteigb = read('UMSTEIGB')
+    assert create_umsteigb_file('BAHNHOF', 'METABHF', 'UMSTEIGB')
+    assert read('UMSTEIGB') == umsteigb
+
+
+def test_validate_reports_unknown_stops_and_invalid_minutes():
+    index = MetabhfIndex.from_lines(['1700000 8507000 003', '1700005 8507000 003', '1700001 8508500 x7'])
+    problems = index.validate({'1700000', '1700001', '1700002'})
+    assert problems == [
+        'Ungültige Umsteigezeit: 1700001 8508500 x7',
+        '1 Haltestellen in METABHF fehlen in BAHNHOF: 1700005',
+        '1 Haltestellen aus BAHNHOF ohne Umsteigebeziehung (UMSTEIGB: 00)',
+    ]
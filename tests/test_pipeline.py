@@ -0,0 +1,154 @@
+"""Tests für die In-Memory-Pipeline (transfer_stops.etl.pipeline) auf kleinen Testdaten."""
+import json
+import os
+import shutil
+
+import pytest
+
+from transfer_stops import config, manifest
+from transfer_stops.etl import load, metabhf, pipeline, transform
+from transfer_stops.etl.transform import DELTA_BFKOORD_PATH, OEV_BFKOORD_PATH, OEV_MATCH_REPORT_PATH
+from transfer_stops.stage_cache import StageCache
+
+OEV = "8507000 7.439122 46.948825 % Bern\n8508500 7.629000 46.754200 % Thun\n"
+STOPS = {
+    'A': [('Zürich Carpark', 47.3769, 8.5417), ('Luzern Inseli', 47.0502, 8.3093)],
+    'B': [('Basel Nord', 47.5596, 7.5886), ('Genf Aéroport', 46.2381, 6.1090)],
+}
+REUSE = {'A': True, 'B': True}
+
+
+def write_stops(name: str, rows, header: str = 'stop_name,stop_lat,stop_lon'):
+    path = f'data/processed/{name}_stops.csv'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(header + '\n')
+        f.writelines(','.join(str(value) for value in row) + '\n' for row in rows)
+
+
+def provider(name: str):
+    return {'name': name, 'input_path': f'data/raw/{name}/stops.txt', 'output_path': f'data/processed/{name}_stops.csv',
+            'columns_to_drop': [], 'lat': 'stop_lat', 'lon': 'stop_lon'}
+
+
+def read(path: str):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture
+def providers(workdir, monkeypatch):
+    """ÖV-Referenz und zwei Provider mit bereits gefilterten Haltestellen (kein Schweiz-Filter, kein Stage-Cache)."""
+    monkeypatch.setattr(config, 'STAGE_CACHE', False)
+    monkeypatch.setattr(config, 'PROVIDER_WORKERS', 1)
+    monkeypatch.setattr(config, 'ID_REGISTRY_PATH', 'data/id_registry.json')
+    monkeypatch.setattr(pipeline, 'swiss_stops_cache_current',
+                        lambda provider_config, geojson_path=None: os.path.exists(provider_config['output_path']))
+    os.makedirs(os.path.dirname(OEV_BFKOORD_PATH))
+    with open(OEV_BFKOORD_PATH, 'w', encoding='utf-8') as f:
+        f.write(OEV)
+    for name, rows in STOPS.items():
+        write_stops(name, rows)
+    return [provider('A'), provider('B')]
+
+
+def test_failed_provider_leaves_registry_and_delta_unchanged(providers):
+    assert pipeline.run_pipeline(providers, REUSE) is True
+    registry, delta = read(config.ID_REGISTRY_PATH), read(DELTA_BFKOORD_PATH)
+    ids = {key: entry['id'] for key, entry in json.loads(registry)['entries'].items()}
+    assert len(ids) == 4
+
+    # B liefert keine Koordinaten: ohne B würden dessen IDs stillgelegt und beim nächsten Lauf neu vergeben
+    write_stops('B', [('Basel Nord',)], header='stop_name')
+    assert pipeline.run_pipeline(providers, REUSE) is False
+    assert read(config.ID_REGISTRY_PATH) == registry
+    assert read(DELTA_BFKOORD_PATH) == delta
+
+    # B wieder da, A mit einer neuen Haltestelle: alle behalten ihre ID, die neue erhält keine von B
+    write_stops('B', STOPS['B'])
+    write_stops('A', STOPS['A'] + [('St. Gallen Spelteriniplatz', 47.4245, 9.3767)])
+    pipeline.run_pipeline(providers, REUSE)
+    data = json.loads(read(config.ID_REGISTRY_PATH))
+    assert {key: data['entries'][key]['id'] for key in ids} == ids
+    assert data['retired'] == {}
+    new_ids = {entry['id'] for entry in data['entries'].values()} - set(ids.values())
+    assert new_ids == {max(ids.values()) + 1}
+
+
+def test_failing_load_stage_fails_the_run(providers, monkeypatch):
+    def broken(*args):
+        raise OSError("Datenträger voll")
+
+    monkeypatch.setattr(pipeline, 'write_bahnhof', broken)
+    assert pipeline.run_pipeline(providers, REUSE) is False
+    # Die übrigen Ausgaben werden trotzdem geschrieben
+    assert os.path.exists(pipeline.BFKOORD_CSV_PATH)
+    assert os.path.exists(pipeline.AUTO_METABHF_PATH)
+    assert not os.path.exists(pipeline.DELTA_BAHNHOF_PATH)
+
+
+def test_load_without_delta_fails(providers):
+    assert pipeline.run_pipeline(providers, REUSE, stages=['load']) is False
+
+
+def test_transform_entry_evicted_after_lookup(providers, monkeypatch):
+    monkeypatch.setattr(config, 'STAGE_CACHE', True)
+    assert pipeline.run_pipeline(providers, REUSE) is True
+    delta = read(DELTA_BFKOORD_PATH)
+
+    # Eine Ablage beim Sicherstellen der Provider-CSVs räumt den eben gefundenen Eintrag weg
+    def evicting(*args, **kwargs):
+        shutil.rmtree(os.path.join(StageCache().root, 'transform'))
+
+    monkeypatch.setattr(pipeline, 'ensure_provider_stops', evicting)
+    assert pipeline.run_pipeline(providers, REUSE) is True
+    assert read(DELTA_BFKOORD_PATH) == delta
+
+
+def test_unreadable_transform_entry_is_a_miss(providers, monkeypatch):
+    monkeypatch.setattr(config, 'STAGE_CACHE', True)
+    assert pipeline.run_pipeline(providers, REUSE) is True
+    delta = read(DELTA_BFKOORD_PATH)
+
+    entry = StageCache().get('transform', pipeline.transform_cache_key(providers))
+    with open(os.path.join(entry, 'stops.json'), 'w', encoding='utf-8') as f:
+        f.write('{"stops": [')
+    assert pipeline.run_pipeline(providers, REUSE) is True
+    assert read(DELTA_BFKOORD_PATH) == delta
+
+
+def test_in_memory_pipeline_matches_file_stages(providers, tmp_path, monkeypatch):
+    # ÖV exakt und in der Nähe, gleiche Koordinate mehrfach und bei beiden Providern, Nachbarn < 100m
+    write_stops('A', [('Zürich Carpark', 47.3769, 8.5417), ('Zürich Carpark Ost', 47.3769, 8.5424),
+                      ('Bern', 46.948825, 7.439122), ('Thun Nord', 46.754245, 7.629),
+                      ('Luzern Inseli', 47.0502, 8.3093), ('Luzern Inseliquai', 47.0502, 8.3093)])
+    write_stops('B', [('Zürich Sihlquai', 47.3769, 8.5417), ('Basel Nord', 47.5596, 7.5886),
+                      ('Basel Nord Ost', 47.5599, 7.5886), ('Genf Aéroport', 46.2381, 6.1090)])
+    inputs = {path: read(path) for path in [OEV_BFKOORD_PATH] + [p['output_path'] for p in providers]}
+    outputs = [DELTA_BFKOORD_PATH, load.DELTA_BAHNHOF_PATH, pipeline.BFKOORD_CSV_PATH, pipeline.OEV_BFKOORD_CSV_PATH,
+               OEV_MATCH_REPORT_PATH, 'data/processed/ID_AENDERUNGEN.csv', metabhf.AUTO_METABHF_PATH,
+               config.ID_REGISTRY_PATH]
+
+    assert pipeline.run_pipeline(providers, REUSE) is True
+    in_memory = {path: read(path) for path in outputs}
+    # Übrig: Zürich Carpark, Luzern Inseli, Basel Nord, Genf Aéroport
+    assert len(in_memory[DELTA_BFKOORD_PATH].splitlines()) == 4
+
+    # Gleiche Eingaben, Stufen einzeln über delta/BFKOORD_WGS verkettet
+    os.makedirs(tmp_path / 'files')
+    monkeypatch.chdir(tmp_path / 'files')
+    monkeypatch.setattr(manifest, '_manifest', None)
+    for path, content in inputs.items():
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+    for provider_config in providers:
+        transform.check_and_add_new_coords(pipeline.prepare_provider_stops(provider_config, True),
+                                           provider_config['name'])
+    transform.clean_delta_bfkoord_wgs()
+    transform.assign_ids_to_delta()
+    transform.convert_all_bfkoord_to_csv()
+    load.write_bahnhof_format([provider_config['name'] for provider_config in providers])
+    metabhf.generate_metabhf_candidates()
+
+    assert {path: read(path) for path in outputs} == in_memory
@@ -0,0 +1,83 @@
+"""Tests für die Gitter-Suche (transfer_stops.spatial) gegen den direkten Vergleich aller Paare."""
+import numpy as np
+import pytest
+
+from transfer_stops.spatial import dedup_by_distance, haversine_distance, haversine_np, pairs_within
+
+
+def clustered_points(rng, n: int, centers, spread_deg: float):
+    """n Punkte um zufällig gewählte Zentren (viele Nachbarn pro Punkt)."""
+    centers = np.asarray(centers, dtype=np.float64)
+    picks = centers[rng.integers(len(centers), size=n)]
+    lats = np.clip(picks[:, 0] + rng.normal(0, spread_deg, n), -90, 90)
+    lons = (picks[:, 1] + rng.normal(0, spread_deg, n) + 180) % 360 - 180
+    return lats, lons
+
+
+def naive_pairs(lats1, lons1, lats2, lons2, radius_meters: float):
+    distances = haversine_np(lats1[:, None], lons1[:, None], lats2[None, :], lons2[None, :])
+    i, j = np.nonzero(distances < radius_meters)
+    return i, j, distances[i, j]
+
+
+def naive_dedup(points, distance_threshold_meters: float):
+    """Jeder Punkt gegen alle bereits behaltenen (O(n²))."""
+    kept, removed = [], []
+    for i, (lat, lon) in enumerate(points):
+        closest, min_distance = None, float('inf')
+        for j in kept:
+            distance = haversine_distance(lat, lon, points[j][0], points[j][1])
+            if distance < distance_threshold_meters and distance < min_distance:
+                closest, min_distance = j, distance
+        if closest is None:
+            kept.append(i)
+        else:
+            removed.append((i, closest, min_distance))
+    return kept, removed
+
+
+# Schweiz, Datumsgrenze (±180°), Nordpol-Nähe
+CENTERS = [(46.95, 7.44), (47.37, 8.54), (-16.5, 179.999), (-16.5, -179.999), (89.9, 20.0)]
+
+
+@pytest.mark.parametrize('radius', [10, 100, 5000])
+def test_pairs_within_matches_all_pairs(radius):
+    rng = np.random.default_rng(radius)
+    lats1, lons1 = clustered_points(rng, 600, CENTERS, 0.002)
+    lats2, lons2 = clustered_points(rng, 400, CENTERS, 0.002)
+
+    i, j, d = pairs_within(lats1, lons1, lats2, lons2, radius, chunk_size=128)
+    expected_i, expected_j, expected_d = naive_pairs(lats1, lons1, lats2, lons2, radius)
+    assert len(expected_i) > 100
+    # Auch Paare über die Datumsgrenze hinweg
+    assert radius < 100 or np.any(np.abs(lons1[i] - lons2[j]) > 359)
+    assert np.array_equal(i, expected_i) and np.array_equal(j, expected_j)
+    assert np.allclose(d, expected_d)
+
+
+def test_pairs_within_empty_input_and_zero_radius():
+    lats, lons = np.array([46.95]), np.array([7.44])
+    assert all(len(part) == 0 for part in pairs_within(lats, lons, lats[:0], lons[:0], 100))
+    assert all(len(part) == 0 for part in pairs_within(lats, lons, lats, lons, 0))
+
+
+@pytest.mark.parametrize('threshold', [50, 100, 500])
+def test_dedup_by_distance_matches_all_pairs(threshold):
+    rng = np.random.default_rng(threshold)
+    lats, lons = clustered_points(rng, 800, CENTERS, 0.003)
+    points = list(zip(lats.tolist(), lons.tolist()))
+
+    kept, removed = dedup_by_distance(points, threshold)
+    expected_kept, expected_removed = naive_dedup(points, threshold)
+    assert kept == expected_kept
+    assert [(i, j) for i, j, _ in removed] == [(i, j) for i, j, _ in expected_removed]
+    assert np.allclose([d for _, _, d in removed], [d for _, _, d in expected_removed])
+    assert removed
+
+
+def test_dedup_keeps_first_point_and_reports_closest_kept():
+    # 0.0006° Breite sind ~67m: b liegt zu nahe an a, c hat a und b im Radius, d ist frei
+    points = [(46.0, 7.0), (46.0006, 7.0), (46.0003, 7.0), (46.01, 7.0)]
+    kept, removed = dedup_by_distance(points, 100)
+    assert kept == [0, 3]
+    assert [(i, j) for i, j, _ in removed] == [(1, 0), (2, 0)]
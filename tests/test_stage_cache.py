@@ -0,0 +1,65 @@
+"""Tests für transfer_stops.stage_cache (LRU-Aufräumen, mehrere Prozesse)."""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from transfer_stops.stage_cache import StageCache
+
+ENTRY_BYTES = 4096
+
+
+def _fill(root: str, prefix: str, count: int, max_bytes: int):
+    cache = StageCache(root, max_bytes)
+    for i in range(count):
+        with cache.put('extract', f'{prefix}{i}') as entry:
+            with open(os.path.join(entry, 'stops.csv'), 'wb') as f:
+                f.write(b'x' * ENTRY_BYTES)
+
+
+def _evict(root: str, max_bytes: int):
+    return StageCache(root, max_bytes).evict()
+
+
+def _cache_bytes(root: str):
+    return sum(size for _, size, _ in StageCache(root).entries())
+
+
+def test_workers_do_not_evict_and_parent_cleans_up(tmp_path):
+    root = str(tmp_path / 'stages')
+    max_bytes = 5 * ENTRY_BYTES
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        for future in [executor.submit(_fill, root, f'w{n}-', 5, max_bytes) for n in range(4)]:
+            future.result()
+
+    # Worker-Prozesse legen nur ab
+    assert len(StageCache(root).entries()) == 20
+
+    StageCache(root, max_bytes).evict()
+    assert _cache_bytes(root) <= max_bytes
+
+
+def test_concurrent_evict_in_several_processes(tmp_path):
+    root = str(tmp_path / 'stages')
+    _fill(root, 'e', 40, max_bytes=1 << 30)
+    max_bytes = 10 * ENTRY_BYTES
+
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        removed = [future.result() for future in [executor.submit(_evict, root, max_bytes) for _ in range(8)]]
+
+    # Jeder Eintrag wird genau einmal entfernt, genau ein Prozess räumt auf
+    assert sum(removed) == 40 - len(StageCache(root).entries())
+    assert max(removed) == sum(removed)
+    assert _cache_bytes(root) <= max_bytes
+
+
+def test_evict_skips_directories_of_a_running_put(tmp_path):
+    root = tmp_path / 'stages'
+    _fill(str(root), 'e', 2, max_bytes=1 << 30)
+    # put() eines anderen Prozesses: meta.json ist geschrieben, der Ordner noch nicht umbenannt
+    running = root / 'extract' / '.k.abc.tmp'
+    running.mkdir()
+    (running / 'meta.json').write_text('{}', encoding='utf-8')
+
+    cache = StageCache(str(root), max_bytes=0)
+    assert len(cache.entries()) == 2
+    assert cache.evict() == 2
+    assert running.exists()
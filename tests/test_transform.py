@@ -0,0 +1,115 @@
+"""Tests für den ÖV-Abgleich beim Sammeln (transfer_stops.etl.transform.collect_new_coords)."""
+import csv
+import random
+
+import pandas as pd
+import pytest
+
+from transfer_stops.etl.reference import OevReference
+from transfer_stops.etl.transform import OEV_MATCH_FIELDS, collect_new_coords, write_oev_match_report
+from transfer_stops.spatial import haversine_distance
+
+# 0.000045° Breite sind 5.0m, 0.00045° sind 50.0m
+REFERENCE = OevReference(['8507000', '8508500'], [7.439122, 7.629], [46.948825, 46.7542], ['Bern', 'Thun'])
+STOPS = pd.DataFrame({
+    'stop_name': ['Bern', 'Thun Nord', 'Thun Süd', 'Olten'],
+    'lat': [46.948825, 46.7542 + 0.000045, 46.7542 - 0.00045, 47.3519],
+    'lon': [7.439122, 7.629, 7.629, 7.9078],
+})
+
+
+def test_exact_and_near_matches_are_reported():
+    report = []
+    new = collect_new_coords(STOPS, 'Flixbus', REFERENCE, set(), report, radius_meters=10)
+
+    assert [entry['name'] for entry in new] == ['Thun Süd [Flixbus]', 'Olten [Flixbus]']
+    assert [(row['name'], row['oev_id'], row['oev_name'], row['abgleich'], row['distanz_m']) for row in report] == [
+        ('Bern', '8507000', 'Bern', 'exakt', 0.0),
+        ('Thun Nord', '8508500', 'Thun', 'naehe', 5.0),
+    ]
+
+
+@pytest.mark.parametrize('radius, matched', [
+    (0, ['Bern']),
+    (10, ['Bern', 'Thun Nord']),
+    (100, ['Bern', 'Thun Nord', 'Thun Süd']),
+])
+def test_radius_decides_what_counts_as_oev_stop(radius, matched):
+    report = []
+    new = collect_new_coords(STOPS, 'Flixbus', REFERENCE, set(), report, radius_meters=radius)
+    assert [row['name'] for row in report] == matched
+    assert [entry['name'] for entry in new] == [f"{name} [Flixbus]" for name in STOPS['stop_name']
+                                                if name not in matched]
+
+
+def test_nearest_oev_stop_wins():
+    # Thun Nord: 10m bis zur ersten, 5m bis zur zweiten ÖV-Haltestelle der Datei
+    reference = OevReference(['1', '2'], [7.629, 7.629], [46.7542 - 0.000045, 46.7542 + 0.00009], ['Süd', 'Nord'])
+    report = []
+    collect_new_coords(STOPS.iloc[[1]], 'Flixbus', reference, set(), report, radius_meters=20)
+    assert [(row['oev_id'], row['distanz_m']) for row in report] == [('2', 5.0)]
+
+
+def test_match_report_csv(workdir):
+    report = []
+    collect_new_coords(STOPS, 'Flixbus', REFERENCE, set(), report, radius_meters=10)
+    write_oev_match_report(report, 'OEV_ABGLEICH.csv')
+
+    with open('OEV_ABGLEICH.csv', newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        assert reader.fieldnames == OEV_MATCH_FIELDS
+        rows = list(reader)
+    assert rows == [
+        {'provider': 'Flixbus', 'name': 'Bern', 'lon': '7.439122', 'lat': '46.948825',
+         'oev_id': '8507000', 'oev_name': 'Bern', 'distanz_m': '0.0', 'abgleich': 'exakt'},
+        {'provider': 'Flixbus', 'name': 'Thun Nord', 'lon': '7.629', 'lat': str(46.7542 + 0.000045),
+         'oev_id': '8508500', 'oev_name': 'Thun', 'distanz_m': '5.0', 'abgleich': 'naehe'},
+    ]
+
+
+def collect_row_by_row(df, provider: str, reference, collected, radius_meters: float):
+    """Zeile für Zeile mit Text-Schlüsseln und Distanz zu jeder ÖV-Haltestelle (Vergleich für die Vektorisierung)."""
+    oev = {}
+    for row, (lat, lon) in enumerate(zip(reference.lats.tolist(), reference.lons.tolist())):
+        oev.setdefault(f"{lat:.6f},{lon:.6f}", row)
+    new, report = [], []
+    for name, lat, lon in zip(df['stop_name'], df['lat'], df['lon']):
+        key = f"{lat:.6f},{lon:.6f}"
+        distance, row = min((haversine_distance(lat, lon, oev_lat, oev_lon), row) for row, (oev_lat, oev_lon)
+                            in enumerate(zip(reference.lats.tolist(), reference.lons.tolist())))
+        if key in oev:
+            report.append((provider, name, reference.ids[oev[key]], 'exakt', 0.0))
+        elif distance < radius_meters:
+            report.append((provider, name, reference.ids[row], 'naehe', round(distance, 1)))
+        elif key not in collected:
+            collected.add(key)
+            new.append(f"{name} [{provider}]")
+    return new, report
+
+
+def random_stops(rng, points, n: int):
+    picks = [rng.choice(points) for _ in range(n)]
+    return pd.DataFrame({'stop_name': [f"Haltestelle {k}" for k in range(n)],
+                         'lat': [lat for lat, _ in picks], 'lon': [lon for _, lon in picks]})
+
+
+def test_matches_row_by_row_classification():
+    rng = random.Random(7)
+    oev = [(round(rng.uniform(46.9, 47.0), 6), round(rng.uniform(7.4, 7.5), 6)) for _ in range(200)]
+    reference = OevReference([str(8500000 + k) for k in range(len(oev))], [lon for _, lon in oev],
+                             [lat for lat, _ in oev], [f"ÖV {k}" for k in range(len(oev))])
+    # ÖV-Koordinaten, Punkte wenige Meter daneben und freie Punkte, jeweils mehrfach gezogen
+    points = oev[:50] + [(round(lat + rng.uniform(-0.0002, 0.0002), 6), lon) for lat, lon in oev[50:100]]
+    points += [(round(rng.uniform(46.9, 47.0), 6), round(rng.uniform(7.4, 7.5), 6)) for _ in range(150)]
+
+    collected, expected_collected = set(), set()
+    for provider in ('Flixbus', 'BlaBlaCar'):
+        df = random_stops(rng, points, 400)
+        report = []
+        new = collect_new_coords(df, provider, reference, collected, report, radius_meters=15)
+        expected_new, expected_report = collect_row_by_row(df, provider, reference, expected_collected, 15)
+
+        assert [entry['name'] for entry in new] == expected_new
+        assert [(row['provider'], row['name'], row['oev_id'], row['abgleich'], row['distanz_m'])
+                for row in report] == expected_report
+    assert len(collected) == len(expected_collected)